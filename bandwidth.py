@@ -0,0 +1,330 @@
+"""
+Bandwidth scheduling for YouTube Video Downloader.
+Token buckets that cap the combined download rate of the process and the
+rate of each job, with caps that can change by time of day.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import config
+from metrics import metrics
+
+# Seconds of unused bandwidth a bucket may save up and spend as a burst
+BURST_SECONDS = 1.0
+
+# Longest single sleep, so cancelled and paused jobs stop promptly
+MAX_SLEEP = 0.25
+
+# How often the time-of-day schedule is re-evaluated
+SCHEDULE_CHECK_INTERVAL = 30
+
+# Schedule windows leave caps they do not mention at their default
+_UNSET = object()
+
+
+def _kb(value) -> Optional[float]:
+    """Convert a KB/s setting to bytes/s; None, 0 or negative means unlimited."""
+    return value * 1024 if value and value > 0 else None
+
+
+def _minutes(clock: str) -> int:
+    hours, _, minutes = clock.partition(':')
+    return int(hours) * 60 + int(minutes or 0)
+
+
+class TokenBucket:
+    """
+    Token bucket that lets callers run into debt.
+
+    `consume(n)` always takes the tokens and returns how long the caller has
+    to sleep until the bucket is back in credit. Concurrent consumers are
+    therefore served in arrival order: each one waits for the bytes that
+    were taken before it, so equally busy jobs get equal shares and a job
+    that stops reading leaves its share to the others.
+    """
+
+    def __init__(self, rate: Optional[float] = None):
+        """
+        Initialize the bucket.
+
+        Args:
+            rate (float): Bytes per second, None for unlimited
+        """
+        self.rate = rate
+        self._tokens = self._capacity()
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _capacity(self) -> float:
+        return self.rate * BURST_SECONDS if self.rate else 0.0
+
+    def set_rate(self, rate: Optional[float]):
+        """Change the rate; saved-up tokens are kept up to the new capacity."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self._tokens = min(self._tokens, self._capacity())
+
+    def _refill(self, now: float):
+        if self.rate:
+            self._tokens = min(self._capacity(),
+                               self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def consume(self, nbytes: int) -> float:
+        """
+        Take tokens for bytes that were received.
+
+        Returns:
+            float: Seconds to wait before receiving more
+        """
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            self._refill(time.monotonic())
+            self._tokens -= nbytes
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def refund(self, nbytes: float):
+        """Give back tokens of bytes that will not be waited for (e.g. a cancelled job)."""
+        with self._lock:
+            if self.rate:
+                self._tokens = min(self._capacity(), self._tokens + nbytes)
+
+
+class JobThrottle:
+    """
+    Bandwidth handle of one job.
+
+    Downloads call `throttle()` with the bytes they just received and are
+    slept until both the job's own bucket and the shared global bucket allow
+    more. `hook()` does the same from yt-dlp progress events, which are
+    emitted on the thread that reads the data, so sleeping there slows the
+    transfer itself through TCP flow control.
+    """
+
+    def __init__(self, scheduler: "BandwidthScheduler", limit: Optional[float] = None,
+                 stop: Callable[[], bool] = None):
+        """
+        Initialize the handle.
+
+        Args:
+            scheduler (BandwidthScheduler): Owner of the global bucket
+            limit (float): Bytes per second for this job only
+                (default: the scheduler's per-job limit)
+            stop (Callable): Returns True when the job is cancelled or paused,
+                to cut waits short
+        """
+        self.scheduler = scheduler
+        self.limit = limit
+        self.stop = stop
+        self.waited = 0.0
+        self._bucket = TokenBucket(self._job_rate())
+        self._received: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _job_rate(self) -> Optional[float]:
+        return self.limit if self.limit is not None else self.scheduler.job_rate()
+
+    def set_limit(self, limit: Optional[float]):
+        """Set this job's own cap in bytes/s (None: use the scheduler's per-job limit)."""
+        self.limit = limit
+        self._bucket.set_rate(self._job_rate())
+
+    def throttle(self, nbytes: int):
+        """Account for received bytes and sleep if a cap is exceeded."""
+        if nbytes <= 0:
+            return
+        global_bucket = self.scheduler.refresh()
+        job_rate = self._job_rate()
+        if job_rate != self._bucket.rate:
+            self._bucket.set_rate(job_rate)
+        if not (global_bucket.rate or job_rate):
+            return
+
+        delay = max(self._bucket.consume(nbytes), global_bucket.consume(nbytes))
+        if delay <= 0:
+            return
+        deadline = time.monotonic() + delay
+        remaining = delay
+        while remaining > 0:
+            if self.stop and self.stop():
+                # Do not leave other jobs waiting for bytes this job will never read
+                if global_bucket.rate:
+                    global_bucket.refund(remaining * global_bucket.rate)
+                break
+            time.sleep(min(remaining, MAX_SLEEP))
+            remaining = deadline - time.monotonic()
+        waited = delay - max(remaining, 0)
+        self.waited += waited
+        metrics.inc('ytd_bandwidth_wait_seconds_total', waited)
+
+    def hook(self, d: Dict):
+        """
+        Throttle from a yt-dlp progress event.
+
+        Events carry the cumulative bytes of a file, so the bytes received
+        since the previous event of the same file are throttled. Events marked
+        'bandwidth_throttled' come from downloaders whose reading threads call
+        throttle() themselves (segmented downloads) and are skipped.
+        """
+        if d.get('bandwidth_throttled'):
+            return
+        key = d.get('tmpfilename') or d.get('filename') or ''
+        if d.get('status') != 'downloading':
+            with self._lock:
+                self._received.pop(key, None)
+            return
+        downloaded = d.get('downloaded_bytes') or 0
+        with self._lock:
+            previous = self._received.get(key)
+            self._received[key] = downloaded
+        # The first event of a file is only a baseline: resumed downloads
+        # start at the size of their .part file
+        if previous is not None and downloaded > previous:
+            self.throttle(downloaded - previous)
+
+
+class BandwidthScheduler:
+    """
+    Process-wide bandwidth caps.
+
+    One token bucket is shared by every download and enforces the global
+    cap; each job also has its own bucket for the per-job cap. Bandwidth a
+    job does not use stays in the shared bucket for the others. Both caps
+    can be overridden for time windows, e.g. to stay polite during office
+    hours and saturate the link at night.
+    """
+
+    def __init__(self, global_limit: Optional[float] = None, job_limit: Optional[float] = None,
+                 schedule: List[Dict] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            global_limit (float): Bytes per second for all downloads together
+                (default: config 'rate_limit' in KB/s)
+            job_limit (float): Bytes per second per job
+                (default: config 'rate_limit_per_job' in KB/s)
+            schedule (List[Dict]): Time windows overriding the caps
+                (default: config 'rate_limit_schedule'), see parse_schedule
+        """
+        self.global_limit = global_limit if global_limit is not None else _kb(config.get('rate_limit'))
+        self.job_limit = job_limit if job_limit is not None else _kb(config.get('rate_limit_per_job'))
+        self.schedule = parse_schedule(schedule if schedule is not None
+                                       else config.get('rate_limit_schedule') or [])
+        self.bucket = TokenBucket()
+        self._job_rate: Optional[float] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def configure(self, global_limit: Optional[float] = None, job_limit: Optional[float] = None,
+                  schedule: List[Dict] = None):
+        """Override caps (bytes/s) or the schedule, e.g. from command line options."""
+        with self._lock:
+            if global_limit is not None:
+                self.global_limit = global_limit or None
+            if job_limit is not None:
+                self.job_limit = job_limit or None
+            if schedule is not None:
+                self.schedule = parse_schedule(schedule)
+        self.refresh(force=True)
+
+    def limits_at(self, when: datetime = None) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Get the (global, per-job) caps in bytes/s at a time of day.
+
+        The first schedule window containing the time wins; caps it does not
+        set keep their default.
+        """
+        minute = _minutes((when or datetime.now()).strftime('%H:%M'))
+        for start, end, global_limit, job_limit in self.schedule:
+            inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+            if inside:
+                return (self.global_limit if global_limit is _UNSET else global_limit,
+                        self.job_limit if job_limit is _UNSET else job_limit)
+        return self.global_limit, self.job_limit
+
+    def refresh(self, force: bool = False) -> TokenBucket:
+        """Apply the caps of the current time window and return the global bucket."""
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return self.bucket
+        with self._lock:
+            self._next_check = now + SCHEDULE_CHECK_INTERVAL
+            global_rate, self._job_rate = self.limits_at()
+        if global_rate != self.bucket.rate:
+            self.bucket.set_rate(global_rate)
+        return self.bucket
+
+    def job_rate(self) -> Optional[float]:
+        """Per-job cap in bytes/s that applies now."""
+        return self._job_rate
+
+    def job(self, limit: Optional[float] = None, stop: Callable[[], bool] = None) -> JobThrottle:
+        """
+        Create the bandwidth handle of a new job.
+
+        Args:
+            limit (float): Cap of this job in bytes/s (default: the per-job limit)
+            stop (Callable): Returns True once the job is cancelled or paused
+
+        Returns:
+            JobThrottle: Handle to throttle the job's transfers
+        """
+        return JobThrottle(self, limit, stop)
+
+
+def parse_schedule(entries: List[Dict]) -> List[tuple]:
+    """
+    Parse time windows of the form
+    {"start": "08:00", "end": "20:00", "rate_limit": 2048, "rate_limit_per_job": 512}.
+
+    Limits are in KB/s; null means unlimited and a missing key keeps the
+    default. Windows may wrap around midnight (e.g. 22:00-06:00).
+
+    Returns:
+        List[tuple]: (start minute, end minute, global bytes/s, per-job bytes/s)
+    """
+    windows = []
+    for entry in entries:
+        try:
+            start, end = _minutes(entry['start']), _minutes(entry['end'])
+        except (KeyError, ValueError, TypeError):
+            print(f"Warning: Ignoring invalid rate limit schedule entry: {entry}")
+            continue
+        global_limit = _kb(entry['rate_limit']) if 'rate_limit' in entry else _UNSET
+        job_limit = _kb(entry['rate_limit_per_job']) if 'rate_limit_per_job' in entry else _UNSET
+        windows.append((start, end, global_limit, job_limit))
+    return windows
+
+
+# Global scheduler shared by all downloaders in the process
+scheduler = BandwidthScheduler()
+
+
+if __name__ == "__main__":
+    demo = BandwidthScheduler(global_limit=2 * 1024 * 1024, job_limit=1536 * 1024)
+    jobs = [demo.job() for _ in range(3)]
+    received = [0] * len(jobs)
+
+    def read(index: int, seconds: float = 3.0):
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            jobs[index].throttle(64 * 1024)
+            received[index] += 64 * 1024
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(len(jobs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    for index, count in enumerate(received):
+        print(f"job {index}: {count / elapsed / 1024:.0f} KB/s")
+    print(f"total: {sum(received) / elapsed / 1024:.0f} KB/s (cap 2048 KB/s)")
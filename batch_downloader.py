@@ -0,0 +1,322 @@
+"""
+Concurrent batch download engine for YouTube Video Downloader.
+Runs many downloads in parallel on a bounded thread pool.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Callable
+
+from config import config
+from metrics import metrics
+from postprocess import get_postprocess_pool, wait_all
+from download_engine import YouTubeDownloader, DownloadCancelled, DownloadPaused
+
+
+class BatchDownloader:
+    """
+    Download a list of URLs concurrently.
+
+    Every job gets its own YouTubeDownloader instance, so progress events from
+    `_progress_hook` and the downloading state stay separate per job. Progress
+    dictionaries passed to the callback carry the extra keys 'job_id' and 'url'.
+    Job results are not kept: run_jobs hands each one to an `on_result`
+    callback and returns counts, so memory stays flat however long the list is.
+    """
+
+    def __init__(self, download_path: str = "downloads", max_workers: int = None,
+                 archive=None, postprocess_pool=None):
+        """
+        Initialize the batch downloader.
+
+        Args:
+            download_path (str): Directory where downloads will be saved
+            max_workers (int): Number of parallel downloads
+                (default: config 'max_concurrent_downloads')
+            archive (DownloadArchive): Archive shared by all jobs; archived
+                URLs finish without any network access
+            postprocess_pool (PostProcessingPool): Pool that merges and converts
+                finished downloads while the workers start the next transfers
+                (default: the shared pool if config 'pipeline_postprocessing' is set)
+        """
+        self.download_path = Path(download_path)
+        self.download_path.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max(1, max_workers or config.get('max_concurrent_downloads', 3))
+        self.max_retries = config.get('max_retries', 0)
+        self.retry_delay = config.get('retry_delay', 0)
+        self.archive = archive
+        if postprocess_pool is None and config.get('pipeline_postprocessing', True):
+            postprocess_pool = get_postprocess_pool()
+        self.postprocess_pool = postprocess_pool
+        self.progress_callback: Optional[Callable] = None
+        self._downloaders: Dict[int, tuple] = {}  # job_id -> (downloader, url)
+        self._cancelled = threading.Event()
+        self._paused = threading.Event()
+        self._lock = threading.Lock()
+
+    def set_progress_callback(self, callback: Callable):
+        """Set a callback function to track progress of all jobs."""
+        self.progress_callback = callback
+
+    def make_downloader(self, job_id: int, url: str) -> YouTubeDownloader:
+        """Create a downloader whose progress events are tagged with the job."""
+        downloader = YouTubeDownloader(str(self.download_path), archive=self.archive)
+        downloader.postprocess_pool = self.postprocess_pool
+        with self._lock:
+            self._downloaders[job_id] = (downloader, url)
+        if self.progress_callback:
+            def job_progress(info):
+                info['job_id'] = job_id
+                info['url'] = url
+                self.progress_callback(info)
+            downloader.set_progress_callback(job_progress)
+        return downloader
+
+    def _with_retries(self, job_id: int, url: str, func: Callable) -> Dict:
+        """Run func, retrying on failure, and return a job result dict."""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            # Jobs still waiting in the queue never start once stopped
+            if self._paused.is_set():
+                return {'job_id': job_id, 'url': url, 'status': 'paused', 'attempts': attempt}
+            if self._cancelled.is_set():
+                return {'job_id': job_id, 'url': url, 'status': 'cancelled', 'attempts': attempt}
+            try:
+                message = func()
+                result = {'job_id': job_id, 'url': url, 'status': 'finished',
+                          'message': message, 'attempts': attempt + 1}
+                postprocessing = [future for downloader in self._job_downloaders(job_id)
+                                  for future in downloader.take_postprocessing()]
+                if postprocessing:
+                    result['postprocessing'] = postprocessing
+                self._forget(job_id)
+                return result
+            except DownloadPaused:
+                return {'job_id': job_id, 'url': url, 'status': 'paused',
+                        'attempts': attempt + 1}
+            except DownloadCancelled:
+                self._forget(job_id)
+                return {'job_id': job_id, 'url': url, 'status': 'cancelled',
+                        'attempts': attempt + 1}
+            except Exception as e:
+                last_error = e
+                if attempt < self.max_retries:
+                    metrics.inc('ytd_retries_total', reason='batch')
+                    time.sleep(self.retry_delay)
+        return {'job_id': job_id, 'url': url, 'status': 'failed',
+                'error': str(last_error), 'attempts': self.max_retries + 1}
+
+    def run_job(self, job_id: int, url: str, func: Callable,
+                wait_postprocessing: bool = True) -> Dict:
+        """
+        Run one job on the calling thread, with the batch's retries.
+
+        Used by long-running callers (e.g. the daemon) that keep their own
+        worker pool instead of handing a job list to run_jobs. Only paused
+        jobs stay tracked afterwards, so the batch does not grow without bound.
+
+        Args:
+            job_id (int): Job id, as passed to make_downloader
+            url (str): URL of the job
+            func (Callable): Performs the download and returns a status message
+            wait_postprocessing (bool): Wait for merging and conversion; if
+                False, a 'postprocessing' list of futures may be left in the
+                result for finish_postprocessing
+
+        Returns:
+            Dict: Result dict of the job
+        """
+        result = self._with_retries(job_id, url, func)
+        if result['status'] != 'paused':
+            self._forget(job_id)
+        return self.finish_postprocessing(result) if wait_postprocessing else result
+
+    @staticmethod
+    def finish_postprocessing(result: Dict) -> Dict:
+        """
+        Wait for the post-processing of a finished job and settle its status.
+
+        Args:
+            result (Dict): Result dict, possibly with a 'postprocessing' list
+
+        Returns:
+            Dict: The result, 'failed' if any post-processing step failed
+        """
+        error = wait_all(result.pop('postprocessing', None) or [])
+        if error:
+            result['status'] = 'failed'
+            result['error'] = f"Post-processing failed: {error}"
+        return result
+
+    def _forget(self, job_id: int):
+        """Stop tracking a job that can no longer be resumed."""
+        with self._lock:
+            self._downloaders.pop(job_id, None)
+
+    def _job_downloaders(self, job_id: int = None) -> List[YouTubeDownloader]:
+        with self._lock:
+            if job_id is None:
+                return [downloader for downloader, _ in self._downloaders.values()]
+            entry = self._downloaders.get(job_id)
+            return [entry[0]] if entry else []
+
+    def cancel(self, job_id: int = None):
+        """
+        Cancel one job, or every running and queued job if job_id is None.
+
+        Args:
+            job_id (int): Job to cancel
+        """
+        if job_id is None:
+            self._cancelled.set()
+        for downloader in self._job_downloaders(job_id):
+            downloader.cancel_download()
+
+    def pause(self, job_id: int = None):
+        """
+        Pause one job, or every running and queued job if job_id is None.
+
+        Paused jobs keep their .part files and end with status 'paused'.
+
+        Args:
+            job_id (int): Job to pause
+        """
+        if job_id is None:
+            self._paused.set()
+        for downloader in self._job_downloaders(job_id):
+            downloader.pause_download()
+
+    def resume(self, job_id: int) -> Dict:
+        """
+        Resume a paused job on the calling thread.
+
+        Args:
+            job_id (int): Job to resume
+
+        Returns:
+            Dict: Result dict of the resumed job
+        """
+        with self._lock:
+            entry = self._downloaders.get(job_id)
+        if not entry:
+            raise Exception(f"Job {job_id} cannot be resumed")
+        self._paused.clear()
+        self._cancelled.clear()
+        downloader, url = entry
+        return self.finish_postprocessing(
+            self._with_retries(job_id, url, downloader.resume_download))
+
+    def run_jobs(self, jobs: Iterable[tuple],
+                 on_result: Optional[Callable] = None) -> Dict:
+        """
+        Run (job_id, url, callable) jobs on the worker pool.
+
+        At most twice the worker count is queued at once, so very long
+        iterables are consumed lazily instead of being submitted up front.
+        Jobs whose files are still being merged or converted free their worker
+        for the next transfer; when twice the post-processing workers are
+        busy, new transfers wait for the oldest to finish.
+
+        Args:
+            jobs (Iterable[tuple]): (job_id, url, func) where func() performs
+                the download and returns a status message
+            on_result (Callable): Called with each job's result dict as soon as
+                the job is settled, in completion order
+
+        Returns:
+            Dict: Job counts per status plus 'total', and the result dicts of
+                failed jobs under 'failures'
+        """
+        summary = {'total': 0, 'finished': 0, 'failed': 0, 'paused': 0,
+                   'cancelled': 0, 'failures': []}
+
+        def settle(result: Dict):
+            result = self.finish_postprocessing(result)
+            summary['total'] += 1
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+            if result['status'] == 'failed':
+                summary['failures'].append(result)
+            if on_result:
+                on_result(result)
+
+        postprocessing: List[Dict] = []  # finished transfers, oldest first
+        max_pending = self.max_workers * 2
+        max_postprocessing = self.postprocess_pool.workers * 2 if self.postprocess_pool else 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='download') as executor:
+            pending = set()
+            for job_id, url, func in jobs:
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._collect(done, postprocessing, settle)
+                while len(postprocessing) > max_postprocessing:
+                    settle(postprocessing.pop(0))
+                pending.add(executor.submit(self._with_retries, job_id, url, func))
+            self._collect(pending, postprocessing, settle)
+        for result in postprocessing:
+            settle(result)
+
+        return summary
+
+    @staticmethod
+    def _collect(futures, postprocessing: List[Dict], settle: Callable):
+        """Settle finished futures; jobs still post-processing go to `postprocessing`."""
+        for future in futures:
+            result = future.result()
+            if result.get('postprocessing'):
+                postprocessing.append(result)
+            else:
+                settle(result)
+
+    def download_all(self, urls: Iterable[str], quality: str = 'best',
+                     audio_only: bool = False, on_result: Optional[Callable] = None) -> Dict:
+        """
+        Download every URL, running up to `max_workers` downloads in parallel.
+
+        Args:
+            urls (Iterable[str]): URLs to download, e.g. from url_loader.URLLoader.urls()
+            quality (str): Video quality
+            audio_only (bool): Download audio only
+            on_result (Callable): Called with each URL's result dict
+
+        Returns:
+            Dict: Summary from run_jobs
+        """
+        def jobs():
+            for job_id, url in enumerate(urls, 1):
+                downloader = self.make_downloader(job_id, url)
+                yield job_id, url, (lambda d=downloader, u=url:
+                                    d.download_video(u, quality, audio_only))
+
+        return self.run_jobs(jobs(), on_result)
+
+
+def main():
+    """Simple command-line interface for testing."""
+    import sys
+    from url_loader import URLLoader
+
+    if len(sys.argv) < 2:
+        print("Usage: python batch_downloader.py <url_file> [workers]")
+        return
+
+    loader = URLLoader(sys.argv[1])
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    batch = BatchDownloader(max_workers=workers)
+
+    def progress_callback(info):
+        if info.get('status') == 'finished':
+            print(f"[job {info['job_id']}] Finished: {info['filename']}")
+
+    batch.set_progress_callback(progress_callback)
+    summary = batch.download_all(loader.urls())
+    print(loader.summary())
+    print(f"\n{summary['total'] - summary['failed']} succeeded, {summary['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
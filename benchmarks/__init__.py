@@ -0,0 +1 @@
+"""Benchmarks for YouTube Video Downloader, run against a local fake video server."""
@@ -0,0 +1,83 @@
+"""
+Benchmark drivers: each downloads one URL through a different entry point.
+Each runs in its own child process (started by run_benchmarks.py) so CPU
+time and peak memory can be measured per scenario:
+
+    python -m benchmarks.drivers <driver> <url> <output_dir>
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def engine_driver(url: str, output: str):
+    """The shared engine (root YouTubeDownloader)."""
+    from download_engine import YouTubeDownloader
+    return YouTubeDownloader(output).download_video(url)
+
+
+def v2_youtube_driver(url: str, output: str):
+    """The v2 GUI's own YouTubeDownloader."""
+    sys.path.insert(0, str(ROOT / 'v2'))
+    from youtube_downloader import YouTubeDownloader
+    return YouTubeDownloader(output).download_video(url)
+
+
+def v2_platform_driver(url: str, output: str):
+    """A v2 platform function (Vimeo adapter on the shared engine)."""
+    sys.path.insert(0, str(ROOT / 'v2'))
+    from vimeo_downloader import download_vimeo_video
+    return download_vimeo_video(url, output)
+
+
+DRIVERS = {
+    'engine': engine_driver,
+    'v2-youtube': v2_youtube_driver,
+    'v2-platform': v2_platform_driver,
+}
+
+# The CLI runs as its own interpreter, the way a user starts it
+DRIVER_NAMES = list(DRIVERS) + ['cli']
+
+
+def driver_command(driver: str, url: str, output: str) -> List[str]:
+    """
+    Get the command line that runs a driver in a fresh interpreter.
+
+    Args:
+        driver (str): One of DRIVER_NAMES
+        url (str): URL to download
+        output (str): Output directory
+
+    Returns:
+        List[str]: Command for subprocess
+    """
+    if driver == 'cli':
+        return [sys.executable, str(ROOT / 'cli.py'), 'download', url, '-o', output]
+    if driver not in DRIVERS:
+        raise Exception(f"Unknown driver: {driver}")
+    return [sys.executable, '-m', 'benchmarks.drivers', driver, url, output]
+
+
+def main():
+    if len(sys.argv) != 4 or sys.argv[1] not in DRIVERS:
+        print(f"Usage: python -m benchmarks.drivers <{'|'.join(DRIVERS)}> <url> <output_dir>")
+        sys.exit(2)
+
+    driver, url, output = sys.argv[1:]
+    sys.path.insert(0, str(ROOT))
+    start = time.perf_counter()
+    try:
+        message = DRIVERS[driver](url, output)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"{message} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Local fake video server for benchmarks.
+Serves synthetic progressive files, HLS playlists and DASH manifests with
+their fragments, with optional latency and bandwidth caps, so downloads can
+be measured without network access.
+
+URL layout (sizes in bytes):
+    /progressive/<size>.mp4
+    /hls/<count>x<size>/index.m3u8, /hls/<count>x<size>/seg<N>.ts
+    /dash/<count>x<size>/manifest.mpd, /dash/<count>x<size>/init.mp4,
+    /dash/<count>x<size>/seg<N>.m4s
+"""
+
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+CHUNK_SIZE = 64 * 1024
+SEGMENT_SECONDS = 2
+INIT_SIZE = 1024
+
+# Repeating pattern the synthetic files are cut from
+_PATTERN = bytes(range(256)) * (CHUNK_SIZE // 256 + 1)
+
+_PROGRESSIVE_RE = re.compile(r'^/progressive/(\d+)\.mp4$')
+_STREAM_RE = re.compile(r'^/(hls|dash)/(\d+)x(\d+)/([\w.]+)$')
+_SEGMENT_RE = re.compile(r'^seg(\d+)\.(?:ts|m4s)$')
+
+
+def hls_playlist(count: int) -> bytes:
+    """Build an HLS media playlist of `count` segments."""
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{SEGMENT_SECONDS}',
+             '#EXT-X-MEDIA-SEQUENCE:0', '#EXT-X-PLAYLIST-TYPE:VOD']
+    for i in range(count):
+        lines += [f'#EXTINF:{SEGMENT_SECONDS}.0,', f'seg{i}.ts']
+    lines.append('#EXT-X-ENDLIST')
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def dash_manifest(count: int) -> bytes:
+    """Build a static DASH manifest with one muxed representation of `count` segments."""
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" minBufferTime="PT2S"
+     mediaPresentationDuration="PT{count * SEGMENT_SECONDS}S"
+     profiles="urn:mpeg:dash:profile:isoff-live:2011">
+  <Period id="0">
+    <AdaptationSet mimeType="video/mp4" segmentAlignment="true">
+      <Representation id="720p" bandwidth="2000000" width="1280" height="720"
+                      codecs="avc1.4d401f,mp4a.40.2">
+        <SegmentTemplate timescale="1" duration="{SEGMENT_SECONDS}" startNumber="0"
+                         initialization="init.mp4" media="seg$Number$.m4s"/>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>
+'''.encode()
+
+
+class ServerStats:
+    """Counters of one benchmark run, reset between scenarios."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.perf_counter()
+            self.first_media_byte: Optional[float] = None
+            self.media_bytes = 0
+            self.requests = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_media(self, sent: int):
+        with self._lock:
+            if self.first_media_byte is None:
+                self.first_media_byte = time.perf_counter()
+            self.media_bytes += sent
+
+    def snapshot(self) -> Dict:
+        """Counters since the last reset; ttfb is seconds until the first media byte was sent."""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'media_bytes': self.media_bytes,
+                'ttfb': (self.first_media_byte - self.started
+                         if self.first_media_byte is not None else None),
+            }
+
+
+class FakeVideoHandler(BaseHTTPRequestHandler):
+    """Request handler of FakeVideoServer."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _resolve(self) -> Optional[Tuple[str, object, bool]]:
+        """Map the path to (content type, bytes or size, is_media)."""
+        path = self.path.split('?', 1)[0]
+        match = _PROGRESSIVE_RE.match(path)
+        if match:
+            return 'video/mp4', int(match.group(1)), True
+
+        match = _STREAM_RE.match(path)
+        if not match:
+            return None
+        kind, count, size, name = match.group(1), int(match.group(2)), int(match.group(3)), match.group(4)
+        if kind == 'hls' and name == 'index.m3u8':
+            return 'application/vnd.apple.mpegurl', hls_playlist(count), False
+        if kind == 'dash' and name == 'manifest.mpd':
+            return 'application/dash+xml', dash_manifest(count), False
+        if kind == 'dash' and name == 'init.mp4':
+            return 'video/mp4', INIT_SIZE, True
+        segment = _SEGMENT_RE.match(name)
+        if segment and int(segment.group(1)) < count:
+            return ('video/mp2t' if kind == 'hls' else 'video/iso.segment'), size, True
+        return None
+
+    def _handle(self, send_body: bool):
+        server: FakeVideoServer = self.server
+        server.stats.record_request()
+        resolved = self._resolve()
+        if resolved is None:
+            self.send_error(404)
+            return
+        content_type, body, is_media = resolved
+        total = body if isinstance(body, int) else len(body)
+
+        start, end = 0, total - 1
+        status = 200
+        range_header = self.headers.get('Range')
+        range_match = re.match(r'bytes=(\d*)-(\d*)$', range_header or '')
+        if range_match and isinstance(body, int) and range_match.group(0) != 'bytes=-':
+            first, last = range_match.groups()
+            if first:
+                start, end = int(first), min(int(last), total - 1) if last else total - 1
+            else:
+                start, end = max(0, total - int(last)), total - 1
+            if start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{total}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = 206
+
+        if server.latency:
+            time.sleep(server.latency)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes' if isinstance(body, int) else 'none')
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{total}')
+        self.end_headers()
+        if not send_body:
+            return
+
+        if not isinstance(body, int):
+            self.wfile.write(body)
+            return
+        self._send_synthetic(start, end, is_media)
+
+    def _send_synthetic(self, start: int, end: int, is_media: bool):
+        """Write bytes start..end of a synthetic file, honouring the bandwidth cap."""
+        server: FakeVideoServer = self.server
+        bandwidth = server.bandwidth
+        began = time.perf_counter()
+        sent = 0
+        offset = start
+        try:
+            while offset <= end:
+                length = min(CHUNK_SIZE, end - offset + 1)
+                shift = offset % 256
+                self.wfile.write(_PATTERN[shift:shift + length])
+                offset += length
+                sent += length
+                if is_media:
+                    server.stats.record_media(length)
+                if bandwidth:
+                    # Sleep until the connection is back under its cap
+                    delay = sent / bandwidth - (time.perf_counter() - began)
+                    if delay > 0:
+                        time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            # Clients often stop reading early, e.g. when probing a direct link
+            self.close_connection = True
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+
+class FakeVideoServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server of synthetic videos.
+
+    Latency is added before every response, and bandwidth is capped per
+    connection, so multi-connection downloads can be compared with single
+    ones. Both can be changed between scenarios.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 bandwidth: float = 0.0):
+        """
+        Initialize the server.
+
+        Args:
+            host (str): Interface to bind
+            port (int): Port to bind, 0 for any free port
+            latency (float): Seconds to wait before each response
+            bandwidth (float): Bytes per second per connection, 0 for unlimited
+        """
+        super().__init__((host, port), FakeVideoHandler)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.stats = ServerStats()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def progressive_url(self, size: int) -> str:
+        return f'{self.base_url}/progressive/{size}.mp4'
+
+    def hls_url(self, count: int, size: int) -> str:
+        return f'{self.base_url}/hls/{count}x{size}/index.m3u8'
+
+    def dash_url(self, count: int, size: int) -> str:
+        return f'{self.base_url}/dash/{count}x{size}/manifest.mpd'
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-video-server',
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve synthetic videos for benchmarks')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--bandwidth-mb', type=float, default=0, help='MB/s per connection')
+    args = parser.parse_args()
+
+    server = FakeVideoServer(port=args.port, latency=args.latency_ms / 1000,
+                             bandwidth=args.bandwidth_mb * 1024 * 1024)
+    print(f"Serving on {server.base_url}, e.g. {server.progressive_url(10 * 1024 * 1024)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
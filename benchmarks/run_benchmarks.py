@@ -0,0 +1,212 @@
+"""
+Benchmark runner for YouTube Video Downloader.
+Starts the fake video server, downloads each scenario through each driver
+in a fresh process, and reports throughput, time to first byte, CPU time
+and peak memory.
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --scenarios hls dash --drivers engine --repeat 3
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.drivers import DRIVER_NAMES, ROOT, driver_command
+from benchmarks.fake_server import FakeVideoServer
+
+MB = 1024 * 1024
+
+
+def default_scenarios(size_mb: float = 64, segments: int = 40, segment_mb: float = 1,
+                      latency_ms: float = 20, bandwidth_mb: float = 8) -> Dict[str, Dict]:
+    """
+    Build the standard scenarios.
+
+    Args:
+        size_mb (float): Size of progressive files
+        segments (int): Fragments per HLS/DASH stream
+        segment_mb (float): Size of each fragment
+        latency_ms (float): Response latency of the latency-bound scenarios
+        bandwidth_mb (float): Per-connection cap (MB/s) of the bandwidth-bound scenario
+
+    Returns:
+        Dict[str, Dict]: Scenario name -> {kind, size, count, latency, bandwidth}
+    """
+    size = int(size_mb * MB)
+    segment_size = int(segment_mb * MB)
+    return {
+        'progressive': {'kind': 'progressive', 'size': size, 'latency': 0, 'bandwidth': 0},
+        'progressive-capped': {'kind': 'progressive', 'size': size,
+                               'latency': latency_ms / 1000, 'bandwidth': bandwidth_mb * MB},
+        'hls': {'kind': 'hls', 'size': segment_size, 'count': segments,
+                'latency': latency_ms / 1000, 'bandwidth': 0},
+        'dash': {'kind': 'dash', 'size': segment_size, 'count': segments,
+                 'latency': latency_ms / 1000, 'bandwidth': 0},
+    }
+
+
+def scenario_url(server: FakeVideoServer, scenario: Dict) -> str:
+    if scenario['kind'] == 'progressive':
+        return server.progressive_url(scenario['size'])
+    if scenario['kind'] == 'hls':
+        return server.hls_url(scenario['count'], scenario['size'])
+    return server.dash_url(scenario['count'], scenario['size'])
+
+
+def expected_bytes(scenario: Dict) -> int:
+    if scenario['kind'] == 'progressive':
+        return scenario['size']
+    extra = 1024 if scenario['kind'] == 'dash' else 0  # init segment
+    return scenario['count'] * scenario['size'] + extra
+
+
+def _run_child(command: List[str], env: Dict) -> Dict:
+    """Run a command and measure its wall time, CPU time and peak RSS."""
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=str(ROOT), env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    cpu = peak_rss = None
+    if hasattr(os, 'wait4'):
+        # Read output first so a chatty child cannot block on a full pipe
+        output = process.stdout.read()
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        cpu = usage.ru_utime + usage.ru_stime
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        peak_rss = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    else:
+        output, _ = process.communicate()
+    wall = time.perf_counter() - start
+    return {'wall': wall, 'cpu': cpu, 'peak_rss': peak_rss, 'returncode': process.returncode,
+            'output': output.decode('utf-8', errors='replace').strip()}
+
+
+def _downloaded_bytes(output_dir: Path) -> int:
+    return sum(f.stat().st_size for f in output_dir.rglob('*')
+               if f.is_file() and not f.name.endswith(('.part', '.ytdl', '.segments')))
+
+
+def run_scenario(server: FakeVideoServer, name: str, scenario: Dict, driver: str) -> Dict:
+    """
+    Download one scenario with one driver and collect its measurements.
+
+    The child process gets its own home directory, so configuration,
+    metadata caches and archives of the user (or of earlier runs) do not
+    affect the result.
+
+    Returns:
+        Dict: Measurements (MB/s, TTFB, CPU seconds, peak RSS, ...)
+    """
+    server.latency = scenario.get('latency', 0)
+    server.bandwidth = scenario.get('bandwidth', 0)
+    work_dir = Path(tempfile.mkdtemp(prefix='ytd-bench-'))
+    output_dir = work_dir / 'downloads'
+    env = dict(os.environ, HOME=str(work_dir), USERPROFILE=str(work_dir),
+               PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])))
+    try:
+        server.stats.reset()
+        child = _run_child(driver_command(driver, scenario_url(server, scenario), str(output_dir)),
+                           env)
+        stats = server.stats.snapshot()
+        size = _downloaded_bytes(output_dir) if output_dir.exists() else 0
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    ok = child['returncode'] == 0 and size == expected_bytes(scenario)
+    error = None
+    if not ok:
+        lines = child['output'].splitlines()
+        error = lines[-1] if lines else f"exit code {child['returncode']}"
+        if child['returncode'] == 0:
+            error = f"got {size} of {expected_bytes(scenario)} bytes: {error}"
+    return {
+        'scenario': name,
+        'driver': driver,
+        'ok': ok,
+        'error': error,
+        'bytes': size,
+        'wall_s': round(child['wall'], 3),
+        'mb_per_s': round(size / MB / child['wall'], 2) if child['wall'] else None,
+        'ttfb_s': round(stats['ttfb'], 3) if stats['ttfb'] is not None else None,
+        'cpu_s': round(child['cpu'], 3) if child['cpu'] is not None else None,
+        'peak_rss_mb': round(child['peak_rss'] / MB, 1) if child['peak_rss'] else None,
+        'requests': stats['requests'],
+    }
+
+
+def _format_value(value: Optional[float], unit: str = '') -> str:
+    return '-' if value is None else f"{value}{unit}"
+
+
+def print_results(results: List[Dict]):
+    """Print results as an aligned table."""
+    header = f"{'scenario':<20}{'driver':<13}{'MB/s':>9}{'TTFB s':>9}{'CPU s':>9}{'RSS MB':>9}{'wall s':>9}  status"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['scenario']:<20}{r['driver']:<13}{_format_value(r['mb_per_s']):>9}"
+              f"{_format_value(r['ttfb_s']):>9}{_format_value(r['cpu_s']):>9}"
+              f"{_format_value(r['peak_rss_mb']):>9}{r['wall_s']:>9}  "
+              f"{'ok' if r['ok'] else 'FAILED: ' + str(r['error'])}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark downloads against a local fake video server')
+    parser.add_argument('--scenarios', nargs='+', help='Scenarios to run (default: all)')
+    parser.add_argument('--drivers', nargs='+', choices=DRIVER_NAMES,
+                        help='Entry points to benchmark (default: all)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per scenario and driver')
+    parser.add_argument('--size-mb', type=float, default=64, help='Progressive file size')
+    parser.add_argument('--segments', type=int, default=40, help='Fragments per HLS/DASH stream')
+    parser.add_argument('--segment-mb', type=float, default=1, help='Fragment size')
+    parser.add_argument('--latency-ms', type=float, default=20,
+                        help='Response latency of the capped and fragmented scenarios')
+    parser.add_argument('--bandwidth-mb', type=float, default=8,
+                        help='Per-connection cap (MB/s) of progressive-capped')
+    parser.add_argument('--json', metavar='FILE', help='Also write results as JSON lines')
+    args = parser.parse_args(argv)
+
+    scenarios = default_scenarios(args.size_mb, args.segments, args.segment_mb,
+                                  args.latency_ms, args.bandwidth_mb)
+    names = args.scenarios or list(scenarios)
+    unknown = [name for name in names if name not in scenarios]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(scenarios)})")
+
+    server = FakeVideoServer().start()
+    results = []
+    try:
+        for name in names:
+            for driver in args.drivers or DRIVER_NAMES:
+                for _ in range(args.repeat):
+                    result = run_scenario(server, name, scenarios[name], driver)
+                    results.append(result)
+                    print(f"  {name} / {driver}: "
+                          f"{'ok' if result['ok'] else 'failed'} in {result['wall_s']}s",
+                          file=sys.stderr)
+    finally:
+        server.stop()
+
+    print_results(results)
+    if args.json:
+        with open(args.json, 'a', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(dict(result, time=time.time())) + '\n')
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
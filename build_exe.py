@@ -46,6 +46,7 @@ def main():
         # Fallback to simple build
         simple_command = (
             "pyinstaller --onefile --windowed --name YouTubeDownloader "
+            "--add-data download_engine.py;. "
             "--add-data youtube_downloader.py;. "
             "--add-data gui.py;. "
             "--add-data cli.py;. "
@@ -4,19 +4,87 @@ Command-line interface for YouTube Video Downloader.
 Provides a comprehensive CLI for downloading YouTube videos and playlists.
 """
 
+import time
+_start_time = time.perf_counter()
+
 import argparse
+import builtins
+import itertools
 import sys
 import os
+import threading
 from pathlib import Path
-from youtube_downloader import YouTubeDownloader
+
+# yt_dlp (through download_engine), tkinter and PIL are only imported by
+# the commands that need them, so --help and argument errors stay fast
+
+# Quality settings; 'NNNp' caps the resolution, 'NNNp+' takes the smallest file at or above it
+QUALITIES = (['best', 'worst', '1080p', '720p', '480p', '360p', '240p']
+             + ['1080p+', '720p+', '480p+'])
+
+
+class ImportProfiler:
+    """Measure how long module imports take, for --profile-startup."""
+    
+    def __init__(self):
+        self.imports = []  # (module name, seconds including its own imports)
+        self._original_import = None
+        self._local = threading.local()
+    
+    def install(self):
+        """Start timing imports of modules that are not loaded yet."""
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+    
+    def uninstall(self):
+        if self._original_import:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+    
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._local.depth = depth
+            # Nested imports are included in the time of the outermost one
+            if depth == 0:
+                self.imports.append((name, time.perf_counter() - start))
+    
+    def report(self, stages: dict, limit: int = 15):
+        """Print stage and import timings to stderr."""
+        out = sys.stderr
+        print("\n⏱️  Startup profile", file=out)
+        for stage, seconds in stages.items():
+            print(f"  {stage:<44} {seconds * 1000:8.1f} ms", file=out)
+        
+        print("  Slowest imports:", file=out)
+        for name, seconds in sorted(self.imports, key=lambda item: item[1], reverse=True)[:limit]:
+            print(f"    {name:<42} {seconds * 1000:8.1f} ms", file=out)
+        
+        heavy = [name for name in ('yt_dlp', 'tkinter', 'PIL') if name in sys.modules]
+        print(f"  Heavy modules loaded: {', '.join(heavy) or 'none'}", file=out)
 
 
 class YouTubeDownloaderCLI:
     """Command-line interface for YouTube downloader."""
     
     def __init__(self):
-        self.downloader = YouTubeDownloader()
-        self.setup_progress_callback()
+        self._downloader = None
+    
+    @property
+    def downloader(self):
+        """The YouTube downloader, created (and yt-dlp imported) on first use."""
+        if self._downloader is None:
+            from download_engine import YouTubeDownloader
+            self._downloader = YouTubeDownloader()
+            self.setup_progress_callback()
+        return self._downloader
         
     def setup_progress_callback(self):
         """Setup progress callback for CLI."""
@@ -37,7 +105,18 @@ class YouTubeDownloaderCLI:
             elif info.get('status') == 'finished':
                 print(f"\n✓ Finished: {os.path.basename(info.get('filename', ''))}")
         
-        self.downloader.set_progress_callback(progress_callback)
+        self._downloader.set_progress_callback(progress_callback)
+    
+    def apply_segments(self, args):
+        """Override the configured connections per file with --segments."""
+        if args.segments:
+            from config import config
+            config.set('download_segments', args.segments)
+            if self._downloader:
+                self._downloader.segments = args.segments
+        if args.max_size:
+            from config import config
+            config.set('max_filesize_mb', args.max_size)
     
     def info_command(self, args):
         """Handle info command."""
@@ -54,8 +133,8 @@ class YouTubeDownloaderCLI:
             
             if args.show_formats:
                 print("\n📋 Available Formats:")
-                video_formats = [f for f in info['formats'] if f['height']]
-                audio_formats = [f for f in info['formats'] if not f['height'] and f['acodec'] != 'none']
+                video_formats = info['formats'].video()
+                audio_formats = info['formats'].audio()
                 
                 if video_formats:
                     print("\nVideo Formats:")
@@ -85,6 +164,9 @@ class YouTubeDownloaderCLI:
     def download_command(self, args):
         """Handle download command."""
         try:
+            # Before the downloader is created, so playlist entries use it too
+            self.apply_segments(args)
+            
             # Set download path
             if args.output:
                 self.downloader.download_path = Path(args.output)
@@ -92,13 +174,20 @@ class YouTubeDownloaderCLI:
             
             print(f"📁 Download path: {self.downloader.download_path}")
             
+            if args.archive is not None:
+                from download_archive import DownloadArchive
+                self.downloader.archive = DownloadArchive(args.archive or None)
+                print(f"🗂️ Download archive: {self.downloader.archive.archive_file}")
+            
             if args.playlist:
                 print("📺 Starting playlist download...")
                 result = self.downloader.download_playlist(
                     args.url, 
                     args.quality, 
                     args.audio_only,
-                    args.max_downloads
+                    args.max_downloads,
+                    parallel=args.parallel,
+                    workers=args.workers
                 )
             else:
                 print("📺 Starting video download...")
@@ -108,6 +197,8 @@ class YouTubeDownloaderCLI:
                     args.audio_only,
                     args.filename
                 )
+                if self.downloader.last_selection:
+                    print(f"\n🎯 {self.downloader.last_selection.explain()}")
             
             print(f"\n✅ {result}")
             return 0
@@ -116,6 +207,119 @@ class YouTubeDownloaderCLI:
             print(f"\n❌ Download failed: {e}")
             return 1
     
+    def batch_command(self, args):
+        """Handle batch command."""
+        from batch_downloader import BatchDownloader
+        from config import config
+        from url_loader import URLLoader
+        
+        try:
+            loader = URLLoader(args.file, dedupe=args.dedupe)
+            urls = loader.urls()
+            # Read up to the first URL so empty files fail before any setup
+            first_url = next(urls, None)
+        except Exception as e:
+            print(f"❌ Could not read {args.file}: {e}")
+            return 1
+        if first_url is None:
+            print(f"❌ No valid URLs found in {args.file}")
+            return 1
+        
+        self.apply_segments(args)
+        archive = None
+        if args.archive is not None:
+            from download_archive import DownloadArchive
+            archive = DownloadArchive(args.archive or None)
+        
+        batch = BatchDownloader(args.output or config.get('download_path', 'downloads'),
+                                args.workers, archive=archive)
+        
+        def progress_callback(info):
+            if info.get('status') == 'finished':
+                print(f"✓ [{info['job_id']}] Finished: "
+                      f"{os.path.basename(info.get('filename', ''))}")
+        
+        batch.set_progress_callback(progress_callback)
+        
+        print(f"📁 Download path: {batch.download_path}")
+        print(f"📺 Downloading videos from {args.file} with {batch.max_workers} workers...")
+        summary = batch.download_all(itertools.chain([first_url], urls),
+                                     args.quality, args.audio_only)
+        
+        for result in summary['failures']:
+            print(f"❌ {result['url']}: {result['error']}")
+        print(f"📋 {loader.summary()}")
+        print(f"\n✅ {summary['total'] - summary['failed']} downloaded, {summary['failed']} failed")
+        return 1 if summary['failed'] else 0
+    
+    def queue_command(self, args):
+        """Handle queue command."""
+        from config import config
+        from job_queue import JobQueue
+        from utils import format_bytes
+        
+        job_queue = JobQueue(args.db)
+        
+        if args.action == 'add':
+            urls = list(args.urls)
+            loader = None
+            if args.file:
+                from url_loader import URLLoader
+                loader = URLLoader(args.file, dedupe=args.dedupe)
+            if not urls and not args.file:
+                print("❌ No URLs to add")
+                return 1
+            options = {'quality': args.quality, 'audio_only': args.audio_only}
+            if args.output:
+                options['output'] = args.output
+            try:
+                # File URLs are streamed straight into the insert transaction
+                added = job_queue.enqueue_many(
+                    itertools.chain(urls, loader.urls() if loader else ()), **options)
+            except Exception as e:
+                print(f"❌ Could not add jobs: {e}")
+                return 1
+            if loader:
+                print(f"📋 {loader.summary()}")
+            print(f"✅ Added {added} jobs to the queue")
+            return 0
+        
+        if args.action == 'list':
+            jobs = job_queue.list_jobs(args.status)
+            if not jobs:
+                print("📋 The queue is empty")
+            for job in jobs:
+                progress = ""
+                if job['total_bytes']:
+                    progress = (f" {format_bytes(job['bytes_done'])}/"
+                                f"{format_bytes(job['total_bytes'])}")
+                print(f"  #{job['id']:<5} {job['status']:<10}{progress}  {job['url']}")
+                if job['error']:
+                    print(f"         ❌ {job['error']}")
+            return 0
+        
+        if args.action == 'resume':
+            requeued = job_queue.resume(args.ids or None)
+            print(f"🔄 Requeued {requeued} jobs")
+        elif args.action == 'clear':
+            removed = job_queue.remove_finished()
+            print(f"🧹 Removed {removed} finished jobs")
+            return 0
+        
+        # run (and resume) download every pending job
+        def progress_callback(info):
+            if info.get('status') == 'finished':
+                print(f"✓ [job {info['job_id']}] Finished: "
+                      f"{os.path.basename(info.get('filename', ''))}")
+        
+        print("📺 Running queued downloads...")
+        summary = job_queue.run(args.output or config.get('download_path', 'downloads'),
+                                args.workers, progress_callback)
+        for result in summary['failures']:
+            print(f"❌ [job {result['job_id']}] {result['url']}: {result['error']}")
+        print(f"\n✅ {summary['total'] - summary['failed']} jobs done, {summary['failed']} failed")
+        return 1 if summary['failed'] else 0
+    
     def list_qualities_command(self, args):
         """Handle list-qualities command."""
         try:
@@ -143,11 +347,31 @@ Examples:
   %(prog)s info "https://www.youtube.com/watch?v=..."
   %(prog)s download "https://www.youtube.com/watch?v=..." --quality 720p
   %(prog)s download "https://www.youtube.com/watch?v=..." --audio-only
+  %(prog)s --fast-audio batch podcasts.txt --audio-only
   %(prog)s download "https://www.youtube.com/playlist?list=..." --playlist
+  %(prog)s download "https://www.youtube.com/playlist?list=..." --playlist --archive
   %(prog)s list-qualities "https://www.youtube.com/watch?v=..."
+  %(prog)s batch urls.txt --workers 4
+  %(prog)s queue add "https://www.youtube.com/watch?v=..."
+  %(prog)s queue run --workers 4
         """
     )
     
+    parser.add_argument('--profile-startup', action='store_true',
+                       help='Report startup and import timings on stderr')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                       help='Serve Prometheus metrics on 127.0.0.1:PORT while running '
+                            '(default: config metrics_port)')
+    parser.add_argument('--metrics-log', metavar='FILE',
+                       help='Append one JSON line with phase timings per download job')
+    parser.add_argument('--limit-rate', type=float, metavar='KBPS',
+                       help='Cap all downloads together at KBPS KB/s (default: config rate_limit)')
+    parser.add_argument('--job-limit-rate', type=float, metavar='KBPS',
+                       help='Cap each download at KBPS KB/s (default: config rate_limit_per_job)')
+    parser.add_argument('--fast-audio', action='store_true',
+                       help='Keep the original audio codec (AAC, Opus) of audio-only downloads '
+                            'instead of converting to MP3')
+    
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
     # Info command
@@ -164,8 +388,8 @@ Examples:
     download_parser = subparsers.add_parser('download', help='Download video or playlist')
     download_parser.add_argument('url', help='YouTube video or playlist URL')
     download_parser.add_argument('-q', '--quality', default='best',
-                               choices=['best', 'worst', '1080p', '720p', '480p', '360p', '240p'],
-                               help='Video quality (default: best)')
+                               choices=QUALITIES,
+                               help='Video quality; 720p+ picks the smallest file of at least 720p (default: best)')
     download_parser.add_argument('-a', '--audio-only', action='store_true',
                                help='Download audio only (MP3)')
     download_parser.add_argument('-o', '--output', 
@@ -176,6 +400,74 @@ Examples:
                                help='Download as playlist')
     download_parser.add_argument('-m', '--max-downloads', type=int,
                                help='Maximum number of videos to download from playlist')
+    download_parser.add_argument('--parallel', action='store_true',
+                               help='Download playlist entries in parallel')
+    download_parser.add_argument('-w', '--workers', type=int,
+                               help='Number of parallel playlist downloads (default: max_concurrent_downloads)')
+    download_parser.add_argument('--segments', type=int, metavar='N',
+                               help='Connections per file for large downloads (default: download_segments)')
+    download_parser.add_argument('--max-size', type=float, metavar='MB',
+                               help='Pick formats that fit in MB per video (default: max_filesize_mb)')
+    download_parser.add_argument('--archive', nargs='?', const='', metavar='FILE',
+                               help='Skip videos listed in the download archive and record new ones '
+                                    '(default file: ~/.youtube_downloader/download_archive.txt)')
+    
+    # Batch command
+    batch_parser = subparsers.add_parser('batch', help='Download many URLs from a file in parallel')
+    batch_parser.add_argument('file', help='Text, CSV or JSONL file of URLs (may be gzip-compressed)')
+    batch_parser.add_argument('-w', '--workers', type=int,
+                            help='Number of parallel downloads (default: max_concurrent_downloads)')
+    batch_parser.add_argument('-q', '--quality', default='best',
+                            choices=QUALITIES,
+                            help='Video quality (default: best)')
+    batch_parser.add_argument('-a', '--audio-only', action='store_true',
+                            help='Download audio only (MP3)')
+    batch_parser.add_argument('-o', '--output',
+                            help='Output directory (default: downloads)')
+    batch_parser.add_argument('--segments', type=int, metavar='N',
+                            help='Connections per file for large downloads (default: download_segments)')
+    batch_parser.add_argument('--max-size', type=float, metavar='MB',
+                            help='Pick formats that fit in MB per video (default: max_filesize_mb)')
+    batch_parser.add_argument('--archive', nargs='?', const='', metavar='FILE',
+                            help='Skip videos listed in the download archive and record new ones')
+    batch_parser.add_argument('--dedupe', default='set', choices=['set', 'bloom', 'none'],
+                            help='Drop repeated URLs exactly (set), in fixed memory (bloom) or not at all')
+    
+    # Queue command
+    queue_parser = subparsers.add_parser('queue', help='Manage the persistent download queue')
+    queue_parser.add_argument('--db', help='Queue database file (default: ~/.youtube_downloader/jobs.db)')
+    queue_subparsers = queue_parser.add_subparsers(dest='action', required=True)
+    
+    queue_add_parser = queue_subparsers.add_parser('add', help='Add URLs to the queue')
+    queue_add_parser.add_argument('urls', nargs='*', help='Video URLs')
+    queue_add_parser.add_argument('--file', help='Text, CSV or JSONL file of URLs (may be gzip-compressed)')
+    queue_add_parser.add_argument('--dedupe', default='set', choices=['set', 'bloom', 'none'],
+                                help='Drop repeated URLs from the file (default: set)')
+    queue_add_parser.add_argument('-q', '--quality', default='best',
+                                choices=QUALITIES,
+                                help='Video quality; 720p+ picks the smallest file of at least 720p (default: best)')
+    queue_add_parser.add_argument('-a', '--audio-only', action='store_true',
+                                help='Download audio only (MP3)')
+    queue_add_parser.add_argument('-o', '--output', help='Output directory for these jobs')
+    
+    queue_list_parser = queue_subparsers.add_parser('list', help='List queued jobs')
+    queue_list_parser.add_argument('--status',
+                                 choices=['pending', 'running', 'paused', 'finished',
+                                          'failed', 'cancelled'],
+                                 help='Only show jobs with this status')
+    
+    for action, action_help in (('run', 'Download all pending jobs'),
+                                ('resume', 'Requeue interrupted or failed jobs and run them')):
+        action_parser = queue_subparsers.add_parser(action, help=action_help)
+        if action == 'resume':
+            action_parser.add_argument('ids', nargs='*', type=int,
+                                     help='Job IDs to resume (default: all)')
+        action_parser.add_argument('-w', '--workers', type=int,
+                                 help='Number of parallel downloads (default: max_concurrent_downloads)')
+        action_parser.add_argument('-o', '--output',
+                                 help='Output directory (default: downloads)')
+    
+    queue_subparsers.add_parser('clear', help='Remove finished jobs')
     
     # List qualities command
     qualities_parser = subparsers.add_parser('list-qualities', 
@@ -187,20 +479,85 @@ Examples:
 
 def main():
     """Main CLI entry point."""
-    parser = create_parser()
-    args = parser.parse_args()
+    profiler = None
+    if '--profile-startup' in sys.argv:
+        profiler = ImportProfiler()
+        profiler.install()
+    main_start = time.perf_counter()
+    parsed = None
     
-    if not args.command:
-        parser.print_help()
-        return 1
+    try:
+        parser = create_parser()
+        args = parser.parse_args()
+        parsed = time.perf_counter()
+        
+        if not args.command:
+            parser.print_help()
+            return 1
+        
+        return run_command(parser, args)
+    finally:
+        if profiler:
+            profiler.uninstall()
+            end = time.perf_counter()
+            stages = {'Module import (cli)': main_start - _start_time}
+            if parsed is not None:
+                stages['Argument parsing'] = parsed - main_start
+                stages['Command'] = end - parsed
+            stages['Total'] = end - _start_time
+            profiler.report(stages)
+
+
+def start_metrics(args):
+    """Enable the metrics endpoint and job log requested on the command line or in the config."""
+    from config import config
     
+    if not (args.metrics_port or args.metrics_log or config.get('metrics_port')):
+        return
+    from metrics import metrics, serve_configured
+    
+    if args.metrics_log:
+        metrics.log_file = args.metrics_log
+    server = metrics.serve(args.metrics_port) if args.metrics_port else serve_configured()
+    if server:
+        host, port = server.server_address[:2]
+        print(f"📈 Metrics on http://{host}:{port}/metrics")
+
+
+def apply_rate_limits(args):
+    """Override the configured bandwidth limits with command line options."""
+    if args.limit_rate is None and args.job_limit_rate is None:
+        return
+    from bandwidth import scheduler
+    
+    scheduler.configure(
+        global_limit=args.limit_rate * 1024 if args.limit_rate is not None else None,
+        job_limit=args.job_limit_rate * 1024 if args.job_limit_rate is not None else None)
+
+
+def apply_fast_audio(args):
+    """Stream-copy audio-only downloads instead of converting them with --fast-audio."""
+    if args.fast_audio:
+        from config import config
+        config.set('fast_audio', True)
+
+
+def run_command(parser, args):
+    """Run the selected subcommand."""
     cli = YouTubeDownloaderCLI()
     
     try:
+        start_metrics(args)
+        apply_rate_limits(args)
+        apply_fast_audio(args)
         if args.command == 'info':
             return cli.info_command(args)
         elif args.command == 'download':
             return cli.download_command(args)
+        elif args.command == 'batch':
+            return cli.batch_command(args)
+        elif args.command == 'queue':
+            return cli.queue_command(args)
         elif args.command == 'list-qualities':
             return cli.list_qualities_command(args)
         else:
@@ -12,6 +12,13 @@ DEFAULT_SETTINGS = {
     'default_format': 'mp4',
     'audio_format': 'mp3',
     'audio_quality': '192',
+    'fast_audio': False,  # audio-only: copy AAC/Opus streams as-is instead of converting to MP3
+    
+    # Format selection
+    'preferred_video_codecs': ['avc1', 'vp9', 'av01'],  # most preferred first
+    'preferred_audio_codecs': ['mp4a', 'opus'],
+    'preferred_container': None,  # e.g. 'mp4' to only accept formats that end up as .mp4
+    'max_filesize_mb': None,  # size budget per video, None for no limit
     
     # Paths
     'download_path': 'downloads',
@@ -26,10 +33,46 @@ DEFAULT_SETTINGS = {
     'max_concurrent_downloads': 3,
     'max_retries': 3,
     'retry_delay': 5,  # seconds
+    'fragment_concurrency': 4,  # HLS/DASH fragments fetched in parallel
+    'fragment_concurrency_min': 1,
+    'fragment_concurrency_max': 16,
+    'adaptive_fragment_concurrency': True,  # tune between min and max from measured speed
+    'download_segments': 1,  # connections per file, more than 1 for segmented downloads
+    'segment_min_size': 10 * 1024 * 1024,  # bytes, smaller files use one connection
+    'pipeline_postprocessing': True,  # batch downloads merge/convert on a separate pool
+    'postprocess_workers': None,  # FFmpeg jobs at once, None for one per CPU core
+    'loudnorm_integrated': -16.0,  # LUFS, EBU R128 target of audio normalization
+    'loudnorm_true_peak': -1.5,  # dBTP
+    'loudnorm_range': 11.0,  # LU
     
     # Network settings
     'timeout': 30,  # seconds
-    'rate_limit': None,  # KB/s, None for unlimited
+    'rate_limit': None,  # KB/s for all downloads together, None for unlimited
+    'rate_limit_per_job': None,  # KB/s for each download, None for unlimited
+    # Time windows overriding the limits, e.g.
+    # [{"start": "08:00", "end": "20:00", "rate_limit": 2048, "rate_limit_per_job": 512}]
+    'rate_limit_schedule': [],
+    
+    # Metadata cache
+    'metadata_cache_size': 256,  # entries kept in memory
+    'metadata_cache_ttl': 1800,  # seconds, format URLs expire after a few hours
+    'metadata_cache_persist': False,  # also keep entries in ~/.youtube_downloader
+    
+    # Download archive
+    'use_download_archive': False,  # skip videos that were downloaded before
+    'download_archive_file': None,  # None for ~/.youtube_downloader/download_archive.txt
+    
+    # Progress reporting
+    'progress_updates_per_second': 10,  # per job, 0 for every yt-dlp event
+    
+    # Metrics
+    'metrics_log_file': None,  # one JSON line per finished job, None to disable
+    'metrics_port': None,  # serve Prometheus metrics on 127.0.0.1:<port>, None to disable
+    
+    # Download daemon (main.py --serve)
+    'daemon_port': 8780,
+    'daemon_max_pending': 1000,  # jobs waiting for a worker before submissions are refused
+    'daemon_max_history': 1000,  # finished jobs kept for GET /jobs
     
     # GUI settings
     'window_width': 800,
@@ -56,9 +99,8 @@ class Config:
     
     def _get_default_config_path(self) -> str:
         """Get the default configuration file path."""
-        config_dir = Path.home() / '.youtube_downloader'
-        config_dir.mkdir(exist_ok=True)
-        return str(config_dir / 'config.json')
+        # The directory is created when something is first written to it
+        return str(Path.home() / '.youtube_downloader' / 'config.json')
     
     def load_config(self):
         """Load configuration from file."""
@@ -105,6 +147,7 @@ class Config:
             'format': self.get('default_quality'),
             'outtmpl': self.get('video_filename_template'),
             'retries': self.get('max_retries'),
+            'concurrent_fragment_downloads': self.get('fragment_concurrency'),
             'socket_timeout': self.get('timeout'),
             'extract_flat': self.get('extract_flat'),
             'writeinfojson': self.get('write_info_json'),
@@ -126,5 +169,20 @@ class Config:
         return opts
 
 
-# Global configuration instance
-config = Config()
+# Global configuration instance, created on first access so importing this
+# module (e.g. for `cli.py --help`) does not touch the home directory
+_config = None
+
+
+def get_config() -> Config:
+    """Get the global configuration, loading it on first use."""
+    global _config
+    if _config is None:
+        _config = Config()
+    return _config
+
+
+def __getattr__(name):
+    if name == 'config':
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,589 @@
+"""
+Headless download daemon for YouTube Video Downloader.
+Keeps one warm process with a bounded worker pool and serves a local
+HTTP/JSON API to submit, list and cancel downloads and to stream their
+progress, so tools do not pay interpreter and yt-dlp start-up per download.
+
+API (JSON bodies and responses):
+    GET    /health                 Daemon status and job counts
+    POST   /jobs                   Submit {"url": ...} or {"urls": [...]}, with optional
+                                   quality, audio_only, filename, output, platform, rate_limit,
+                                   fast_audio; a partly accepted bulk submit answers 207 with
+                                   {"accepted": [jobs], "rejected": [{"url", "error", "reason"}]}
+    GET    /jobs[?status=running]  List jobs
+    GET    /jobs/<id>              Get one job
+    POST   /jobs/<id>/cancel       Cancel a pending or running job (also DELETE /jobs/<id>)
+    GET    /jobs/<id>/events       Stream the job's progress as Server-Sent Events
+    GET    /events                 Stream progress of all jobs
+    GET    /metrics                Prometheus metrics
+"""
+
+import itertools
+import json
+import queue
+import signal
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from config import config
+from formats import json_default
+from job_queue import PENDING, RUNNING, FINISHED, FAILED, CANCELLED, PAUSED
+from postprocess import when_all_done
+
+# Transfer done, merging or converting on the post-processing pool
+POSTPROCESSING = 'postprocessing'
+
+TERMINAL_STATES = (FINISHED, FAILED, CANCELLED, PAUSED)
+
+# Seconds between keep-alive comments on idle event streams
+KEEPALIVE_INTERVAL = 15
+
+# Options a submitted job may set, with their defaults
+JOB_OPTIONS = {
+    'quality': 'best',
+    'audio_only': False,
+    'filename': None,
+    'output': None,
+    'platform': None,
+    'rate_limit': None,  # KB/s for this job, overriding config 'rate_limit_per_job'
+    'fast_audio': None,  # keep the source audio codec, overriding config 'fast_audio'
+}
+
+
+class DownloadDaemon:
+    """
+    Download service behind the HTTP API.
+
+    Jobs run on a fixed number of worker threads through the batch engine,
+    so every download borrows a warm yt-dlp session from the shared pool and
+    reuses the process-wide metadata cache. Submissions beyond `max_pending`
+    waiting jobs are refused instead of queueing without bound. Finished jobs
+    are kept for `max_history` entries, then the oldest are forgotten.
+    """
+
+    def __init__(self, download_path: str = None, workers: int = None,
+                 max_pending: int = None, max_history: int = None):
+        """
+        Initialize the daemon.
+
+        Args:
+            download_path (str): Directory for jobs without an 'output' option
+                (default: config 'download_path')
+            workers (int): Number of parallel downloads
+                (default: config 'max_concurrent_downloads')
+            max_pending (int): Most jobs waiting for a worker (default: config 'daemon_max_pending')
+            max_history (int): Finished jobs kept for listing (default: config 'daemon_max_history')
+        """
+        from batch_downloader import BatchDownloader
+
+        self.batch = BatchDownloader(download_path or config.get('download_path', 'downloads'),
+                                     workers)
+        self.batch.set_progress_callback(self._on_progress)
+        self.max_pending = max_pending or config.get('daemon_max_pending', 1000)
+        self.max_history = max_history or config.get('daemon_max_history', 1000)
+        self.jobs: "OrderedDict[int, Dict]" = OrderedDict()
+        self._pending = 0  # jobs in PENDING, kept as a count so submits stay O(1)
+        self._ids = itertools.count(1)
+        self._executor = ThreadPoolExecutor(max_workers=self.batch.max_workers,
+                                            thread_name_prefix='daemon-download')
+        self._subscribers: List[tuple] = []  # (job_id or None, queue.Queue)
+        self._cancel_requested = set()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def workers(self) -> int:
+        return self.batch.max_workers
+
+    def warm_up(self):
+        """Import yt-dlp and its extractors before the first request needs them."""
+        start = time.perf_counter()
+        from yt_dlp.extractor import gen_extractor_classes
+        count = sum(1 for _ in gen_extractor_classes())
+        print(f"Loaded {count} extractors in {time.perf_counter() - start:.2f}s")
+
+    def submit(self, url: str, **options) -> Dict:
+        """
+        Queue a download.
+
+        Args:
+            url (str): URL to download
+            **options: quality, audio_only, filename, output, platform, rate_limit,
+                fast_audio
+
+        Returns:
+            Dict: The new job
+        """
+        unknown = set(options) - set(JOB_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown job options: {', '.join(sorted(unknown))}")
+        if not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+            raise ValueError(f"Invalid URL: {url!r}")
+        rate_limit = options.get('rate_limit')
+        if rate_limit is not None and (isinstance(rate_limit, bool)
+                                       or not isinstance(rate_limit, (int, float))):
+            raise ValueError(f"Invalid rate_limit: {rate_limit!r}")
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise OverflowError(f"Too many pending jobs ({self._pending})")
+            job_id = next(self._ids)
+            job = {
+                'id': job_id,
+                'url': url,
+                'status': PENDING,
+                'options': {key: options.get(key, default) for key, default in JOB_OPTIONS.items()},
+                'progress': None,
+                'result': None,
+                'error': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+            }
+            self.jobs[job_id] = job
+            self._pending += 1
+            self._prune()
+        self._publish(job_id, 'status', {'status': PENDING})
+        self._executor.submit(self._run, job_id)
+        return self.get(job_id)
+
+    def submit_many(self, urls: List[str], **options) -> tuple:
+        """
+        Queue one download per URL, as far as the queue has room.
+
+        Args:
+            urls (List[str]): URLs to download
+            **options: Options for every job, as for submit
+
+        Returns:
+            tuple: (accepted jobs, rejected {'url', 'error', 'reason'} dicts);
+                'reason' is 'invalid' or 'queue_full'
+        """
+        accepted, rejected = [], []
+        for url in urls:
+            try:
+                accepted.append(self.submit(url, **options))
+            except OverflowError as e:
+                rejected.append({'url': url, 'error': str(e), 'reason': 'queue_full'})
+            except ValueError as e:
+                rejected.append({'url': url, 'error': str(e), 'reason': 'invalid'})
+        return accepted, rejected
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond max_history (called with the lock held)."""
+        excess = len(self.jobs) - self.max_history
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job['status'] in TERMINAL_STATES][:excess]:
+            del self.jobs[job_id]
+
+    def _run(self, job_id: int):
+        """Worker body of one job."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job['status'] != PENDING:
+                return  # cancelled while waiting
+            job['status'] = RUNNING
+            self._pending -= 1
+            job['started_at'] = time.time()
+            options = dict(job['options'])
+            url = job['url']
+        self._publish(job_id, 'status', {'status': RUNNING})
+
+        try:
+            downloader = self.batch.make_downloader(job_id, url)
+            # A cancel that arrived before the downloader was registered
+            with self._lock:
+                if job_id in self._cancel_requested:
+                    downloader.cancel_download()
+            if options['rate_limit']:
+                downloader.bandwidth.set_limit(options['rate_limit'] * 1024)
+            if options['fast_audio'] is not None:
+                downloader.fast_audio = bool(options['fast_audio'])
+            if options['output']:
+                downloader.download_path = Path(options['output'])
+                downloader.download_path.mkdir(parents=True, exist_ok=True)
+            result = self.batch.run_job(job_id, url, lambda: downloader.download_video(
+                url, options['quality'], options['audio_only'], options['filename'],
+                platform=options['platform']), wait_postprocessing=False)
+        except Exception as e:
+            result = {'status': FAILED, 'error': str(e)}
+
+        futures = result.get('postprocessing')
+        if futures:
+            # Free this worker for the next transfer while FFmpeg runs
+            with self._lock:
+                job['status'] = POSTPROCESSING
+            self._publish(job_id, 'status', {'status': POSTPROCESSING})
+            when_all_done(futures, lambda: self._finish(
+                job_id, self.batch.finish_postprocessing(result)))
+        else:
+            self._finish(job_id, result)
+
+    def _finish(self, job_id: int, result: Dict):
+        """Record the outcome of a job."""
+        with self._lock:
+            job = self.jobs[job_id]
+            self._cancel_requested.discard(job_id)
+            job['status'] = result['status']
+            job['result'] = result.get('message')
+            job['error'] = result.get('error')
+            job['finished_at'] = time.time()
+        self._publish(job_id, 'status', {'status': job['status'], 'result': job['result'],
+                                         'error': job['error']})
+
+    def _on_progress(self, info: Dict):
+        """Progress callback of the batch engine: store and broadcast the event."""
+        job_id = info.get('job_id')
+        progress = {key: info.get(key) for key in
+                    ('downloaded', 'total', 'percentage', 'speed', 'eta', 'filename', 'status')
+                    if info.get(key) is not None}
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job['progress'] = progress
+        self._publish(job_id, 'progress', progress)
+
+    def cancel(self, job_id: int) -> Dict:
+        """
+        Cancel a job. Pending jobs are dropped before they start; running
+        jobs stop at their next progress event.
+
+        Args:
+            job_id (int): Job to cancel
+
+        Returns:
+            Dict: The job
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            status = job['status']
+            if status == PENDING:
+                job['status'] = CANCELLED
+                self._pending -= 1
+                job['finished_at'] = time.time()
+            elif status == RUNNING:
+                self._cancel_requested.add(job_id)
+        if status == PENDING:
+            self._publish(job_id, 'status', {'status': CANCELLED})
+        elif status == RUNNING:
+            self.batch.cancel(job_id)
+        return self.get(job_id)
+
+    def get(self, job_id: int) -> Dict:
+        """Get a copy of a job, raising KeyError if it is unknown."""
+        with self._lock:
+            job = self.jobs[job_id]
+            return dict(job, options=dict(job['options']),
+                        progress=dict(job['progress']) if job['progress'] else None)
+
+    def list_jobs(self, status: str = None) -> List[Dict]:
+        """List jobs, optionally only those in one state."""
+        with self._lock:
+            job_ids = [job_id for job_id, job in self.jobs.items()
+                       if status is None or job['status'] == status]
+        jobs = []
+        for job_id in job_ids:
+            try:
+                jobs.append(self.get(job_id))
+            except KeyError:
+                pass  # pruned meanwhile
+        return jobs
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each state."""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self.jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return counts
+
+    def subscribe(self, job_id: int = None) -> queue.Queue:
+        """
+        Receive (job_id, event, data) tuples of one job, or of all jobs.
+
+        Slow subscribers lose events once their queue is full rather than
+        holding up downloads.
+        """
+        events = queue.Queue(maxsize=1000)
+        with self._lock:
+            self._subscribers.append((job_id, events))
+        return events
+
+    def unsubscribe(self, events: queue.Queue):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[1] is not events]
+
+    def _publish(self, job_id: int, event: str, data: Dict):
+        with self._lock:
+            subscribers = [events for wanted, events in self._subscribers
+                           if wanted is None or wanted == job_id]
+        for events in subscribers:
+            try:
+                events.put_nowait((job_id, event, data))
+            except queue.Full:
+                pass
+
+    def serve(self, host: str = '127.0.0.1', port: int = None) -> ThreadingHTTPServer:
+        """
+        Start the HTTP API on a background thread.
+
+        Args:
+            host (str): Interface to bind; local only by default
+            port (int): Port to listen on (default: config 'daemon_port')
+
+        Returns:
+            ThreadingHTTPServer: The running server
+        """
+        handler = type('DaemonHandler', (DaemonRequestHandler,), {'daemon': self})
+        server = ThreadingHTTPServer((host, port or config.get('daemon_port', 8780)), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='daemon-api', daemon=True).start()
+        self._server = server
+        return server
+
+    def shutdown(self, cancel: bool = True):
+        """Stop the API and the workers, cancelling running downloads by default."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if cancel:
+            with self._lock:
+                pending = [job for job in self.jobs.values() if job['status'] == PENDING]
+                for job in pending:
+                    job['status'] = CANCELLED
+                self._pending = 0
+            self.batch.cancel()
+        self._executor.shutdown(wait=True)
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler of the daemon API; `daemon` is set on a per-server subclass."""
+
+    daemon: DownloadDaemon = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body):
+        data = json.dumps(body, default=json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error_json(self, status: int, message: str):
+        self._send_json(status, {'error': message})
+
+    def _send_bulk(self, accepted: List[Dict], rejected: List[Dict]):
+        """Answer a bulk submit so clients only retry the URLs that were rejected."""
+        if not rejected:
+            self._send_json(201, accepted)
+        elif accepted:
+            self._send_json(207, {'accepted': accepted, 'rejected': rejected})
+        else:
+            # Nothing was queued; 503 if the queue was full, so the whole request can be retried
+            full = any(r['reason'] == 'queue_full' for r in rejected)
+            self._send_json(503 if full else 400, {'error': rejected[0]['error'],
+                                                   'rejected': rejected})
+
+    def _route(self):
+        """Split the request path into (parts, query)."""
+        parsed = urlsplit(self.path)
+        return [part for part in parsed.path.split('/') if part], parse_qs(parsed.query)
+
+    def _job_id(self, part: str) -> Optional[int]:
+        try:
+            return int(part)
+        except ValueError:
+            self._send_error_json(404, f"No such job: {part}")
+            return None
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def do_GET(self):
+        parts, query = self._route()
+        if parts == ['health']:
+            self._send_json(200, {'status': 'ok', 'workers': self.daemon.workers,
+                                  'jobs': self.daemon.counts()})
+        elif parts == ['jobs']:
+            self._send_json(200, self.daemon.list_jobs(query.get('status', [None])[0]))
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job_id = self._job_id(parts[1])
+            if job_id is None:
+                return
+            try:
+                self._send_json(200, self.daemon.get(job_id))
+            except KeyError:
+                self._send_error_json(404, f"No such job: {job_id}")
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+            job_id = self._job_id(parts[1])
+            if job_id is not None:
+                self._stream_events(job_id)
+        elif parts == ['events']:
+            self._stream_events(None)
+        elif parts == ['metrics']:
+            from metrics import metrics
+            data = metrics.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_error_json(404, f"Not found: {self.path}")
+
+    def do_POST(self):
+        parts, _ = self._route()
+        if parts == ['jobs']:
+            try:
+                body = self._read_json()
+                if not isinstance(body, dict):
+                    raise ValueError("Expected a JSON object")
+                urls = body.pop('urls', None)
+                if urls is None:
+                    job = self.daemon.submit(body.pop('url', None), **body)
+                    self._send_json(201, job)
+                else:
+                    if not isinstance(urls, list):
+                        raise ValueError("'urls' must be a list")
+                    self._send_bulk(*self.daemon.submit_many(urls, **body))
+            except OverflowError as e:
+                self._send_error_json(503, str(e))
+            except ValueError as e:  # includes malformed JSON
+                self._send_error_json(400, str(e))
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+            self._cancel(parts[1])
+        else:
+            self._send_error_json(404, f"Not found: {self.path}")
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if len(parts) == 2 and parts[0] == 'jobs':
+            self._cancel(parts[1])
+        else:
+            self._send_error_json(404, f"Not found: {self.path}")
+
+    def _cancel(self, part: str):
+        job_id = self._job_id(part)
+        if job_id is None:
+            return
+        try:
+            self._send_json(200, self.daemon.cancel(job_id))
+        except KeyError:
+            self._send_error_json(404, f"No such job: {job_id}")
+
+    def _stream_events(self, job_id: Optional[int]):
+        """
+        Send events as Server-Sent Events until the job ends (or, for the
+        all-jobs stream, until the client disconnects).
+        """
+        events = self.daemon.subscribe(job_id)
+        try:
+            if job_id is not None:
+                try:
+                    job = self.daemon.get(job_id)
+                except KeyError:
+                    self._send_error_json(404, f"No such job: {job_id}")
+                    return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.close_connection = True
+
+            if job_id is not None:
+                # Current state first, so late subscribers are not left waiting
+                self._write_event(job_id, 'status', {'status': job['status'],
+                                                     'result': job['result'],
+                                                     'error': job['error']})
+                if job['progress']:
+                    self._write_event(job_id, 'progress', job['progress'])
+                if job['status'] in TERMINAL_STATES:
+                    return
+
+            while True:
+                try:
+                    event_job, event, data = events.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    self.wfile.write(b': keep-alive\n\n')
+                    self.wfile.flush()
+                    continue
+                self._write_event(event_job, event, data)
+                if job_id is not None and event == 'status' and data['status'] in TERMINAL_STATES:
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away
+        finally:
+            self.daemon.unsubscribe(events)
+
+    def _write_event(self, job_id: int, event: str, data: Dict):
+        payload = json.dumps(dict(data, job_id=job_id), default=json_default)
+        self.wfile.write(f"event: {event}\ndata: {payload}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+
+def main(argv: List[str] = None) -> int:
+    """Run the daemon in the foreground until interrupted."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Headless download daemon with a local HTTP/JSON API')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, help='Port to listen on (default: config daemon_port)')
+    parser.add_argument('--workers', '-w', type=int,
+                        help='Parallel downloads (default: config max_concurrent_downloads)')
+    parser.add_argument('--output', '-o', help='Download directory (default: config download_path)')
+    parser.add_argument('--limit-rate', type=float, metavar='KBPS',
+                        help='Cap all downloads together (default: config rate_limit)')
+    parser.add_argument('--job-limit-rate', type=float, metavar='KBPS',
+                        help='Cap each download (default: config rate_limit_per_job)')
+    args = parser.parse_args(argv)
+
+    if args.limit_rate is not None or args.job_limit_rate is not None:
+        from bandwidth import scheduler
+        scheduler.configure(
+            global_limit=args.limit_rate * 1024 if args.limit_rate is not None else None,
+            job_limit=args.job_limit_rate * 1024 if args.job_limit_rate is not None else None)
+
+    daemon = DownloadDaemon(args.output, args.workers)
+    daemon.warm_up()
+    try:
+        server = daemon.serve(args.host, args.port)
+    except OSError as e:
+        print(f"Error: Could not start daemon: {e}")
+        return 1
+    host, port = server.server_address[:2]
+    print(f"Download daemon on http://{host}:{port} with {daemon.workers} workers "
+          f"(Ctrl+C to stop)")
+    # Service managers stop daemons with SIGTERM rather than Ctrl+C
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        while not stop.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    print("\nStopping daemon...")
+    daemon.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
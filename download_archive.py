@@ -0,0 +1,114 @@
+"""
+Download archive for YouTube Video Downloader.
+Remembers which videos were downloaded so repeated runs can skip them
+before doing any network extraction.
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import config
+from utils import extract_video_id
+
+
+class DownloadArchive:
+    """
+    Set of downloaded videos keyed by extractor and video ID.
+
+    The file uses yt-dlp's --download-archive format (one "<extractor> <id>"
+    line per video), so archives can be shared with the yt-dlp command line.
+    Membership checks are O(1) lookups in an in-memory set; new entries are
+    appended to the file as they are recorded.
+    """
+
+    def __init__(self, archive_file: str = None):
+        """
+        Initialize the archive, loading existing entries.
+
+        Args:
+            archive_file (str): Archive file (default: ~/.youtube_downloader/download_archive.txt)
+        """
+        self.archive_file = Path(archive_file or config.get('download_archive_file') or
+                                 Path(config.config_file).parent / 'download_archive.txt')
+        self._entries = set()
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Load entries from the archive file."""
+        try:
+            with open(self.archive_file, 'r', encoding='utf-8') as f:
+                entries = {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            entries = set()
+        with self._lock:
+            self._entries = entries
+
+    @staticmethod
+    def make_key(extractor: str, video_id: str) -> str:
+        """Build an archive key the same way yt-dlp does."""
+        return f"{extractor.lower()} {video_id}"
+
+    @classmethod
+    def key_for_url(cls, url: str) -> Optional[str]:
+        """Get the archive key of a URL without network access, if it can be derived."""
+        video_id = extract_video_id(url)
+        return cls.make_key('youtube', video_id) if video_id else None
+
+    @classmethod
+    def key_for_info(cls, info: Dict) -> Optional[str]:
+        """Get the archive key of a (possibly flat) yt-dlp info dict."""
+        extractor = info.get('extractor_key') or info.get('ie_key')
+        video_id = info.get('id')
+        if extractor and video_id:
+            return cls.make_key(extractor, video_id)
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def contains_url(self, url: str) -> bool:
+        """Check if the video behind a URL is archived."""
+        key = self.key_for_url(url)
+        return key is not None and key in self._entries
+
+    def contains_info(self, info: Dict) -> bool:
+        """Check if the video described by an info dict is archived."""
+        key = self.key_for_info(info)
+        return key is not None and key in self._entries
+
+    def add(self, key: str):
+        """Record a key, appending it to the archive file."""
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries.add(key)
+            try:
+                self.archive_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.archive_file, 'a', encoding='utf-8') as f:
+                    f.write(f"{key}\n")
+            except OSError as e:
+                print(f"Warning: Could not update download archive: {e}")
+
+    def add_info(self, info: Dict):
+        """Record the video described by an info dict."""
+        key = self.key_for_info(info)
+        if key:
+            self.add(key)
+
+
+_default_archive: Optional[DownloadArchive] = None
+_default_archive_lock = threading.Lock()
+
+
+def get_default_archive() -> DownloadArchive:
+    """Get the process-wide archive, loading it on first use."""
+    global _default_archive
+    with _default_archive_lock:
+        if _default_archive is None:
+            _default_archive = DownloadArchive()
+        return _default_archive
@@ -0,0 +1,649 @@
+import copy
+import yt_dlp
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Callable
+import json
+
+from config import config
+from download_archive import get_default_archive
+from metadata_cache import metadata_cache
+from ydl_pool import default_pool
+from progress import ProgressThrottle
+from segmented_download import segmented_options
+from fragment_concurrency import fragment_concurrency
+from platforms import resolve_platform
+from metrics import metrics, POSTPROCESSOR_SPANS
+from bandwidth import scheduler as bandwidth_scheduler
+from postprocess import audio_postprocessors
+from formats import FormatTable
+from format_selection import format_spec
+
+
+class DownloadCancelled(yt_dlp.utils.DownloadCancelled):
+    """Raised from the progress hook to stop a running download."""
+
+
+class DownloadPaused(DownloadCancelled):
+    """Raised from the progress hook to stop a download but keep its .part files."""
+
+
+class YouTubeDownloader:
+    """
+    A comprehensive YouTube video downloader class using yt-dlp.
+    Supports various download formats, quality options, and progress tracking.
+    """
+    
+    def __init__(self, download_path: str = "downloads", cache=None, archive=None):
+        """
+        Initialize the YouTube downloader.
+        
+        Args:
+            download_path (str): Directory where downloads will be saved
+            cache (MetadataCache): Cache for extracted video info
+                (default: the process-wide metadata cache)
+            archive (DownloadArchive): Archive of downloaded videos to skip
+                (default: the shared archive if config 'use_download_archive' is set)
+        """
+        self.download_path = Path(download_path)
+        self.download_path.mkdir(exist_ok=True)
+        self.cache = cache if cache is not None else metadata_cache
+        if archive is None and config.get('use_download_archive'):
+            archive = get_default_archive()
+        self.archive = archive
+        self.segments = config.get('download_segments', 1)
+        self.audio_quality = config.get('audio_quality', '192')
+        # Keep the source audio codec instead of converting to MP3
+        self.fast_audio = config.get('fast_audio', False)
+        self.progress_callback: Optional[Callable] = None
+        self._progress_throttle = ProgressThrottle()
+        self.is_downloading = False
+        self._cancel_event = threading.Event()
+        self._pause_event = threading.Event()
+        self._last_request: Optional[Callable] = None
+        self._active_batch = None
+        self._job = None  # JobTrace of the running download
+        self.last_selection = None  # Selection of the last video, with its explanation
+        # When set, merging and audio extraction run on this pool instead of
+        # the download thread; callers wait for take_postprocessing()
+        self.postprocess_pool = None
+        self._postprocessing = []
+        # Global and per-job rate limits; waits end early on cancel or pause
+        self.bandwidth = bandwidth_scheduler.job(
+            stop=lambda: self._cancel_event.is_set() or self._pause_event.is_set())
+        
+    def set_progress_callback(self, callback: Callable):
+        """Set a callback function to track download progress."""
+        self.progress_callback = callback
+        
+    def _progress_hook(self, d):
+        """Internal progress hook for yt-dlp."""
+        # yt-dlp lets DownloadCancelled raised here propagate out of the download
+        if self._pause_event.is_set():
+            raise DownloadPaused("Download paused")
+        if self._cancel_event.is_set():
+            raise DownloadCancelled("Download cancelled")
+        
+        # Sleeping here holds up the thread that reads the data
+        self.bandwidth.hook(d)
+        
+        job = self._job
+        if job is not None:
+            if d['status'] == 'downloading':
+                job.end_span('format_selection')
+                job.start_span('transfer')
+            elif d['status'] == 'finished':
+                job.end_span('transfer')
+                size = d.get('total_bytes') or d.get('downloaded_bytes') or 0
+                job.count('downloaded_bytes', size)
+                metrics.inc('ytd_downloaded_bytes_total', size)
+        
+        if d['status'] == 'downloading':
+            # Skip formatting work for events that would exceed the update rate
+            if self.progress_callback and self._progress_throttle.ready(d.get('filename')):
+                try:
+                    # Extract progress information
+                    downloaded = d.get('downloaded_bytes', 0)
+                    total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
+                    speed = d.get('speed', 0)
+                    eta = d.get('eta', 0)
+                    
+                    progress_info = {
+                        'downloaded': downloaded,
+                        'total': total,
+                        'percentage': (downloaded / total * 100) if total > 0 else 0,
+                        'speed': speed,
+                        'eta': eta,
+                        'filename': d.get('filename', '')
+                    }
+                    self.progress_callback(progress_info)
+                except Exception as e:
+                    print(f"Progress callback error: {e}")
+                    
+        elif d['status'] == 'finished':
+            self._progress_throttle.ready(d.get('filename'), final=True)
+            if self.progress_callback:
+                self.progress_callback({
+                    'status': 'finished',
+                    'filename': d.get('filename', '')
+                })
+    
+    def _postprocessor_hook(self, d):
+        """Internal postprocessor hook for yt-dlp."""
+        job = self._job
+        if job is not None:
+            name = d.get('postprocessor')
+            span = POSTPROCESSOR_SPANS.get(name, 'postprocess')
+            if d['status'] == 'started':
+                job.start_span(span)
+            elif d['status'] == 'finished':
+                job.end_span(span, **({'postprocessor': name} if span == 'postprocess' else {}))
+        
+        # MoveFiles is the last postprocessor yt-dlp runs for every video,
+        # so the file is complete once it has finished
+        if (self.archive is not None and d['status'] == 'finished'
+                and d.get('postprocessor') == 'MoveFiles'):
+            self.archive.add_info(d['info_dict'])
+    
+    def _archive_filter(self, info: Dict, incomplete: bool = False) -> Optional[str]:
+        """yt-dlp match filter that skips archived playlist entries before extraction."""
+        if self.archive is not None and self.archive.contains_info(info):
+            return f"{info.get('title') or info.get('id')} is already in the download archive"
+        return None
+    
+    def _base_opts(self, outtmpl: str, platform=None, quality: str = 'best',
+                   audio_only: bool = False) -> Dict:
+        """Build the yt-dlp options shared by all downloads."""
+        platform = resolve_platform(platform)
+        ydl_opts = dict(platform.ydl_options)
+        ydl_opts.update({
+            'outtmpl': outtmpl,
+            'progress_hooks': [self._progress_hook],
+            'format': platform.select_format(quality, audio_only),
+        })
+        if audio_only:
+            ydl_opts['postprocessors'] = audio_postprocessors(self.audio_quality, self.fast_audio)
+        ydl_opts['postprocessor_hooks'] = [self._postprocessor_hook]
+        # For downloaders that throttle their own reading threads
+        ydl_opts['bandwidth_throttle'] = self.bandwidth.throttle
+        # Large direct-URL files are fetched over several connections,
+        # HLS/DASH formats over several parallel fragment requests
+        ydl_opts.update(segmented_options(self.segments))
+        return fragment_concurrency.apply(ydl_opts)
+    
+    def _extract_info(self, url: str) -> Dict:
+        """
+        Extract the full yt-dlp info dict for a URL, using the metadata cache.
+        
+        Args:
+            url (str): YouTube video URL
+            
+        Returns:
+            Dict: Sanitized yt-dlp info dict
+        """
+        info = self.cache.get(url)
+        if info is not None:
+            metrics.inc('ytd_cache_requests_total', result='hit')
+            if self._job is not None:
+                self._job.count('cache_hits')
+            return info
+        metrics.inc('ytd_cache_requests_total', result='miss')
+        
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+        }
+        
+        with self._span('extract'), default_pool.session(ydl_opts) as ydl:
+            info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+        
+        self.cache.put(url, info)
+        return info
+    
+    def _span(self, name: str):
+        """Time a block as a span of the running job, or on its own outside of jobs."""
+        return self._job.span(name) if self._job is not None else metrics.span(name)
+    
+    def get_video_info(self, url: str) -> Dict:
+        """
+        Get video information without downloading.
+        
+        Args:
+            url (str): YouTube video URL
+            
+        Returns:
+            Dict: Video information including title, duration, formats, etc.
+        """
+        try:
+            info = self._extract_info(url)
+            
+            # Extract relevant information
+            video_info = {
+                'title': info.get('title', 'Unknown'),
+                'duration': info.get('duration', 0),
+                'uploader': info.get('uploader', 'Unknown'),
+                'view_count': info.get('view_count', 0),
+                'description': info.get('description', ''),
+                'upload_date': info.get('upload_date', ''),
+                'thumbnail': info.get('thumbnail', ''),
+                # Compact records indexed by height, codec and type
+                'formats': FormatTable(info.get('formats') or [])
+            }
+            
+            return video_info
+            
+        except Exception as e:
+            raise Exception(f"Error getting video info: {str(e)}")
+    
+    def download_video(self, url: str, quality: str = 'best', 
+                      audio_only: bool = False, custom_filename: str = None,
+                      platform: str = None) -> str:
+        """
+        Download a video.
+        
+        Args:
+            url (str): Video URL (YouTube or any registered platform)
+            quality (str): Video quality ('best', 'worst', '720p', '480p', etc.)
+            audio_only (bool): Download audio only
+            custom_filename (str): Custom filename for the download
+            platform (str): Platform adapter to use (default: detected from the URL)
+            
+        Returns:
+            str: Path to the downloaded file
+        """
+        return self._download_with_template(
+            url, self._output_template(custom_filename), quality, audio_only,
+            platform=resolve_platform(platform, url))
+    
+    def download_from_info(self, info: Dict, quality: str = 'best',
+                           audio_only: bool = False, custom_filename: str = None) -> str:
+        """
+        Download a video from an already extracted info dict.
+        
+        This skips the extraction round-trip that download_video would
+        otherwise need when the caller already has the metadata.
+        
+        Args:
+            info (Dict): Full yt-dlp info dict, e.g. from the metadata cache
+            quality (str): Video quality ('best', 'worst', '720p', '480p', etc.)
+            audio_only (bool): Download audio only
+            custom_filename (str): Custom filename for the download
+            
+        Returns:
+            str: Status message
+        """
+        url = info.get('webpage_url') or info.get('original_url')
+        return self._download_with_template(
+            url, self._output_template(custom_filename), quality, audio_only, info=info,
+            platform=resolve_platform(None, url))
+    
+    def _output_template(self, custom_filename: str = None) -> str:
+        """Build the yt-dlp output template for a single video."""
+        if custom_filename:
+            return str(self.download_path / f"{custom_filename}.%(ext)s")
+        return str(self.download_path / "%(title)s.%(ext)s")
+    
+    def _download_with_template(self, url: str, outtmpl: str, quality: str = 'best',
+                                audio_only: bool = False, info: Dict = None,
+                                platform=None) -> str:
+        """
+        Download a single video to the given yt-dlp output template.
+        
+        The info dict is taken from the argument or the metadata cache, so the
+        video is only extracted once across info, quality and download calls.
+        Formats are chosen by the selection engine, with the platform adapter's
+        selector as fallback; if the download fails it is retried once with
+        fresh metadata and the adapter's fallback format.
+        """
+        platform = resolve_platform(platform, url)
+        self._last_request = lambda: self._download_with_template(
+            url, outtmpl, quality, audio_only, info, platform)
+        
+        with metrics.job(url, platform=platform.name) as job:
+            self._job = job
+            try:
+                return self._run_download(job, url, outtmpl, quality, audio_only, info, platform)
+            finally:
+                self._job = None
+    
+    def _run_download(self, job, url: str, outtmpl: str, quality: str, audio_only: bool,
+                      info: Optional[Dict], platform) -> str:
+        """Body of _download_with_template, traced as `job`."""
+        # Archived YouTube videos are recognised from the URL alone
+        if self.archive is not None and (self.archive.contains_info(info) if info
+                                         else self.archive.contains_url(url)):
+            job.status = 'skipped'
+            return "Already in download archive, skipped"
+        
+        try:
+            self.is_downloading = True
+            
+            # Base options with the platform's format selection
+            ydl_opts = self._base_opts(outtmpl, platform, quality, audio_only)
+            
+            video_info = info or self._extract_info(url)
+            if self.archive is not None and self.archive.contains_info(video_info):
+                self.is_downloading = False
+                job.status = 'skipped'
+                return "Already in download archive, skipped"
+            
+            # Pick concrete formats for the quality; the platform's selector
+            # stays as yt-dlp's fallback if they cannot be downloaded
+            ydl_opts['format'], self.last_selection = format_spec(
+                video_info, quality, audio_only, fallback=ydl_opts['format'],
+                merge_container=ydl_opts.get('merge_output_format'))
+            if self.last_selection is not None:
+                job.labels['format'] = self.last_selection.format_id
+            
+            # Download the video
+            try:
+                self._download_info(ydl_opts, video_info)
+            except (yt_dlp.utils.DownloadError, yt_dlp.utils.ExtractorError):
+                # process_ie_result raises ExtractorError for unavailable formats
+                fallback = platform.fallback_format
+                if not fallback and (info is not None or not url):
+                    raise
+                metrics.inc('ytd_retries_total', reason='fallback')
+                job.count('retries')
+                if info is None and url:
+                    # Cached format URLs may have expired, retry with fresh metadata
+                    self.cache.invalidate(url)
+                    video_info = self._extract_info(url)
+                if fallback:
+                    ydl_opts['format'] = fallback
+                self._download_info(ydl_opts, video_info)
+                
+            self.is_downloading = False
+            return "Download completed successfully!"
+            
+        except DownloadCancelled:
+            self.is_downloading = False
+            raise
+        except Exception as e:
+            self.is_downloading = False
+            raise Exception(f"Download failed: {str(e)}")
+        finally:
+            self._clear_interrupts()
+    
+    def _download_info(self, ydl_opts: Dict, info: Dict):
+        """Run format selection and download on an extracted info dict."""
+        job = self._job
+        if job is not None:
+            # Ends at the first progress event, so it also covers connecting
+            job.start_span('format_selection')
+        try:
+            with default_pool.session(ydl_opts) as ydl, self._deferred_postprocessing(ydl, ydl_opts):
+                # yt-dlp updates the info dict in place, keep the cached copy intact
+                ydl.process_ie_result(copy.deepcopy(info), download=True)
+        finally:
+            if job is not None:
+                job.end_span('format_selection')
+                job.end_span('transfer')
+    
+    @contextmanager
+    def _deferred_postprocessing(self, ydl, ydl_opts: Dict):
+        """Hand post-processing to postprocess_pool, if one is set."""
+        if self.postprocess_pool is None:
+            yield
+            return
+        with self.postprocess_pool.deferred(ydl, ydl_opts, self._postprocessing):
+            yield
+    
+    def take_postprocessing(self) -> List:
+        """
+        Get the post-processing futures queued by finished downloads.
+        
+        Only used with postprocess_pool: a download call then returns once
+        the files are transferred, and the video is complete when all of
+        these futures have finished.
+        
+        Returns:
+            List[Future]: Futures queued since the last call
+        """
+        futures, self._postprocessing = self._postprocessing, []
+        return futures
+    
+    def download_playlist(self, url: str, quality: str = 'best', 
+                         audio_only: bool = False, max_downloads: int = None,
+                         parallel: bool = False, workers: int = None) -> str:
+        """
+        Download a YouTube playlist.
+        
+        Args:
+            url (str): YouTube playlist URL
+            quality (str): Video quality
+            audio_only (bool): Download audio only
+            max_downloads (int): Maximum number of videos to download
+            parallel (bool): Download entries concurrently instead of one by one
+            workers (int): Number of parallel downloads when parallel is set
+            
+        Returns:
+            str: Status message
+        """
+        self._last_request = lambda: self.download_playlist(
+            url, quality, audio_only, max_downloads, parallel, workers)
+        if parallel:
+            return self._download_playlist_parallel(url, quality, audio_only,
+                                                    max_downloads, workers)
+        
+        with metrics.job(url, kind='playlist') as job:
+            self._job = job
+            try:
+                return self._run_playlist(url, quality, audio_only, max_downloads)
+            finally:
+                self._job = None
+    
+    def _run_playlist(self, url: str, quality: str, audio_only: bool,
+                      max_downloads: int = None) -> str:
+        """Download playlist entries one by one in a single yt-dlp run."""
+        try:
+            self.is_downloading = True
+            
+            ydl_opts = self._base_opts(
+                str(self.download_path / "%(playlist_index)s - %(title)s.%(ext)s"),
+                resolve_platform(None, url), quality, audio_only)
+            if self.archive is not None:
+                ydl_opts['match_filter'] = self._archive_filter
+            
+            if max_downloads:
+                ydl_opts['playlistend'] = max_downloads
+            
+            with default_pool.session(ydl_opts) as ydl:
+                ydl.download([url])
+                
+            self.is_downloading = False
+            return "Playlist download completed successfully!"
+            
+        except DownloadCancelled:
+            self.is_downloading = False
+            raise
+        except Exception as e:
+            self.is_downloading = False
+            raise Exception(f"Playlist download failed: {str(e)}")
+        finally:
+            self._clear_interrupts()
+    
+    def _download_playlist_parallel(self, url: str, quality: str, audio_only: bool,
+                                    max_downloads: int = None, workers: int = None) -> str:
+        """
+        Download playlist entries concurrently.
+        
+        The playlist is extracted flat (entry URLs and titles only) in one
+        request, then each entry is downloaded as its own job on the batch
+        engine, with per-entry retries and progress tagged by playlist index.
+        """
+        from batch_downloader import BatchDownloader
+        
+        flat_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': 'in_playlist',
+        }
+        if max_downloads:
+            flat_opts['playlistend'] = max_downloads
+        
+        try:
+            with default_pool.session(flat_opts) as ydl:
+                playlist = ydl.extract_info(url, download=False)
+        except Exception as e:
+            raise Exception(f"Playlist download failed: {str(e)}")
+        
+        entries = [entry for entry in (playlist.get('entries') or []) if entry]
+        if max_downloads:
+            entries = entries[:max_downloads]
+        if not entries:
+            raise Exception("Playlist download failed: playlist has no entries")
+        
+        platform = resolve_platform(None, url)
+        
+        # Match yt-dlp's zero padding of %(playlist_index)s
+        width = len(str(playlist.get('playlist_count') or len(entries)))
+        
+        # Flat entries carry the extractor and ID, so archived videos are
+        # dropped here without ever being extracted
+        if self.archive is not None:
+            for position, entry in enumerate(entries, 1):
+                entry['playlist_index'] = entry.get('playlist_index') or position
+            entries = [entry for entry in entries if not self.archive.contains_info(entry)]
+            if not entries:
+                return "Playlist download completed successfully! (all videos already in archive)"
+        
+        self.is_downloading = True
+        batch = BatchDownloader(str(self.download_path), workers, archive=self.archive)
+        self._active_batch = batch
+        if self.progress_callback:
+            batch.set_progress_callback(self.progress_callback)
+        
+        def jobs():
+            for position, entry in enumerate(entries, 1):
+                index = entry.get('playlist_index') or position
+                entry_url = entry.get('url') or entry.get('webpage_url')
+                outtmpl = str(self.download_path / f"{index:0{width}d} - %(title)s.%(ext)s")
+                downloader = batch.make_downloader(index, entry_url)
+                yield index, entry_url, (lambda d=downloader, u=entry_url, t=outtmpl:
+                                         d._download_with_template(u, t, quality, audio_only,
+                                                                   platform=platform))
+        
+        try:
+            summary = batch.run_jobs(jobs())
+        finally:
+            self.is_downloading = False
+            self._active_batch = None
+        
+        if self._pause_event.is_set():
+            self._clear_interrupts()
+            raise DownloadPaused("Playlist download paused")
+        if self._cancel_event.is_set():
+            self._clear_interrupts()
+            raise DownloadCancelled("Playlist download cancelled")
+        
+        if summary['failed']:
+            raise Exception(f"Playlist download failed: {summary['failed']} of "
+                            f"{summary['total']} entries could not be downloaded")
+        return f"Playlist download completed successfully! ({summary['total']} videos)"
+    
+    def cancel_download(self):
+        """
+        Cancel the current download.
+        
+        The download stops at its next progress event and raises
+        DownloadCancelled from the download call.
+        """
+        self._cancel_event.set()
+        if self._active_batch:
+            self._active_batch.cancel()
+    
+    def pause_download(self):
+        """
+        Pause the current download.
+        
+        The transfer stops at its next progress event and the download call
+        raises DownloadPaused. Partially downloaded .part files are kept so
+        resume_download can continue where it stopped.
+        """
+        self._pause_event.set()
+        if self._active_batch:
+            self._active_batch.pause()
+    
+    def resume_download(self) -> str:
+        """
+        Resume the last paused or cancelled download.
+        
+        yt-dlp continues existing .part files (continuedl) and skips files
+        that are already complete, so only the missing bytes are fetched.
+        
+        Returns:
+            str: Status message of the resumed download
+        """
+        if not self._last_request:
+            raise Exception("No download to resume")
+        self._clear_interrupts()
+        return self._last_request()
+    
+    def _clear_interrupts(self):
+        """Reset cancel and pause requests once a download has stopped."""
+        self._cancel_event.clear()
+        self._pause_event.clear()
+        
+    def get_available_qualities(self, url: str) -> List[str]:
+        """
+        Get available video qualities for a URL.
+        
+        Args:
+            url (str): YouTube video URL
+            
+        Returns:
+            List[str]: List of available qualities
+        """
+        try:
+            info = self.get_video_info(url)
+            
+            # Heights come highest first, followed by the standard options
+            return [f"{height}p" for height in info['formats'].heights()] + ['worst', 'best']
+            
+        except Exception:
+            return ['best', 'worst', '1080p', '720p', '480p', '360p', '240p']
+
+
+def main():
+    """Simple command-line interface for testing."""
+    if len(sys.argv) < 2:
+        print("Usage: python download_engine.py <youtube_url> [quality] [audio_only]")
+        print("Example: python download_engine.py 'https://www.youtube.com/watch?v=...' 720p")
+        return
+    
+    url = sys.argv[1]
+    quality = sys.argv[2] if len(sys.argv) > 2 else 'best'
+    audio_only = len(sys.argv) > 3 and sys.argv[3].lower() == 'true'
+    
+    downloader = YouTubeDownloader()
+    
+    def progress_callback(info):
+        if 'percentage' in info:
+            print(f"\rProgress: {info['percentage']:.1f}% "
+                  f"Speed: {info.get('speed', 0) / 1024 / 1024:.1f} MB/s", end='')
+        elif info.get('status') == 'finished':
+            print(f"\nFinished: {info['filename']}")
+    
+    downloader.set_progress_callback(progress_callback)
+    
+    try:
+        print(f"Getting video info...")
+        info = downloader.get_video_info(url)
+        print(f"Title: {info['title']}")
+        print(f"Duration: {info['duration']} seconds")
+        print(f"Uploader: {info['uploader']}")
+        
+        print(f"\nStarting download...")
+        result = downloader.download_video(url, quality, audio_only)
+        print(f"\n{result}")
+        
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
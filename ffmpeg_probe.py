@@ -0,0 +1,152 @@
+"""
+FFmpeg capability detection for YouTube Video Downloader.
+Probes the FFmpeg binary once and caches the result in memory and on disk.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import config
+
+_probe_cache: Dict[str, Dict] = {}
+_probe_lock = threading.Lock()
+
+
+def _cache_file() -> Path:
+    """Get the on-disk probe cache file."""
+    return Path(config.config_file).parent / 'ffmpeg_probe.json'
+
+
+def _run_ffmpeg(ffmpeg_path: str, *args: str) -> str:
+    """Run FFmpeg with the given arguments and return its output."""
+    result = subprocess.run([ffmpeg_path, '-hide_banner', *args],
+                            capture_output=True, text=True, timeout=15)
+    return result.stdout
+
+
+def _parse_encoders(output: str) -> List[str]:
+    """Parse the encoder names from `ffmpeg -encoders` output."""
+    encoders = []
+    in_table = False
+    for line in output.splitlines():
+        if line.strip().startswith('------'):
+            in_table = True
+        elif in_table and line.strip():
+            parts = line.split()
+            if len(parts) >= 2:
+                encoders.append(parts[1])
+    return encoders
+
+
+def _parse_hwaccels(output: str) -> List[str]:
+    """Parse the method names from `ffmpeg -hwaccels` output."""
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    return [line for line in lines if not line.endswith(':')]
+
+
+def _probe_binary(ffmpeg_path: str) -> Dict:
+    """Run the actual FFmpeg probes."""
+    version_output = _run_ffmpeg(ffmpeg_path, '-version')
+    first_line = version_output.splitlines()[0] if version_output else ''
+    version = first_line.split()[2] if first_line.startswith('ffmpeg version') else ''
+
+    return {
+        'available': bool(version_output),
+        'path': ffmpeg_path,
+        'version': version,
+        'encoders': _parse_encoders(_run_ffmpeg(ffmpeg_path, '-encoders')),
+        'hwaccels': _parse_hwaccels(_run_ffmpeg(ffmpeg_path, '-hwaccels')),
+    }
+
+
+def _load_disk_cache() -> Dict:
+    try:
+        with open(_cache_file(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_disk_cache(disk_cache: Dict):
+    try:
+        _cache_file().parent.mkdir(parents=True, exist_ok=True)
+        with open(_cache_file(), 'w', encoding='utf-8') as f:
+            json.dump(disk_cache, f, indent=2)
+    except OSError as e:
+        print(f"Warning: Could not save FFmpeg probe cache: {e}")
+
+
+def probe_ffmpeg(ffmpeg_path: str = None, refresh: bool = False) -> Dict:
+    """
+    Get FFmpeg capabilities, probing the binary at most once per version.
+
+    Results are cached in memory for the process and on disk keyed by binary
+    path and modification time, so an upgraded FFmpeg is probed again.
+
+    Args:
+        ffmpeg_path (str): FFmpeg binary to probe (default: `ffmpeg` on PATH)
+        refresh (bool): Ignore cached results and probe again
+
+    Returns:
+        Dict: 'available', 'path', 'version', 'encoders' and 'hwaccels'
+    """
+    resolved = shutil.which(ffmpeg_path or 'ffmpeg')
+    if not resolved:
+        return {'available': False, 'path': None, 'version': '',
+                'encoders': [], 'hwaccels': []}
+
+    resolved = os.path.realpath(resolved)
+    with _probe_lock:
+        if not refresh and resolved in _probe_cache:
+            return _probe_cache[resolved]
+
+        try:
+            mtime = os.path.getmtime(resolved)
+        except OSError:
+            mtime = None
+
+        disk_cache = _load_disk_cache()
+        cached = disk_cache.get(resolved)
+        if not refresh and cached and cached.get('mtime') == mtime:
+            result = cached['result']
+        else:
+            try:
+                result = _probe_binary(resolved)
+            except (OSError, subprocess.SubprocessError):
+                result = {'available': False, 'path': resolved, 'version': '',
+                          'encoders': [], 'hwaccels': []}
+            disk_cache[resolved] = {'mtime': mtime, 'result': result}
+            _save_disk_cache(disk_cache)
+
+        _probe_cache[resolved] = result
+        return result
+
+
+def is_ffmpeg_available() -> bool:
+    """Check if a working FFmpeg binary is available."""
+    return probe_ffmpeg()['available']
+
+
+def get_ffmpeg_path() -> Optional[str]:
+    """Get the path of the FFmpeg binary, or None if it is not available."""
+    result = probe_ffmpeg()
+    return result['path'] if result['available'] else None
+
+
+def has_encoder(name: str) -> bool:
+    """Check if FFmpeg was built with the given encoder (e.g. 'libmp3lame')."""
+    return name in probe_ffmpeg()['encoders']
+
+
+if __name__ == "__main__":
+    info = probe_ffmpeg(refresh=True)
+    print(f"Available: {info['available']}")
+    print(f"Path: {info['path']}")
+    print(f"Version: {info['version']}")
+    print(f"Encoders: {len(info['encoders'])}")
+    print(f"Hardware acceleration: {', '.join(info['hwaccels']) or 'none'}")
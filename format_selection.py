@@ -0,0 +1,353 @@
+"""
+Format selection engine for YouTube Video Downloader.
+Scores the extracted formats of a video against a policy (resolution,
+codecs, container, size and bitrate budget, FFmpeg availability) and picks
+concrete format IDs, with an explanation of the choice.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from config import config
+from ffmpeg_probe import is_ffmpeg_available
+from formats import Format, FormatTable, codec_family
+from utils import format_bytes
+
+# Audio container that merges with each video container without re-encoding
+MERGE_AUDIO_EXT = {'mp4': 'm4a', 'webm': 'webm'}
+
+_QUALITY_RE = re.compile(r'^(\d+)p(\+?)$')
+_SELECTOR_CHARS = re.compile(r'[/+,\[\]()\s]')
+
+
+class FormatPolicy:
+    """
+    What a download should get.
+
+    Hard limits (resolution cap and floor, size and bitrate budget,
+    container, FFmpeg for merging) remove formats; preferences (codec order,
+    biggest or smallest) rank the rest. When no format meets every limit,
+    limits are dropped one by one, least important first, and the
+    explanation says which.
+    """
+
+    def __init__(self, max_height: int = None, min_height: int = None,
+                 video_codecs: List[str] = None, audio_codecs: List[str] = None,
+                 container: str = None, max_filesize: int = None, max_bitrate: float = None,
+                 prefer_smallest: bool = False, audio_only: bool = False, ffmpeg: bool = None,
+                 merge_container: str = None):
+        """
+        Initialize the policy.
+
+        Args:
+            max_height (int): Highest acceptable height
+            min_height (int): Lowest acceptable height
+            video_codecs (List[str]): Video codecs, most preferred first
+                (default: config 'preferred_video_codecs')
+            audio_codecs (List[str]): Audio codecs, most preferred first
+                (default: config 'preferred_audio_codecs')
+            container (str): Required file extension, e.g. 'mp4'
+                (default: config 'preferred_container')
+            max_filesize (int): Size budget in bytes
+                (default: config 'max_filesize_mb')
+            max_bitrate (float): Bitrate budget in kbps
+            prefer_smallest (bool): Pick the smallest acceptable file instead of the best
+            audio_only (bool): Select an audio format
+            ffmpeg (bool): Whether separate video and audio can be merged
+                (default: whether FFmpeg is available)
+            merge_container (str): Container merged video and audio are written
+                to (yt-dlp's 'merge_output_format'; default: chosen by the formats)
+        """
+        self.max_height = max_height
+        self.min_height = min_height
+        self.video_codecs = [codec_family(codec) for codec in
+                             (video_codecs or config.get('preferred_video_codecs') or [])]
+        self.audio_codecs = [codec_family(codec) for codec in
+                             (audio_codecs or config.get('preferred_audio_codecs') or [])]
+        self.container = container or config.get('preferred_container')
+        if max_filesize is None and config.get('max_filesize_mb'):
+            max_filesize = int(config.get('max_filesize_mb') * 1024 * 1024)
+        self.max_filesize = max_filesize
+        self.max_bitrate = max_bitrate
+        self.prefer_smallest = prefer_smallest
+        self.audio_only = audio_only
+        self.ffmpeg = is_ffmpeg_available() if ffmpeg is None else ffmpeg
+        self.merge_container = merge_container
+
+    @classmethod
+    def from_quality(cls, quality: str = 'best', audio_only: bool = False, **options) -> "FormatPolicy":
+        """
+        Build a policy from a quality setting.
+
+        'best' gets the best format, 'worst' the smallest, '720p' the best
+        format up to 720p and '720p+' the smallest file of at least 720p.
+
+        Args:
+            quality (str): Quality setting
+            audio_only (bool): Select an audio format
+            **options: Further FormatPolicy arguments
+
+        Returns:
+            FormatPolicy: The policy
+        """
+        match = _QUALITY_RE.match(quality or '')
+        if match and match.group(2):
+            options.setdefault('min_height', int(match.group(1)))
+            options.setdefault('prefer_smallest', True)
+        elif match:
+            options.setdefault('max_height', int(match.group(1)))
+        elif quality == 'worst':
+            options.setdefault('prefer_smallest', True)
+        return cls(audio_only=audio_only, **options)
+
+    def codec_rank(self, codec: Optional[str], audio: bool = False) -> int:
+        """Position of a codec in the preference order (unlisted codecs last)."""
+        preferred = self.audio_codecs if audio else self.video_codecs
+        family = codec_family(codec)
+        return preferred.index(family) if family in preferred else len(preferred)
+
+
+class Selection:
+    """A chosen format (or video and audio pair) and why it was chosen."""
+
+    def __init__(self, formats: Tuple[Format, ...], container: str, size: Optional[float],
+                 reasons: List[str]):
+        self.formats = formats
+        self.container = container
+        self.size = size
+        self.reasons = reasons
+
+    @property
+    def format_id(self) -> str:
+        """yt-dlp format spec, e.g. '137+140' for merged video and audio."""
+        return '+'.join(str(fmt.format_id) for fmt in self.formats)
+
+    def describe(self) -> str:
+        """One line summary of the chosen format."""
+        parts = []
+        for fmt in self.formats:
+            if fmt.height:
+                codecs = codec_family(fmt.vcodec) or 'unknown'
+                if len(self.formats) == 1 and fmt.has_audio:
+                    codecs += f" + {codec_family(fmt.acodec)}"
+                parts.append(f"{fmt.height}p {codecs}")
+            else:
+                bitrate = f" {fmt.abr or fmt.tbr:.0f}k" if fmt.abr or fmt.tbr else ''
+                parts.append(f"{codec_family(fmt.acodec) or 'unknown'}{bitrate} audio")
+        size = f", ~{format_bytes(int(self.size))}" if self.size else ", size unknown"
+        return f"{self.format_id}: {' + '.join(parts)} in {self.container}{size}"
+
+    def explain(self) -> str:
+        """Multi-line explanation of the choice."""
+        return '\n'.join([f"Selected {self.describe()}"] + [f"  {reason}" for reason in self.reasons])
+
+    def __str__(self) -> str:
+        return self.explain()
+
+
+def _estimate_size(fmt: Format, duration: Optional[float]) -> Optional[float]:
+    """File size in bytes, from metadata or from bitrate and duration."""
+    if fmt.filesize or fmt.filesize_approx:
+        return fmt.filesize or fmt.filesize_approx
+    bitrate = fmt.tbr or fmt.abr
+    if bitrate and duration:
+        return bitrate * 125 * duration
+    return None
+
+
+class _Candidate:
+    """A downloadable choice: one format, or video and audio to merge."""
+
+    __slots__ = ('formats', 'height', 'fps', 'bitrate', 'size', 'container', 'merged')
+
+    def __init__(self, formats: Tuple[Format, ...], duration: Optional[float],
+                 merge_container: str = None):
+        self.formats = formats
+        self.height = formats[0].height or 0
+        self.fps = formats[0].fps or 0
+        self.bitrate = sum(fmt.tbr or fmt.abr or 0 for fmt in formats)
+        sizes = [_estimate_size(fmt, duration) for fmt in formats]
+        self.size = sum(sizes) if None not in sizes else None
+        self.merged = len(formats) > 1
+        if self.merged and merge_container:
+            self.container = merge_container
+        elif self.merged:
+            video_ext, audio_ext = formats[0].ext, formats[1].ext
+            self.container = video_ext if MERGE_AUDIO_EXT.get(video_ext) == audio_ext else 'mkv'
+        else:
+            self.container = formats[0].ext or 'unknown'
+
+
+def _candidates(table: FormatTable, policy: FormatPolicy,
+                duration: Optional[float]) -> List[_Candidate]:
+    if policy.audio_only:
+        # Audio extraction works from muxed formats when there is no audio-only one
+        formats = table.audio() or [fmt for fmt in table.video() if fmt.acodec != 'none']
+        return [_Candidate((fmt,), duration) for fmt in formats]
+
+    audio = table.audio()
+    candidates = []
+    for fmt in table.video():
+        if fmt.acodec != 'none':
+            # Muxed, or audio unknown (yt-dlp treats those as complete too)
+            candidates.append(_Candidate((fmt,), duration))
+        elif audio:
+            # Same-container audio keeps the merge a plain remux into mp4/webm
+            partner_ext = MERGE_AUDIO_EXT.get(fmt.ext)
+            partners = [a for a in audio if a.ext == partner_ext] or audio
+            partner = min(partners, key=lambda a: a.abr or a.tbr or 0) if policy.prefer_smallest \
+                else min(partners, key=lambda a: (policy.codec_rank(a.acodec, audio=True),
+                                                  -(a.abr or a.tbr or 0)))
+            candidates.append(_Candidate((fmt, partner), duration, policy.merge_container))
+    return candidates
+
+
+def _limits(policy: FormatPolicy) -> List[tuple]:
+    """(key, limit, reason for exclusion, test) of each hard limit, most important first."""
+    limits = []
+    if policy.max_height:
+        limits.append(('max_height', f"at most {policy.max_height}p", f"above {policy.max_height}p",
+                       lambda c: not c.height or c.height <= policy.max_height))
+    if policy.min_height and not policy.audio_only:
+        limits.append(('min_height', f"at least {policy.min_height}p", f"below {policy.min_height}p",
+                       lambda c: c.height >= policy.min_height))
+    if policy.max_filesize:
+        budget = format_bytes(policy.max_filesize)
+        limits.append(('max_filesize', f"within {budget}", f"over the {budget} size budget",
+                       lambda c: c.size is None or c.size <= policy.max_filesize))
+    if policy.max_bitrate:
+        budget = f"{policy.max_bitrate:.0f}k"
+        limits.append(('max_bitrate', f"within {budget}", f"over the {budget} bitrate budget",
+                       lambda c: not c.bitrate or c.bitrate <= policy.max_bitrate))
+    if policy.container:
+        limits.append(('container', f"in {policy.container}", f"not {policy.container}",
+                       lambda c: c.container == policy.container))
+    return limits
+
+
+def _rank(candidate: _Candidate, policy: FormatPolicy, prefer_smallest: bool) -> tuple:
+    """Sort key, best candidate first."""
+    first = candidate.formats[0]
+    codec = policy.codec_rank(first.acodec if policy.audio_only else first.vcodec,
+                              audio=policy.audio_only)
+    size = candidate.size if candidate.size is not None else float('inf')
+    if prefer_smallest:
+        # Formats of unknown size fall back to the lowest resolution and bitrate
+        return (size, candidate.height, candidate.bitrate or float('inf'), codec)
+    if policy.audio_only:
+        return (-candidate.bitrate, codec, size)
+    return (-candidate.height, -candidate.fps, codec, -candidate.bitrate, size)
+
+
+def select_format(info: Dict, policy: FormatPolicy = None) -> Optional[Selection]:
+    """
+    Choose the format to download for an extracted video.
+
+    Args:
+        info (Dict): yt-dlp info dict with 'formats'
+        policy (FormatPolicy): What to get (default: the best format)
+
+    Returns:
+        Optional[Selection]: The choice, or None if the formats carry too
+            little metadata to choose from (yt-dlp's own selection applies)
+    """
+    policy = policy or FormatPolicy()
+    formats = info.get('formats')
+    table = formats if isinstance(formats, FormatTable) else FormatTable(formats or [])
+    candidates = _candidates(table, policy, info.get('duration'))
+    if not candidates:
+        return None
+
+    reasons = []
+    total = len(candidates)
+    if not policy.ffmpeg and not policy.audio_only:
+        merged = [c for c in candidates if c.merged]
+        candidates = [c for c in candidates if not c.merged] or candidates
+        if merged and len(candidates) < total:
+            reasons.append(f"{len(merged)} video-only formats need FFmpeg to merge audio")
+
+    # Apply the limits in order of importance, skipping any that nothing meets
+    remaining = candidates
+    applied = set()
+    prefer_smallest = policy.prefer_smallest
+    for key, limit, reason, test in _limits(policy):
+        passing = [c for c in remaining if test(c)]
+        if not passing:
+            reasons.append(f"no format is {limit}, ignored that limit")
+            if key in ('max_height', 'max_filesize'):
+                # Get as close to the cap or budget as possible
+                prefer_smallest = True
+            elif key == 'min_height':
+                prefer_smallest = False
+            continue
+        if len(passing) < len(remaining):
+            reasons.append(f"{len(remaining) - len(passing)} excluded as {reason}")
+        remaining = passing
+        applied.add(key)
+
+    best = min(remaining, key=lambda c: _rank(c, policy, prefer_smallest))
+    if prefer_smallest and best.size is not None:
+        why = "smallest file"
+    elif prefer_smallest:
+        why = "lowest audio bitrate" if policy.audio_only else "lowest resolution"
+    elif policy.audio_only:
+        why = "highest audio bitrate"
+    else:
+        why = "highest resolution"
+    if 'max_height' in applied and not prefer_smallest:
+        why += f" up to {policy.max_height}p"
+    if 'min_height' in applied:
+        why += f" of at least {policy.min_height}p"
+    why += f" among {len(remaining)} of {total} candidates"
+    preferred = policy.audio_codecs if policy.audio_only else policy.video_codecs
+    if preferred:
+        why += f" (codec preference: {', '.join(preferred)})"
+    reasons.insert(0, why)
+    return Selection(best.formats, best.container, best.size, reasons)
+
+
+def format_spec(info: Dict, quality: str = 'best', audio_only: bool = False,
+                fallback: str = None, **options) -> Tuple[Optional[str], Optional[Selection]]:
+    """
+    Get a yt-dlp 'format' option for a video from the selection engine.
+
+    Args:
+        info (Dict): yt-dlp info dict with 'formats'
+        quality (str): Quality setting, see FormatPolicy.from_quality
+        audio_only (bool): Select an audio format
+        fallback (str): Selector yt-dlp uses if the chosen formats fail
+        **options: Further FormatPolicy arguments
+
+    Returns:
+        tuple: (format spec or the fallback, Selection or None)
+    """
+    selection = select_format(info, FormatPolicy.from_quality(quality, audio_only, **options))
+    # IDs with selector syntax in them cannot be passed through as-is
+    if selection is None or any(_SELECTOR_CHARS.search(str(fmt.format_id)) for fmt in selection.formats):
+        return fallback, None
+    spec = f"{selection.format_id}/{fallback}" if fallback else selection.format_id
+    return spec, selection
+
+
+if __name__ == "__main__":
+    sample = {'duration': 600, 'formats': [
+        {'format_id': '18', 'ext': 'mp4', 'height': 360, 'vcodec': 'avc1.42001E',
+         'acodec': 'mp4a.40.2', 'tbr': 500},
+        {'format_id': '136', 'ext': 'mp4', 'height': 720, 'vcodec': 'avc1.4d401f',
+         'acodec': 'none', 'tbr': 1500},
+        {'format_id': '247', 'ext': 'webm', 'height': 720, 'vcodec': 'vp9',
+         'acodec': 'none', 'tbr': 1100},
+        {'format_id': '137', 'ext': 'mp4', 'height': 1080, 'vcodec': 'avc1.640028',
+         'acodec': 'none', 'tbr': 4000},
+        {'format_id': '313', 'ext': 'webm', 'height': 2160, 'vcodec': 'vp9',
+         'acodec': 'none', 'tbr': 18000},
+        {'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 128},
+        {'format_id': '251', 'ext': 'webm', 'vcodec': 'none', 'acodec': 'opus', 'abr': 160},
+    ]}
+    for quality, options in (('best', {'ffmpeg': True}), ('720p', {'ffmpeg': True}),
+                             ('720p+', {'ffmpeg': True}),
+                             ('best', {'ffmpeg': True, 'max_filesize': 200 * 1024 * 1024}),
+                             ('best', {'ffmpeg': True, 'max_filesize': 10 * 1024 * 1024}),
+                             ('best', {'ffmpeg': False}), ('best', {'audio_only': True})):
+        print(f"{quality} {options}:")
+        print(format_spec(sample, quality, **options)[1].explain())
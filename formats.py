@@ -0,0 +1,260 @@
+"""
+Compact format tables for YouTube Video Downloader.
+Stores the formats of a video as slotted records, indexed once by height,
+codec and type, so info results stay small in memory and format queries do
+not re-scan the list.
+"""
+
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterable, List, Optional
+
+# Keys of a format record, in display order
+FORMAT_FIELDS = ('format_id', 'ext', 'quality', 'height', 'width', 'fps', 'vcodec',
+                 'acodec', 'filesize', 'format_note', 'tbr', 'abr', 'filesize_approx')
+
+# String values shared by many formats (containers, codecs, notes)
+_INTERNED = ('ext', 'vcodec', 'acodec', 'format_note')
+
+
+def codec_family(codec: Optional[str]) -> Optional[str]:
+    """Get the codec name without its profile, e.g. 'avc1' for 'avc1.640028'."""
+    if not codec or codec == 'none':
+        return None
+    return codec.split('.')[0].lower()
+
+
+class Format(Mapping):
+    """
+    One format of a video.
+
+    A mapping with the keys of FORMAT_FIELDS, so existing callers
+    keep using fmt['height'] and fmt.get('acodec'), but stored in slots
+    instead of a per-format dict.
+    """
+
+    __slots__ = FORMAT_FIELDS
+
+    def __init__(self, fmt: Dict):
+        """
+        Initialize the record.
+
+        Args:
+            fmt (Dict): Format dict from a yt-dlp info dict
+        """
+        for field in FORMAT_FIELDS:
+            value = fmt.get(field)
+            if field in _INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, field, value)
+        if self.format_note is None:
+            self.format_note = ''
+
+    def __getitem__(self, key: str):
+        if key not in FORMAT_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(FORMAT_FIELDS)
+
+    def __len__(self) -> int:
+        return len(FORMAT_FIELDS)
+
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in FORMAT_FIELDS)
+
+    def __setstate__(self, state):
+        for field, value in zip(FORMAT_FIELDS, state):
+            setattr(self, field, value)
+
+    def __repr__(self) -> str:
+        return f"Format({self.format_id!r}, {self.ext!r}, height={self.height!r})"
+
+    @property
+    def has_video(self) -> bool:
+        return self.vcodec not in (None, 'none')
+
+    @property
+    def has_audio(self) -> bool:
+        return self.acodec not in (None, 'none')
+
+    def to_dict(self) -> Dict:
+        """Get the record as a plain dict (e.g. for JSON)."""
+        return {field: getattr(self, field) for field in FORMAT_FIELDS}
+
+
+def _video_rank(fmt: Format) -> tuple:
+    return (fmt.height or 0, fmt.fps or 0, fmt.tbr or 0, fmt.quality or 0)
+
+
+def _audio_rank(fmt: Format) -> tuple:
+    return (fmt.abr or fmt.tbr or 0, fmt.quality or 0)
+
+
+class FormatTable(Sequence):
+    """
+    The downloadable formats of a video.
+
+    Behaves like the list of format dicts get_video_info used to return
+    (indexing, len, iteration in extraction order) and adds lookups that are
+    computed once. The indexes are column arrays rather than dicts of lists:
+    one array orders the formats as video (by height, then best first) and
+    audio (best first), and a second one holds where each height starts, so
+    a table costs little more than its records. Heights are stored negated,
+    highest first in ascending order, so they can be bisected directly.
+    """
+
+    __slots__ = ('_formats', '_order', '_heights', '_starts', '_codecs')
+
+    def __init__(self, formats: Iterable[Dict] = ()):
+        """
+        Build the table.
+
+        Args:
+            formats (Iterable[Dict]): yt-dlp format dicts; formats without
+                video and audio (e.g. storyboards) are left out
+        """
+        self._formats = tuple(Format(fmt) for fmt in formats
+                              if fmt.get('vcodec') != 'none' or fmt.get('acodec') != 'none')
+        video = sorted((i for i, fmt in enumerate(self._formats) if fmt.height),
+                       key=lambda i: _video_rank(self._formats[i]), reverse=True)
+        audio = sorted((i for i, fmt in enumerate(self._formats)
+                        if not fmt.height and fmt.has_audio),
+                       key=lambda i: _audio_rank(self._formats[i]), reverse=True)
+        self._order = array('I', video + audio)
+        # Distinct heights, negated and highest first, and where each starts in
+        # _order; the last start is where the audio formats begin
+        self._heights = array('i')
+        self._starts = array('I')
+        for position, index in enumerate(video):
+            height = -self._formats[index].height
+            if not self._heights or self._heights[-1] != height:
+                self._heights.append(height)
+                self._starts.append(position)
+        self._starts.append(len(video))
+        self._codecs: Optional[Dict[str, array]] = None
+
+    def __getitem__(self, index):
+        return self._formats[index]
+
+    def __len__(self) -> int:
+        return len(self._formats)
+
+    def __repr__(self) -> str:
+        return f"FormatTable({len(self._formats)} formats, heights={self.heights()})"
+
+    def _take(self, start: int, end: int = None) -> List[Format]:
+        return [self._formats[i] for i in self._order[start:end]]
+
+    def video(self) -> List[Format]:
+        """Formats with a picture, highest resolution first."""
+        return self._take(0, self._starts[-1])
+
+    def audio(self) -> List[Format]:
+        """Audio-only formats, highest bitrate first."""
+        return self._take(self._starts[-1])
+
+    def heights(self) -> List[int]:
+        """Available heights, highest first."""
+        return [-height for height in self._heights]
+
+    def _height_position(self, max_height: int) -> int:
+        """Position in _heights of the highest height not above max_height."""
+        return bisect_left(self._heights, -max_height)
+
+    def by_height(self, height: int) -> List[Format]:
+        """Formats of exactly one height, best first."""
+        position = self._height_position(height)
+        if position == len(self._heights) or self._heights[position] != -height:
+            return []
+        return self._take(self._starts[position], self._starts[position + 1])
+
+    def by_codec(self, codec: str) -> List[Format]:
+        """Formats using a video or audio codec, e.g. 'vp9', 'avc1' or 'opus'."""
+        if self._codecs is None:
+            # Built on the first codec query; most info results never need it
+            codecs: Dict[str, array] = {}
+            for index in self._order:
+                fmt = self._formats[index]
+                for family in {codec_family(fmt.vcodec), codec_family(fmt.acodec)} - {None}:
+                    codecs.setdefault(family, array('I')).append(index)
+            self._codecs = codecs
+        return [self._formats[i] for i in self._codecs.get(codec_family(codec), ())]
+
+    def best_video(self, max_height: int = None) -> Optional[Format]:
+        """
+        Get the best format with a picture.
+
+        Args:
+            max_height (int): Highest acceptable height (default: no cap)
+
+        Returns:
+            Optional[Format]: Best format, None if none fits
+        """
+        position = 0 if max_height is None else self._height_position(max_height)
+        if position == len(self._heights):
+            return None
+        return self._formats[self._order[self._starts[position]]]
+
+    def best_audio(self) -> Optional[Format]:
+        """Get the audio-only format with the highest bitrate."""
+        start = self._starts[-1]
+        return self._formats[self._order[start]] if start < len(self._order) else None
+
+    def to_list(self) -> List[Dict]:
+        """Get the formats as plain dicts (e.g. for JSON)."""
+        return [fmt.to_dict() for fmt in self._formats]
+
+    def __getstate__(self):
+        return self._formats
+
+    def __setstate__(self, state):
+        # Indexes are rebuilt rather than pickled
+        self.__init__(fmt.to_dict() for fmt in state)
+
+
+def json_default(obj):
+    """
+    json.dumps default that writes format records as plain dicts.
+
+    Info dicts from get_video_info hold a FormatTable, which json cannot
+    serialize on its own; anything else unknown is written as a string.
+    """
+    if isinstance(obj, FormatTable):
+        return obj.to_list()
+    if isinstance(obj, Format):
+        return obj.to_dict()
+    return str(obj)
+
+
+if __name__ == "__main__":
+    import time
+    import tracemalloc
+
+    sample = [{'format_id': str(i), 'ext': 'mp4' if i % 2 else 'webm',
+               'height': (144, 240, 360, 480, 720, 1080, 1440, 2160)[i % 8],
+               'vcodec': 'avc1.640028' if i % 2 else 'vp9', 'acodec': 'none',
+               'fps': 30, 'tbr': 100.0 + i, 'format_note': f"{i % 8}p"} for i in range(16)]
+    sample += [{'format_id': f"a{i}", 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.2',
+                'abr': 48.0 * (i + 1), 'format_note': 'audio'} for i in range(4)]
+
+    def as_dicts():
+        return [{key: fmt.get(key) for key in FORMAT_FIELDS[:10]} for fmt in sample]
+
+    for name, build in (('list of dicts', as_dicts), ('FormatTable', lambda: FormatTable(sample))):
+        tracemalloc.start()
+        results = [build() for _ in range(2000)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{name}: {size / len(results) / 1024:.1f} KB per video")
+
+    table = FormatTable(sample)
+    start = time.perf_counter()
+    for _ in range(10000):
+        table.best_video(720), table.best_audio(), table.heights()
+    print(f"best lookups: {(time.perf_counter() - start) / 10000 * 1e6:.2f} us")
+    print(f"best video <= 720p: {table.best_video(720)}")
+    print(f"best audio: {table.best_audio()}")
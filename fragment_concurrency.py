@@ -0,0 +1,115 @@
+"""
+Adaptive fragment concurrency for YouTube Video Downloader.
+Chooses how many HLS/DASH fragments yt-dlp fetches in parallel from the
+throughput measured on earlier fragmented downloads.
+"""
+
+import threading
+import time
+from typing import Dict
+
+from config import config
+
+# Relative throughput difference below which two levels are considered equal
+TOLERANCE = 0.1
+
+
+class FragmentConcurrency:
+    """
+    Hill-climbing controller for yt-dlp's 'concurrent_fragment_downloads'.
+
+    yt-dlp fixes the fragment worker count when a download starts, so the
+    level is adapted between downloads: every finished fragmented download
+    reports its throughput at the level it ran with. While the current level
+    is the best measured so far, the next download tries double (then half)
+    the workers within the limits; otherwise downloads settle on the best
+    level seen. Measurements are smoothed so one slow video does not undo
+    what earlier ones learned.
+    """
+
+    def __init__(self, initial: int = None, minimum: int = None, maximum: int = None,
+                 adaptive: bool = None):
+        """
+        Initialize the controller.
+
+        Args:
+            initial (int): Starting worker count (default: config 'fragment_concurrency')
+            minimum (int): Lowest worker count (default: config 'fragment_concurrency_min')
+            maximum (int): Highest worker count (default: config 'fragment_concurrency_max')
+            adaptive (bool): Adapt to measured throughput
+                (default: config 'adaptive_fragment_concurrency')
+        """
+        self.minimum = max(1, minimum or config.get('fragment_concurrency_min', 1))
+        self.maximum = max(self.minimum, maximum or config.get('fragment_concurrency_max', 16))
+        initial = initial or config.get('fragment_concurrency', 4)
+        self.current = min(self.maximum, max(self.minimum, initial))
+        self.adaptive = config.get('adaptive_fragment_concurrency', True) if adaptive is None else adaptive
+        self.throughput: Dict[int, float] = {}  # workers -> smoothed bytes per second
+        self._started: Dict[str, float] = {}  # filename -> start time
+        self._lock = threading.Lock()
+
+    def record(self, workers: int, bytes_per_second: float):
+        """
+        Record the throughput of a fragmented download and pick the next level.
+
+        Args:
+            workers (int): Fragment workers the download ran with
+            bytes_per_second (float): Measured throughput
+        """
+        with self._lock:
+            previous = self.throughput.get(workers)
+            self.throughput[workers] = (bytes_per_second if previous is None
+                                        else 0.5 * previous + 0.5 * bytes_per_second)
+            if not self.adaptive:
+                return
+
+            # Levels within the tolerance of the fastest count as equal, and
+            # the one with the fewest workers wins, so extra connections are
+            # only kept when they actually pay off
+            fastest = max(self.throughput.values())
+            best = min(level for level, rate in self.throughput.items()
+                       if rate >= fastest * (1 - TOLERANCE))
+            self.current = best
+            if best == workers:
+                # Still the fastest level: try more workers, then fewer
+                for candidate in (min(self.maximum, best * 2), max(self.minimum, best // 2)):
+                    if candidate not in self.throughput:
+                        self.current = candidate
+                        break
+
+    def _progress_hook(self, d, workers: int):
+        """yt-dlp progress hook that measures fragmented downloads."""
+        filename = d.get('filename')
+        if d['status'] == 'downloading':
+            # Only fragment downloaders report fragment_index
+            if d.get('fragment_index') is not None:
+                with self._lock:
+                    self._started.setdefault(filename, time.monotonic())
+        elif d['status'] in ('finished', 'error'):
+            with self._lock:
+                start = self._started.pop(filename, None)
+            if start is not None and d['status'] == 'finished':
+                elapsed = d.get('elapsed') or (time.monotonic() - start)
+                size = d.get('total_bytes') or d.get('downloaded_bytes')
+                if size and elapsed > 0:
+                    self.record(workers, size / elapsed)
+
+    def apply(self, ydl_opts: Dict) -> Dict:
+        """
+        Add the current fragment concurrency and measuring hook to yt-dlp options.
+
+        Args:
+            ydl_opts (Dict): yt-dlp options, updated in place
+
+        Returns:
+            Dict: The same options
+        """
+        workers = self.current
+        ydl_opts['concurrent_fragment_downloads'] = workers
+        ydl_opts['progress_hooks'] = list(ydl_opts.get('progress_hooks') or []) + [
+            lambda d: self._progress_hook(d, workers)]
+        return ydl_opts
+
+
+# Global controller shared by all downloaders, so every download learns from the others
+fragment_concurrency = FragmentConcurrency()
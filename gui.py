@@ -4,7 +4,7 @@ import threading
 import os
 from pathlib import Path
 import webbrowser
-from youtube_downloader import YouTubeDownloader
+from download_engine import YouTubeDownloader
 
 
 class YouTubeDownloaderGUI:
@@ -208,8 +208,8 @@ Available Formats:
 """
                 
                 # Add format information
-                video_formats = [f for f in info['formats'] if f['height']]
-                audio_formats = [f for f in info['formats'] if not f['height'] and f['acodec'] != 'none']
+                video_formats = info['formats'].video()
+                audio_formats = info['formats'].audio()
                 
                 if video_formats:
                     info_text += "\nVideo Formats:\n"
@@ -0,0 +1,412 @@
+"""
+Persistent download job queue for YouTube Video Downloader.
+Jobs live in a SQLite database so a crashed or interrupted run can resume.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from config import config
+from progress import ProgressThrottle
+
+# Job states
+PENDING = 'pending'
+RUNNING = 'running'
+PAUSED = 'paused'
+FINISHED = 'finished'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# A running job belongs to its run while the run keeps renewing the lease;
+# a job whose lease ran out, or whose run's process on this machine is gone,
+# was left behind by a crashed or killed run
+LEASE_SECONDS = 60
+
+
+def _process_alive(pid: int) -> bool:
+    """Check whether a process on this machine is still running."""
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return kernel32.GetLastError() == 5  # ERROR_ACCESS_DENIED: exists
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'pending',
+    bytes_done INTEGER NOT NULL DEFAULT 0,
+    total_bytes INTEGER NOT NULL DEFAULT 0,
+    output_path TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+"""
+
+
+class JobQueue:
+    """
+    Durable queue of download jobs backed by SQLite.
+
+    Each job records its URL, download options, status, bytes downloaded and
+    output path. A claimed job is leased to the run that claimed it; jobs still
+    'running' after their lease expired were left by a process that died, are
+    put back to 'pending' by `recover_interrupted`, and yt-dlp continues their
+    .part files. Jobs of a live run on another process are left alone.
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Initialize the job queue.
+
+        Args:
+            db_path (str): SQLite database file (default: ~/.youtube_downloader/jobs.db)
+        """
+        self.db_path = Path(db_path) if db_path else Path(config.config_file).parent / 'jobs.db'
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+            # Databases created before leases were added
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            with conn:
+                for column, kind in (('owner', 'TEXT'), ('lease_until', 'REAL')):
+                    if column not in columns:
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        """Run a write statement in its own transaction."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    return conn.execute(sql, params)
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job['options'] = json.loads(job['options'])
+        return job
+
+    def enqueue(self, url: str, **options) -> int:
+        """
+        Add a download job.
+
+        Args:
+            url (str): Video URL
+            **options: Download options, e.g. quality, audio_only, output
+
+        Returns:
+            int: ID of the new job
+        """
+        now = time.time()
+        cursor = self._execute(
+            "INSERT INTO jobs (url, options, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (url, json.dumps(options), PENDING, now, now))
+        return cursor.lastrowid
+
+    def enqueue_many(self, urls: Iterable[str], **options) -> int:
+        """
+        Add one job per URL in a single transaction.
+
+        Returns:
+            int: Number of jobs added
+        """
+        now = time.time()
+        encoded = json.dumps(options)
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    cursor = conn.executemany(
+                        "INSERT INTO jobs (url, options, status, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        ((url, encoded, PENDING, now, now) for url in urls))
+                    return cursor.rowcount
+            finally:
+                conn.close()
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        """Get a job by ID."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._row_to_job(row) if row else None
+
+    def list_jobs(self, status: str = None) -> List[Dict]:
+        """
+        List jobs, optionally filtered by status.
+
+        Args:
+            status (str): Only return jobs in this state
+
+        Returns:
+            List[Dict]: Jobs in insertion order
+        """
+        conn = self._connect()
+        try:
+            if status:
+                rows = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id",
+                                    (status,)).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY id").fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_job(row) for row in rows]
+
+    @staticmethod
+    def new_owner() -> str:
+        """Get a unique ID for a run that claims jobs."""
+        return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def claim_next(self, owner: str = None) -> Optional[Dict]:
+        """
+        Atomically take the oldest pending job and mark it running.
+
+        Args:
+            owner (str): Run the job is leased to, from new_owner()
+
+        Returns:
+            Optional[Dict]: The claimed job, or None if nothing is pending
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.isolation_level = None
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id LIMIT 1",
+                                   (PENDING,)).fetchone()
+                if row:
+                    now = time.time()
+                    conn.execute("UPDATE jobs SET status = ?, attempts = attempts + 1, "
+                                 "error = NULL, owner = ?, lease_until = ?, updated_at = ? "
+                                 "WHERE id = ?",
+                                 (RUNNING, owner, now + LEASE_SECONDS, now, row['id']))
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+        return self._row_to_job(row) if row else None
+
+    def update_progress(self, job_id: int, bytes_done: int, total_bytes: int = 0,
+                        output_path: str = None):
+        """Record how far a running job has got."""
+        self._execute(
+            "UPDATE jobs SET bytes_done = ?, total_bytes = ?, "
+            "output_path = COALESCE(?, output_path), updated_at = ? WHERE id = ?",
+            (bytes_done, total_bytes or 0, output_path, time.time(), job_id))
+
+    def set_status(self, job_id: int, status: str, error: str = None,
+                   output_path: str = None):
+        """Set the state of a job."""
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, "
+            "bytes_done = CASE WHEN ? = 'finished' THEN total_bytes ELSE bytes_done END, "
+            "output_path = COALESCE(?, output_path), updated_at = ? WHERE id = ?",
+            (status, error, status, output_path, time.time(), job_id))
+
+    def renew_lease(self, owner: str) -> int:
+        """
+        Extend the lease of every job a run is working on.
+
+        Returns:
+            int: Number of renewed jobs
+        """
+        now = time.time()
+        return self._execute("UPDATE jobs SET lease_until = ? WHERE status = ? AND owner = ?",
+                             (now + LEASE_SECONDS, RUNNING, owner)).rowcount
+
+    def _dead_owners(self) -> List[str]:
+        """Get the runs on this machine that hold live leases but have exited."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                owners = [row[0] for row in conn.execute(
+                    "SELECT DISTINCT owner FROM jobs WHERE status = ? AND owner IS NOT NULL "
+                    "AND lease_until >= ?", (RUNNING, time.time()))]
+            finally:
+                conn.close()
+        host = socket.gethostname()
+        dead = []
+        for owner in owners:
+            owner_host, _, rest = owner.rpartition(':')[0].rpartition(':')
+            if owner_host == host and rest.isdigit() and not _process_alive(int(rest)):
+                dead.append(owner)
+        return dead
+
+    def _interrupted_clause(self) -> tuple:
+        """
+        Build the condition matching running jobs whose run is gone.
+
+        Returns:
+            tuple: SQL condition and its parameters
+        """
+        dead = self._dead_owners()
+        sql = "(status = ? AND (lease_until IS NULL OR lease_until < ?"
+        if dead:
+            sql += f" OR owner IN ({', '.join('?' for _ in dead)})"
+        return sql + "))", [RUNNING, time.time(), *dead]
+
+    def recover_interrupted(self) -> int:
+        """
+        Put jobs left 'running' by a crashed process back in the queue.
+
+        Only jobs whose lease has expired, or whose run was a process on this
+        machine that no longer exists, are recovered, so the jobs of a run
+        still going in another process are not downloaded twice.
+
+        Returns:
+            int: Number of recovered jobs
+        """
+        interrupted, params = self._interrupted_clause()
+        return self._execute(f"UPDATE jobs SET status = ?, updated_at = ? WHERE {interrupted}",
+                             (PENDING, time.time(), *params)).rowcount
+
+    def resume(self, job_ids: Iterable[int] = None) -> int:
+        """
+        Requeue paused, failed, cancelled or interrupted jobs.
+
+        Running jobs count as interrupted only once their lease has expired or
+        their run's process on this machine has exited.
+
+        Args:
+            job_ids (Iterable[int]): Jobs to requeue (default: all resumable jobs)
+
+        Returns:
+            int: Number of requeued jobs
+        """
+        resumable = (PAUSED, FAILED, CANCELLED)
+        placeholders = ', '.join('?' for _ in resumable)
+        interrupted, interrupted_params = self._interrupted_clause()
+        sql = (f"UPDATE jobs SET status = ?, updated_at = ? "
+               f"WHERE (status IN ({placeholders}) OR {interrupted})")
+        params = [PENDING, time.time(), *resumable, *interrupted_params]
+        if job_ids is not None:
+            job_ids = list(job_ids)
+            if not job_ids:
+                return 0
+            sql += f" AND id IN ({', '.join('?' for _ in job_ids)})"
+            params.extend(job_ids)
+        return self._execute(sql, tuple(params)).rowcount
+
+    def remove_finished(self) -> int:
+        """Delete finished jobs from the queue."""
+        return self._execute("DELETE FROM jobs WHERE status = ?", (FINISHED,)).rowcount
+
+    def run(self, download_path: str = "downloads", workers: int = None,
+            progress_callback=None) -> Dict:
+        """
+        Download all pending jobs on the batch engine.
+
+        Jobs interrupted by an earlier crash are recovered first. The jobs
+        this run claims are leased to it and the lease is renewed while the run
+        goes on, so a second run started at the same time takes other jobs.
+        Each job's status is written as soon as the job is settled, and
+        progress about once per second per job.
+
+        Args:
+            download_path (str): Default directory for jobs without an 'output' option
+            workers (int): Number of parallel downloads
+            progress_callback (Callable): Optional callback for progress events
+
+        Returns:
+            Dict: Summary from BatchDownloader.run_jobs: job counts per status
+                plus 'total', and the result dicts of failed jobs under 'failures'
+        """
+        from batch_downloader import BatchDownloader
+
+        self.recover_interrupted()
+        owner = self.new_owner()
+        batch = BatchDownloader(download_path, workers)
+        db_throttle = ProgressThrottle(max_rate=1)
+        output_paths: Dict[int, str] = {}
+
+        def record_progress(info):
+            job_id = info['job_id']
+            if info.get('status') == 'finished':
+                output_paths[job_id] = info.get('filename')
+            elif db_throttle.ready(job_id):
+                self.update_progress(job_id, info.get('downloaded') or 0,
+                                     info.get('total') or 0, info.get('filename'))
+            if progress_callback:
+                progress_callback(info)
+
+        batch.set_progress_callback(record_progress)
+
+        def jobs():
+            while True:
+                job = self.claim_next(owner)
+                if job is None:
+                    return
+                options = job['options']
+                downloader = batch.make_downloader(job['id'], job['url'])
+                if options.get('output'):
+                    downloader.download_path = Path(options['output'])
+                    downloader.download_path.mkdir(parents=True, exist_ok=True)
+                yield job['id'], job['url'], (
+                    lambda d=downloader, u=job['url'], o=options: d.download_video(
+                        u, o.get('quality', 'best'), o.get('audio_only', False),
+                        o.get('filename')))
+
+        def record_result(result):
+            job_id = result['job_id']
+            db_throttle.ready(job_id, final=True)
+            self.set_status(job_id, result['status'], error=result.get('error'),
+                            output_path=output_paths.pop(job_id, None))
+
+        stopped = threading.Event()
+
+        def keep_leases():
+            while not stopped.wait(LEASE_SECONDS / 4):
+                try:
+                    self.renew_lease(owner)
+                except sqlite3.Error as e:
+                    print(f"Warning: Could not renew job leases: {e}")
+
+        heartbeat = threading.Thread(target=keep_leases, name='job-lease', daemon=True)
+        heartbeat.start()
+        try:
+            return batch.run_jobs(jobs(), record_result)
+        finally:
+            stopped.set()
+            heartbeat.join()
@@ -4,10 +4,9 @@ YouTube Video Downloader - Executable Launcher
 A simple launcher that starts the GUI by default or CLI if requested.
 """
 
+import multiprocessing
 import sys
 import os
-import tkinter as tk
-from tkinter import messagebox
 from pathlib import Path
 
 # Add the current directory to Python path
@@ -17,6 +16,10 @@ sys.path.insert(0, str(current_dir))
 def show_error(title, message):
     """Show error message to user."""
     try:
+        # Imported here so CLI runs never load tkinter
+        import tkinter as tk
+        from tkinter import messagebox
+        
         root = tk.Tk()
         root.withdraw()  # Hide the main window
         messagebox.showerror(title, message)
@@ -75,4 +78,7 @@ def main():
         return 1
 
 if __name__ == "__main__":
+    # Worker processes of a frozen exe (e.g. loudness normalization) start
+    # here and must run their task instead of the app
+    multiprocessing.freeze_support()
     sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Audio loudness normalization for YouTube Video Downloader.
+Two-pass EBU R128 normalization with FFmpeg's loudnorm filter: each file is
+measured once and re-encoded once with a linear gain, measurements are cached
+by file hash, and batches are spread over a process pool.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from config import config
+from ffmpeg_probe import get_ffmpeg_path
+from metrics import metrics
+
+# Measurements kept on disk; the oldest entries are dropped beyond this
+MAX_CACHE_ENTRIES = 10000
+
+# Audio encoder per output container, with the bitrate flag for lossy codecs
+AUDIO_ENCODERS = {
+    '.mp3': ('libmp3lame', True),
+    '.m4a': ('aac', True),
+    '.mp4': ('aac', True),
+    '.mov': ('aac', True),
+    '.mkv': ('aac', True),
+    '.webm': ('libopus', True),
+    '.opus': ('libopus', True),
+    '.ogg': ('libvorbis', True),
+    '.flac': ('flac', False),
+    '.wav': ('pcm_s16le', False),
+}
+
+# loudnorm upsamples to 192 kHz internally; write a rate every codec accepts
+OUTPUT_SAMPLE_RATE = '48000'
+
+
+def default_target() -> Tuple[float, float, float]:
+    """Get the (integrated LUFS, true peak dBTP, loudness range LU) target from config."""
+    return (float(config.get('loudnorm_integrated', -16.0)),
+            float(config.get('loudnorm_true_peak', -1.5)),
+            float(config.get('loudnorm_range', 11.0)))
+
+
+def file_hash(path: str) -> str:
+    """Get the SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _target_filter(target: Tuple[float, float, float]) -> str:
+    integrated, true_peak, loudness_range = target
+    return f"loudnorm=I={integrated}:TP={true_peak}:LRA={loudness_range}"
+
+
+def _parse_loudnorm_json(output: str) -> Dict:
+    """Extract the JSON block loudnorm prints at the end of FFmpeg's log."""
+    start, end = output.rfind('{'), output.rfind('}')
+    if start < 0 or end < start:
+        raise Exception("FFmpeg printed no loudness measurement")
+    return json.loads(output[start:end + 1])
+
+
+def measure(path: str, ffmpeg_path: str, target: Tuple[float, float, float]) -> Dict:
+    """
+    Run the analysis pass of loudnorm on the first audio stream of a file.
+
+    Args:
+        path (str): Audio or video file
+        ffmpeg_path (str): FFmpeg binary
+        target (tuple): Integrated loudness, true peak and loudness range target
+
+    Returns:
+        Dict: loudnorm's 'input_i', 'input_tp', 'input_lra', 'input_thresh'
+            and 'target_offset' values
+    """
+    result = subprocess.run(
+        [ffmpeg_path, '-hide_banner', '-nostats', '-i', path, '-map', '0:a:0',
+         '-af', f"{_target_filter(target)}:print_format=json", '-f', 'null', '-'],
+        capture_output=True, text=True)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise Exception(f"Loudness analysis failed: {lines[-1] if lines else result.returncode}")
+    return _parse_loudnorm_json(result.stderr)
+
+
+def apply(path: str, ffmpeg_path: str, target: Tuple[float, float, float],
+          measured: Dict, bitrate: str = None):
+    """
+    Re-encode the audio of a file with the gain from a measurement, in place.
+
+    Linear mode applies one gain to the whole file, so the dynamics are kept
+    and the measurement stays valid. Video and subtitle streams are copied.
+
+    Args:
+        path (str): File that was measured
+        ffmpeg_path (str): FFmpeg binary
+        target (tuple): Target the measurement was made for
+        measured (Dict): Result of measure()
+        bitrate (str): Audio bitrate in kbps for lossy codecs
+            (default: config 'audio_quality')
+    """
+    encoder, lossy = AUDIO_ENCODERS.get(Path(path).suffix.lower(), ('aac', True))
+    audio_filter = (f"{_target_filter(target)}"
+                    f":measured_I={measured['input_i']}:measured_TP={measured['input_tp']}"
+                    f":measured_LRA={measured['input_lra']}:measured_thresh={measured['input_thresh']}"
+                    f":offset={measured['target_offset']}:linear=true:print_format=summary")
+    temp_path = str(Path(path).with_name(f"{Path(path).stem}.loudnorm{Path(path).suffix}"))
+
+    command = [ffmpeg_path, '-hide_banner', '-nostats', '-loglevel', 'error', '-y', '-i', path,
+               '-map', '0', '-c', 'copy', '-af', audio_filter, '-c:a', encoder,
+               '-ar', OUTPUT_SAMPLE_RATE]
+    if lossy:
+        command += ['-b:a', f"{bitrate or config.get('audio_quality', '192')}k"]
+    result = subprocess.run(command + [temp_path], capture_output=True, text=True)
+    if result.returncode != 0:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        lines = result.stderr.strip().splitlines()
+        raise Exception(f"Loudness normalization failed: {lines[-1] if lines else result.returncode}")
+    os.replace(temp_path, path)
+
+
+def _normalize_file(path: str, ffmpeg_path: str, target: Tuple[float, float, float],
+                    measured: Optional[Dict], bitrate: str) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Measure (unless a cached measurement is given) and normalize one file.
+
+    Runs in a worker process.
+
+    Returns:
+        tuple: (measurement, hash of the normalized file); the hash is None if
+            the file is silent and was left alone
+    """
+    if measured is None:
+        measured = measure(path, ffmpeg_path, target)
+    if float(measured['input_i']) == float('-inf'):
+        return measured, None
+    apply(path, ffmpeg_path, target, measured, bitrate)
+    return measured, file_hash(path)
+
+
+class LoudnessCache:
+    """
+    On-disk cache of loudness measurements keyed by file hash.
+
+    Entries for downloaded files hold the analysis pass, so a re-run of the
+    same file skips straight to the encode. Entries for normalized files mark
+    them as done for a target, so normalizing them again is a no-op.
+    """
+
+    def __init__(self, cache_file: str = None):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_file (str): JSON file (default: loudness_cache.json next to the config)
+        """
+        self.cache_file = Path(cache_file) if cache_file else Path(config.config_file).parent / 'loudness_cache.json'
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, digest: str) -> Optional[Dict]:
+        """Get the entry of a file hash."""
+        with self._lock:
+            return self._load().get(digest)
+
+    def put(self, updates: Dict[str, Dict]):
+        """Store entries by file hash and write the cache file."""
+        with self._lock:
+            entries = self._load()
+            for digest, entry in updates.items():
+                entries.pop(digest, None)
+                entries[digest] = entry
+            while len(entries) > MAX_CACHE_ENTRIES:
+                del entries[next(iter(entries))]
+            try:
+                self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f)
+            except OSError as e:
+                print(f"Warning: Could not save loudness cache: {e}")
+
+
+def normalize_files(paths: Iterable[str], target: Tuple[float, float, float] = None,
+                    workers: int = None, bitrate: str = None) -> Dict[str, str]:
+    """
+    Normalize the loudness of many files in place.
+
+    Files are hashed first; files that are already normalized to the target
+    are skipped and files with a cached measurement skip the analysis pass.
+    A single file is processed in this process, more go to a process pool.
+
+    Args:
+        paths (Iterable[str]): Audio or video files
+        target (tuple): (integrated LUFS, true peak dBTP, loudness range LU)
+            (default: config 'loudnorm_integrated', 'loudnorm_true_peak', 'loudnorm_range')
+        workers (int): Worker processes
+            (default: config 'postprocess_workers', else one per CPU core)
+        bitrate (str): Audio bitrate in kbps for lossy codecs
+
+    Returns:
+        Dict[str, str]: Per path 'normalized', 'skipped', 'silent' or 'failed: <error>'
+    """
+    paths = [str(path) for path in paths]
+    target = tuple(target or default_target())
+    results = {}
+    if not paths:
+        return results
+
+    ffmpeg_path = get_ffmpeg_path()
+    if not ffmpeg_path:
+        print("Warning: FFmpeg not available, skipping audio normalization")
+        return {path: 'skipped' for path in paths}
+
+    workers = max(1, min(len(paths), workers or config.get('postprocess_workers') or os.cpu_count() or 1))
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        with metrics.span('loudnorm'):
+            digests = list(executor.map(file_hash, paths) if executor else map(file_hash, paths))
+            pending = []
+            for path, digest in zip(paths, digests):
+                entry = loudness_cache.get(digest) or {}
+                if entry.get('normalized') == list(target):
+                    results[path] = 'skipped'
+                    continue
+                measured = entry.get('measured') if entry.get('target') == list(target) else None
+                args = (path, ffmpeg_path, target, measured, bitrate)
+                pending.append((path, digest, executor.submit(_normalize_file, *args)
+                                if executor else args))
+
+            updates = {}
+            for path, digest, job in pending:
+                try:
+                    measured, output_digest = job.result() if executor else _normalize_file(*job)
+                except Exception as e:
+                    print(f"Warning: Could not normalize {path}: {e}")
+                    results[path] = f"failed: {e}"
+                    continue
+                updates[digest] = {'target': list(target), 'measured': measured}
+                if output_digest:
+                    updates[output_digest] = {'normalized': list(target)}
+                results[path] = 'normalized' if output_digest else 'silent'
+            if updates:
+                loudness_cache.put(updates)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    for result in results.values():
+        metrics.inc('ytd_loudnorm_files_total', result=result.split(':')[0])
+    return results
+
+
+def normalize_file(path: str, target: Tuple[float, float, float] = None, bitrate: str = None) -> str:
+    """
+    Normalize the loudness of one file in place.
+
+    Returns:
+        str: 'normalized', 'skipped' or 'silent'
+    """
+    result = normalize_files([path], target, workers=1, bitrate=bitrate)[str(path)]
+    if result.startswith('failed'):
+        raise Exception(f"Audio normalization {result}")
+    return result
+
+
+# Global cache shared by all downloaders in the process
+loudness_cache = LoudnessCache()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python loudnorm.py <file> [file ...]")
+        sys.exit(1)
+
+    for path, result in normalize_files(sys.argv[1:]).items():
+        print(f"{result}: {path}")
@@ -1,15 +1,16 @@
 #!/usr/bin/env python3
 """
 YouTube Video Downloader - Main Launcher
-Choose between GUI and CLI interfaces.
+Choose between GUI and CLI interfaces, or run the headless download daemon.
 """
 
+import multiprocessing
 import sys
 import argparse
 from pathlib import Path
 
 def main():
-    """Main launcher that chooses between GUI and CLI."""
+    """Main launcher that chooses between GUI, CLI and daemon."""
     parser = argparse.ArgumentParser(
         description="YouTube Video Downloader",
         add_help=False
@@ -18,11 +19,17 @@ def main():
                        help='Use command-line interface')
     parser.add_argument('--gui', action='store_true',
                        help='Use graphical interface (default)')
+    parser.add_argument('--serve', action='store_true',
+                       help='Run the download daemon with a local HTTP/JSON API')
     
     # Parse known args to check for --cli flag
     known_args, remaining_args = parser.parse_known_args()
     
-    if known_args.cli or (len(sys.argv) > 1 and not known_args.gui):
+    if known_args.serve:
+        # Daemon options (--host, --port, --workers, --output) go to daemon.py
+        from daemon import main as daemon_main
+        return daemon_main(remaining_args)
+    elif known_args.cli or (len(sys.argv) > 1 and not known_args.gui):
         # Use CLI
         from cli import main as cli_main
         # Pass remaining arguments to CLI
@@ -41,4 +48,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Worker processes of a frozen exe (e.g. loudness normalization) start
+    # here and must run their task instead of the app
+    multiprocessing.freeze_support()
     sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Metadata cache for YouTube Video Downloader.
+Keeps extracted video info in memory (LRU) and optionally on disk, with a TTL.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import config
+from formats import json_default
+from utils import extract_video_id
+
+
+class MetadataCache:
+    """
+    Thread-safe LRU cache of yt-dlp info dicts keyed by normalized video ID.
+
+    Entries older than `ttl` seconds are treated as missing, since the format
+    URLs inside an info dict expire after a few hours. When `cache_dir` is set,
+    every entry is also written to its own JSON file so later runs can reuse it.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 1800,
+                 cache_dir: str = None):
+        """
+        Initialize the metadata cache.
+
+        Args:
+            max_entries (int): Maximum number of entries kept in memory
+            ttl (float): Seconds an entry stays valid
+            cache_dir (str): Directory for persistent entries, None for memory only
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        """Return the cache key for a URL: the video ID if known, else the URL."""
+        url = url.strip()
+        return extract_video_id(url) or url
+
+    def _entry_path(self, key: str) -> Path:
+        """Get the on-disk file for a cache key."""
+        if not re.fullmatch(r'[\w-]+', key):
+            key = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def _is_fresh(self, stored_at: float) -> bool:
+        return time.time() - stored_at < self.ttl
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Get cached info for a URL.
+
+        Args:
+            url (str): Video URL
+
+        Returns:
+            Optional[Dict]: Cached info dict, or None if missing or expired
+        """
+        key = self.key_for(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._is_fresh(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+
+        entry = self._load_entry(key)
+        with self._lock:
+            if entry:
+                self._store(key, entry)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def put(self, url: str, info: Dict):
+        """
+        Cache info for a URL.
+
+        Args:
+            url (str): Video URL
+            info (Dict): Sanitized yt-dlp info dict
+        """
+        key = self.key_for(url)
+        entry = (time.time(), info)
+        with self._lock:
+            self._store(key, entry)
+        self._save_entry(key, entry)
+
+    def _store(self, key: str, entry: tuple):
+        """Insert an entry and evict the least recently used ones (lock held)."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_entry(self, key: str) -> Optional[tuple]:
+        """Read a fresh entry from disk, removing it if it has expired."""
+        if not self.cache_dir:
+            return None
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if self._is_fresh(data['stored_at']):
+                return data['stored_at'], data['info']
+            path.unlink()
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def _save_entry(self, key: str, entry: tuple):
+        """Write an entry to disk if persistence is enabled."""
+        if not self.cache_dir:
+            return
+        path = self._entry_path(key)
+        try:
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'stored_at': entry[0], 'info': entry[1]}, f, default=json_default)
+            tmp_path.replace(path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Warning: Could not write metadata cache: {e}")
+
+    def invalidate(self, url: str):
+        """Remove a URL from the cache."""
+        key = self.key_for(url)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.cache_dir:
+            try:
+                self._entry_path(key).unlink()
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove all entries from memory and disk."""
+        with self._lock:
+            self._entries.clear()
+        if self.cache_dir:
+            for path in self.cache_dir.glob('*.json'):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+def create_cache_from_config() -> MetadataCache:
+    """Create a MetadataCache using the settings in config.py."""
+    cache_dir = None
+    if config.get('metadata_cache_persist'):
+        cache_dir = Path(config.config_file).parent / 'metadata_cache'
+    return MetadataCache(
+        max_entries=config.get('metadata_cache_size', 256),
+        ttl=config.get('metadata_cache_ttl', 1800),
+        cache_dir=cache_dir,
+    )
+
+
+# Global metadata cache shared by all downloaders in the process
+metadata_cache = create_cache_from_config()
@@ -0,0 +1,348 @@
+"""
+Instrumentation for YouTube Video Downloader.
+Counters and timing histograms for the download hot paths (extraction,
+format selection, transfer, merging, post-processing), exported as
+Prometheus text on a local endpoint and as one JSON line per job.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from config import config
+
+# Histogram buckets in seconds, from sub-second phases to very long downloads
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+# Metric name -> (type, help) of every metric the application reports
+METRICS = {
+    'ytd_jobs_total': ('counter', 'Download jobs by final status'),
+    'ytd_job_seconds': ('histogram', 'Total duration of download jobs'),
+    'ytd_span_seconds': ('histogram', 'Time spent in each download phase'),
+    'ytd_downloaded_bytes_total': ('counter', 'Bytes of finished file downloads'),
+    'ytd_retries_total': ('counter', 'Download retries by reason'),
+    'ytd_cache_requests_total': ('counter', 'Metadata cache lookups by result'),
+    'ytd_session_pool_total': ('counter', 'yt-dlp session borrows by result'),
+    'ytd_bandwidth_wait_seconds_total': ('counter', 'Time downloads slept to stay under rate limits'),
+    'ytd_loudnorm_files_total': ('counter', 'Loudness normalized files by result'),
+    'ytd_gui_queue_latency_seconds': ('histogram', 'Time GUI progress events wait in the queue'),
+}
+
+# yt-dlp postprocessor name -> span name
+POSTPROCESSOR_SPANS = {
+    'Merger': 'merge',
+    'MoveFiles': 'move',
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey, extra: str = None) -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class _Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+class JobTrace:
+    """
+    Timeline of one download job: named spans and per-job counters.
+
+    Spans can be opened and closed from different callbacks (e.g. transfer
+    starts at the first progress event and ends at 'finished'); closing a
+    span that is not open does nothing. Every closed span is also recorded
+    in the shared 'ytd_span_seconds' histogram.
+    """
+
+    def __init__(self, registry: "Metrics", url: str, kind: str = 'download', **labels):
+        self.registry = registry
+        self.url = url
+        self.kind = kind
+        self.labels = labels
+        self.status: Optional[str] = None
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.spans: List[Dict] = []
+        self.counters: Dict[str, float] = {}
+        self._t0 = time.perf_counter()
+        self._open: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str):
+        """Open a span unless one of that name is already open."""
+        with self._lock:
+            self._open.setdefault(name, time.perf_counter())
+
+    def end_span(self, name: str, **labels):
+        """Close an open span and record its duration."""
+        now = time.perf_counter()
+        with self._lock:
+            started = self._open.pop(name, None)
+            if started is None:
+                return
+            span = {'name': name, 'start': round(started - self._t0, 4),
+                    'duration': round(now - started, 4)}
+            if labels:
+                span['labels'] = labels
+            self.spans.append(span)
+        self.registry.observe('ytd_span_seconds', now - started, span=name, **labels)
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """Time a block as a span."""
+        self.start_span(name)
+        try:
+            yield
+        finally:
+            self.end_span(name, **labels)
+
+    def count(self, name: str, value: float = 1):
+        """Add to a per-job counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def to_dict(self) -> Dict:
+        """JSON-serialisable record of the job."""
+        with self._lock:
+            record = {
+                'time': round(self.started_at, 3),
+                'kind': self.kind,
+                'url': self.url,
+                'status': self.status,
+                'duration': round(self.elapsed, 4),
+                'spans': list(self.spans),
+                'counters': dict(self.counters),
+            }
+        record.update(self.labels)
+        if self.error:
+            record['error'] = self.error
+        return record
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters and histograms.
+
+    Recording is a dict update under a lock, cheap enough to call from
+    progress hooks. Nothing is exported unless the Prometheus endpoint is
+    started or a JSON log file is configured.
+    """
+
+    def __init__(self, log_file: str = None):
+        """
+        Initialize the registry.
+
+        Args:
+            log_file (str): File that receives one JSON line per finished job
+                (default: config 'metrics_log_file', None to disable)
+        """
+        self.log_file = log_file if log_file is not None else config.get('metrics_log_file')
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increase a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a value (usually seconds) in a histogram."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """Time a block outside of any job."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('ytd_span_seconds', time.perf_counter() - start, span=name, **labels)
+
+    @contextmanager
+    def job(self, url: str, kind: str = 'download', **labels):
+        """
+        Trace a download job.
+
+        The job's status is 'finished' unless set otherwise or the block
+        raises ('paused', 'cancelled' or 'failed'). On exit the job is counted,
+        its duration recorded and its trace written to the JSON log.
+
+        Args:
+            url (str): URL of the job
+            kind (str): 'download' or 'playlist'
+            **labels: Extra fields for the JSON record, e.g. platform
+
+        Yields:
+            JobTrace: The job's trace
+        """
+        trace = JobTrace(self, url, kind, **labels)
+        try:
+            yield trace
+        except BaseException as e:
+            name = type(e).__name__
+            trace.status = ('paused' if name == 'DownloadPaused'
+                            else 'cancelled' if name == 'DownloadCancelled' else 'failed')
+            trace.error = str(e)
+            raise
+        finally:
+            trace.status = trace.status or 'finished'
+            self.inc('ytd_jobs_total', status=trace.status, kind=kind)
+            self.observe('ytd_job_seconds', trace.elapsed, status=trace.status, kind=kind)
+            self.write_job(trace)
+
+    def write_job(self, trace: JobTrace):
+        """Append a job record to the JSON log file, if one is configured."""
+        if not self.log_file:
+            return
+        line = json.dumps(trace.to_dict(), default=str)
+        with self._log_lock:
+            try:
+                with open(self.log_file, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+            except OSError as e:
+                print(f"Warning: Could not write metrics log: {e}")
+
+    def snapshot(self) -> Dict:
+        """Get counters and histogram sums/counts as plain dicts."""
+        with self._lock:
+            counters = {name: {_format_labels(key): value for key, value in series.items()}
+                        for name, series in self._counters.items()}
+            histograms = {name: {_format_labels(key): {'count': h.count, 'sum': round(h.total, 4)}
+                                 for key, h in series.items()}
+                          for name, series in self._histograms.items()}
+        return {'counters': counters, 'histograms': histograms}
+
+    def prometheus_text(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            names = sorted(set(self._counters) | set(self._histograms))
+            for name in names:
+                kind, help_text = METRICS.get(name, ('untyped', name))
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for key, value in sorted(self._counters.get(name, {}).items()):
+                    lines.append(f'{name}{_format_labels(key)} {int(value) if value == int(value) else value}')
+                for key, histogram in sorted(self._histograms.get(name, {}).items()):
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, histogram.counts):
+                        cumulative += count
+                        le = f'le="{bound:g}"'
+                        lines.append(f'{name}_bucket{_format_labels(key, le)} {cumulative}')
+                    inf = _format_labels(key, 'le="+Inf"')
+                    lines.append(f'{name}_bucket{inf} {histogram.count}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {histogram.total:.6f}')
+                    lines.append(f'{name}_count{_format_labels(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int = None, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """
+        Serve /metrics in Prometheus format from a background thread.
+
+        Args:
+            port (int): Port to listen on (default: config 'metrics_port', else 9464)
+            host (str): Interface to bind; local only by default
+
+        Returns:
+            ThreadingHTTPServer: The running server
+        """
+        if self._server is not None:
+            return self._server
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port or config.get('metrics_port') or 9464),
+                                     MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+        self._server = server
+        return server
+
+    def stop_server(self):
+        """Stop the Prometheus endpoint."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Global registry used by the whole application
+metrics = Metrics()
+
+
+def serve_configured() -> Optional[ThreadingHTTPServer]:
+    """Start the Prometheus endpoint if config 'metrics_port' is set."""
+    if not config.get('metrics_port'):
+        return None
+    try:
+        return metrics.serve()
+    except OSError as e:
+        print(f"Warning: Could not start metrics endpoint: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    with metrics.job('https://youtu.be/example', platform='youtube') as job:
+        with job.span('extract'):
+            time.sleep(0.02)
+        job.count('downloaded_bytes', 1024)
+    metrics.inc('ytd_cache_requests_total', result='miss')
+    print(metrics.prometheus_text())
+    print(json.dumps(job.to_dict()))
@@ -0,0 +1,225 @@
+"""
+Platform registry for YouTube Video Downloader.
+Every supported site registers a thin adapter (which URLs it handles and
+which formats to ask for); all downloads run on the shared engine.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Union
+from urllib.parse import urlparse
+
+from ffmpeg_probe import is_ffmpeg_available
+
+
+def simple_format(quality: str, audio_only: bool = False) -> str:
+    """Format selection of the original YouTube downloader."""
+    if audio_only:
+        return 'bestaudio/best'
+    return 'worst' if quality == 'worst' else 'best'
+
+
+def progressive_format(quality: str, audio_only: bool = False) -> str:
+    """
+    Prefer single-stream MP4s; merge separate video and audio when FFmpeg can.
+
+    Args:
+        quality (str): 'best', 'worst' or a height like '720p'
+        audio_only (bool): Select an audio format
+
+    Returns:
+        str: yt-dlp format selector
+    """
+    if audio_only:
+        return 'bestaudio[ext=m4a]/bestaudio/best[height<=480]'
+
+    height = quality[:-1] if quality.endswith('p') and quality[:-1].isdigit() else None
+    if quality == 'worst':
+        return 'worst[ext=mp4]/worst'
+    if is_ffmpeg_available():
+        if height:
+            return (f'bestvideo[height={height}][ext=mp4]+bestaudio[ext=m4a]/'
+                    f'bestvideo[height<={height}]+bestaudio/best[height<={height}]/best')
+        return 'bestvideo[height<=2160][ext=mp4]+bestaudio[ext=m4a]/bestvideo+bestaudio/best'
+    if height:
+        return (f'best[height={height}][ext=mp4]/best[height<={height}][ext=mp4]/'
+                f'best[height<={height}]/best')
+    return ('best[height<=2160][ext=mp4]/best[height<=1440][ext=mp4]/'
+            'best[height<=1080][ext=mp4]/best[ext=mp4]/best')
+
+
+class Platform:
+    """A supported site: how to recognise its URLs and which formats to request."""
+
+    def __init__(self, name: str, hosts: List[str], display_name: str = None,
+                 format_selector: Callable = None, fallback_format: str = None,
+                 ydl_options: Dict = None):
+        """
+        Initialize the platform adapter.
+
+        Args:
+            name (str): Registry key, e.g. 'vimeo'
+            hosts (List[str]): Domains of the site; subdomains match too
+            display_name (str): Name shown to users (default: name)
+            format_selector (Callable): format_selector(quality, audio_only) -> str
+            fallback_format (str): Format to retry with when the first choice fails
+            ydl_options (Dict): Extra yt-dlp options for this site
+        """
+        self.name = name
+        self.hosts = tuple(hosts)
+        self.display_name = display_name or name
+        self.format_selector = format_selector or simple_format
+        self.fallback_format = fallback_format
+        self.ydl_options = dict(ydl_options or {})
+
+    def select_format(self, quality: str = 'best', audio_only: bool = False) -> str:
+        """Get the yt-dlp format selector for a quality."""
+        return self.format_selector(quality, audio_only)
+
+    def with_options(self, **ydl_options) -> 'Platform':
+        """
+        Get a copy of the adapter with extra yt-dlp options.
+
+        Args:
+            **ydl_options: Options added to (or replacing) the adapter's own
+
+        Returns:
+            Platform: New adapter; the registered one is not changed
+        """
+        return Platform(self.name, list(self.hosts), self.display_name, self.format_selector,
+                        self.fallback_format, dict(self.ydl_options, **ydl_options))
+
+    def __repr__(self):
+        return f"Platform({self.name!r})"
+
+
+_platforms: "OrderedDict[str, Platform]" = OrderedDict()
+_hosts: Dict[str, Platform] = {}
+
+# Used for URLs that no registered platform claims; yt-dlp still picks the extractor
+GENERIC = Platform('generic', [], display_name='Other')
+
+
+def register_platform(platform: Platform) -> Platform:
+    """
+    Add a platform adapter, replacing one registered under the same name.
+
+    Args:
+        platform (Platform): Adapter to register
+
+    Returns:
+        Platform: The registered adapter
+    """
+    old = _platforms.pop(platform.name, None)
+    if old:
+        for host in old.hosts:
+            _hosts.pop(host, None)
+    _platforms[platform.name] = platform
+    for host in platform.hosts:
+        _hosts[host.lower()] = platform
+    return platform
+
+
+def get_platform(name: str) -> Optional[Platform]:
+    """Look up a platform by registry name or display name (case-insensitive)."""
+    key = name.lower()
+    for platform in _platforms.values():
+        if platform.name == key or platform.display_name.lower() == key:
+            return platform
+    return GENERIC if key == GENERIC.name else None
+
+
+def list_platforms() -> List[Platform]:
+    """Get all registered platforms in registration order."""
+    return list(_platforms.values())
+
+
+def detect_platform(url: str) -> Optional[Platform]:
+    """
+    Find the platform of a URL from its host.
+
+    The host and each of its parent domains are looked up in a dict, so
+    detection costs a few lookups regardless of how many platforms exist.
+
+    Args:
+        url (str): Video URL, with or without scheme
+
+    Returns:
+        Optional[Platform]: Matching platform, or None
+    """
+    host = urlparse(url if '://' in url else f'//{url}').hostname or ''
+    labels = host.split('.')
+    for i in range(len(labels)):
+        platform = _hosts.get('.'.join(labels[i:]))
+        if platform:
+            return platform
+    return None
+
+
+def resolve_platform(platform: Union[str, Platform, None], url: str = None) -> Platform:
+    """Get the adapter to use: the given one, the detected one, or GENERIC."""
+    if isinstance(platform, Platform):
+        return platform
+    if platform:
+        resolved = get_platform(platform)
+        if resolved is None:
+            raise Exception(f"Unknown platform: {platform}")
+        return resolved
+    return (detect_platform(url) if url else None) or GENERIC
+
+
+def get_engine_class():
+    """Get the shared download engine (the root YouTubeDownloader class)."""
+    # Imported on first use; the engine imports this module
+    from download_engine import YouTubeDownloader
+    return YouTubeDownloader
+
+
+def download_with_platform(url: str, output_path: str = "downloads", quality: str = 'best',
+                           audio_only: bool = False, platform: Union[str, Platform] = None,
+                           progress_callback: Callable = None, custom_filename: str = None,
+                           audio_quality: str = None, fast_audio: bool = None) -> str:
+    """
+    Download a video from any registered platform on the shared engine.
+
+    Args:
+        url (str): Video URL
+        output_path (str): Directory where the download will be saved
+        quality (str): Video quality ('best', 'worst', '720p', ...)
+        audio_only (bool): Download audio only
+        platform (str): Platform name (default: detected from the URL)
+        progress_callback (Callable): Receives progress dicts
+        custom_filename (str): Custom filename for the download
+        audio_quality (str): MP3 bitrate for audio downloads, e.g. '192'
+        fast_audio (bool): Keep the source audio codec instead of converting to MP3
+            (default: config 'fast_audio')
+
+    Returns:
+        str: Status message
+    """
+    downloader = get_engine_class()(output_path)
+    if progress_callback:
+        downloader.set_progress_callback(progress_callback)
+    if audio_quality:
+        downloader.audio_quality = audio_quality
+    if fast_audio is not None:
+        downloader.fast_audio = fast_audio
+    return downloader.download_video(url, quality, audio_only, custom_filename,
+                                     platform=platform)
+
+
+# Built-in platforms
+register_platform(Platform('youtube', ['youtube.com', 'youtu.be', 'youtube-nocookie.com'],
+                           display_name='YouTube'))
+register_platform(Platform('vimeo', ['vimeo.com'], display_name='Vimeo',
+                           format_selector=progressive_format,
+                           ydl_options={'merge_output_format': 'mp4'}))
+register_platform(Platform('dailymotion', ['dailymotion.com', 'dai.ly'], display_name='Dailymotion',
+                           format_selector=progressive_format,
+                           ydl_options={'merge_output_format': 'mp4'}))
+register_platform(Platform('facebook', ['facebook.com', 'fb.watch', 'fb.com'], display_name='Facebook',
+                           format_selector=lambda quality, audio_only: (
+                               'bestaudio/best' if audio_only else 'best[ext=mp4]/best/worst'),
+                           fallback_format='worst'))
+register_platform(Platform('instagram', ['instagram.com'], display_name='Instagram',
+                           format_selector=progressive_format,
+                           ydl_options={'merge_output_format': 'mp4'}))
@@ -0,0 +1,175 @@
+"""
+Post-processing pool for YouTube Video Downloader.
+Runs the merge, audio extraction and fix-up steps of finished downloads on
+their own workers, so download slots go back to network transfers while
+FFmpeg is busy and transfers and transcodes of different jobs overlap.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from config import config
+from ffmpeg_probe import is_ffmpeg_available
+from metrics import metrics
+from ydl_pool import default_pool
+
+
+class PostProcessingPool:
+    """
+    Workers that run yt-dlp's post-processing stage of downloaded files.
+
+    A download hands over the raw files and its yt-dlp options; the worker
+    borrows a session with the same options from the shared pool (so the
+    job's postprocessors and hooks apply) and runs the stage there. Threads
+    are enough: the CPU work happens in FFmpeg child processes, and the pool
+    is sized to the CPU cores so transcodes do not compete for them.
+    """
+
+    def __init__(self, workers: int = None):
+        """
+        Initialize the pool.
+
+        Args:
+            workers (int): Post-processing jobs run at once
+                (default: config 'postprocess_workers', else one per CPU core)
+        """
+        self.workers = max(1, workers or config.get('postprocess_workers') or os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix='postprocess')
+
+    def submit(self, ydl_opts: Dict, filename: str, info: Dict,
+               files_to_move: Dict = None) -> Future:
+        """
+        Queue the post-processing of a downloaded file.
+
+        Args:
+            ydl_opts (Dict): yt-dlp options of the download
+            filename (str): Downloaded file (before merging and moving)
+            info (Dict): Info dict of the download, including the merge and
+                fix-up steps yt-dlp scheduled for it
+            files_to_move (Dict): Extra files yt-dlp moves to the final directory
+
+        Returns:
+            Future: Resolves to the final info dict
+        """
+        return self._executor.submit(self._run, ydl_opts, filename, dict(info),
+                                     dict(files_to_move or {}), time.perf_counter())
+
+    @staticmethod
+    def _run(ydl_opts: Dict, filename: str, info: Dict, files_to_move: Dict,
+             queued_at: float) -> Dict:
+        metrics.observe('ytd_span_seconds', time.perf_counter() - queued_at, span='postprocess_wait')
+        with metrics.span('postprocess_stage'), default_pool.session(ydl_opts) as ydl:
+            # Merge and fix-up steps are created per download and bound to the
+            # downloading session, which may already serve another job
+            info['__postprocessors'] = [type(pp)(ydl) for pp in info.get('__postprocessors') or []]
+            return ydl.post_process(filename, info, files_to_move)
+
+    @contextmanager
+    def deferred(self, ydl, ydl_opts: Dict, futures: List[Future]):
+        """
+        Hand the post-processing of downloads made with `ydl` to the pool.
+
+        yt-dlp calls YoutubeDL.post_process once the raw files of a video are
+        complete; inside this block that call only queues the work and
+        returns, and the future is appended to `futures`.
+
+        Args:
+            ydl (yt_dlp.YoutubeDL): Session borrowed for the download
+            ydl_opts (Dict): Options the session was borrowed with
+            futures (List[Future]): Receives one future per downloaded video
+        """
+        def post_process(filename, info, files_to_move=None):
+            futures.append(self.submit(ydl_opts, filename, info, files_to_move))
+            info['filepath'] = filename
+            return info
+
+        ydl.post_process = post_process
+        try:
+            yield ydl
+        finally:
+            del ydl.post_process
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers, by default after the queued work is done."""
+        self._executor.shutdown(wait=wait)
+
+
+def wait_all(futures: List[Future]) -> Optional[str]:
+    """
+    Wait for post-processing futures.
+
+    Returns:
+        Optional[str]: Error of the first failed future, None if all succeeded
+    """
+    error = None
+    for future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            error = error or str(e)
+    return error
+
+
+def when_all_done(futures: List[Future], callback: Callable[[], None]):
+    """Call `callback` (on a worker thread) once every future has finished."""
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            callback()
+
+    if not futures:
+        callback()
+    for future in futures:
+        future.add_done_callback(done)
+
+
+def audio_postprocessors(audio_quality: str = None, fast_audio: bool = None) -> List[Dict]:
+    """
+    Build the yt-dlp postprocessors of an audio-only download.
+
+    The default converts to MP3 at `audio_quality`, which decodes and
+    re-encodes every file. Fast audio keeps the source codec instead: yt-dlp
+    copies the stream (`-c copy`) into the container of its codec (AAC to
+    .m4a, Opus to .opus, Vorbis to .ogg, MP3 and FLAC as-is) and only
+    transcodes, to MP3, codecs without a container of their own. Without
+    FFmpeg, fast audio keeps the downloaded file untouched.
+
+    Args:
+        audio_quality (str): MP3 bitrate in kbps (default: config 'audio_quality')
+        fast_audio (bool): Stream-copy instead of converting (default: config 'fast_audio')
+
+    Returns:
+        List[Dict]: yt-dlp 'postprocessors' option
+    """
+    if fast_audio is None:
+        fast_audio = config.get('fast_audio', False)
+    if fast_audio and not is_ffmpeg_available():
+        return []
+    return [{
+        'key': 'FFmpegExtractAudio',
+        'preferredcodec': 'best' if fast_audio else 'mp3',
+        'preferredquality': audio_quality or config.get('audio_quality', '192'),
+    }]
+
+
+_pool: Optional[PostProcessingPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_postprocess_pool() -> PostProcessingPool:
+    """Get the process-wide post-processing pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PostProcessingPool()
+        return _pool
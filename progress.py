@@ -0,0 +1,118 @@
+"""
+Progress event throttling for YouTube Video Downloader.
+yt-dlp reports progress for every chunk it receives; this keeps the number
+of events that reach callbacks, queues and terminals bounded.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Hashable
+
+from config import config
+
+
+class ProgressThrottle:
+    """
+    Rate limit progress updates per job.
+
+    `ready()` returns True at most `max_rate` times per second for each key.
+    Skipped events are simply dropped: every yt-dlp event carries the full
+    current state, so the next delivered event supersedes them. Final events
+    (finished/error) always pass so the last state is never lost.
+    """
+
+    def __init__(self, max_rate: float = None):
+        """
+        Initialize the throttle.
+
+        Args:
+            max_rate (float): Maximum updates per second per key
+                (default: config 'progress_updates_per_second', 0 for unlimited)
+        """
+        if max_rate is None:
+            max_rate = config.get('progress_updates_per_second', 10)
+        self.interval = 1.0 / max_rate if max_rate else 0.0
+        self.delivered = 0
+        self.dropped = 0
+        self._last_delivery: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def ready(self, key: Hashable = None, final: bool = False) -> bool:
+        """
+        Check whether an update for `key` should be delivered now.
+
+        Args:
+            key (Hashable): Job identifier, e.g. the output filename
+            final (bool): True for the last event of a job
+
+        Returns:
+            bool: True if the update should be delivered
+        """
+        now = time.monotonic()
+        with self._lock:
+            if final:
+                self._last_delivery.pop(key, None)
+            else:
+                last = self._last_delivery.get(key)
+                if last is not None and now - last < self.interval:
+                    self.dropped += 1
+                    return False
+                self._last_delivery[key] = now
+            self.delivered += 1
+            return True
+
+
+def coalesce_latest(events, key: Callable, is_update: Callable) -> list:
+    """
+    Collapse a burst of queued events, keeping only the latest update per key.
+
+    Non-update events (completion, errors) are kept in order.
+
+    Args:
+        events (Iterable): Events in arrival order
+        key (Callable): Returns the job key of an event
+        is_update (Callable): True for events that only report progress
+
+    Returns:
+        list: Events to process
+    """
+    latest: Dict[Hashable, int] = {}
+    result = []
+    for event in events:
+        if is_update(event):
+            k = key(event)
+            if k in latest:
+                result[latest[k]] = None
+            latest[k] = len(result)
+        result.append(event)
+    return [event for event in result if event is not None]
+
+
+class TimedQueue(queue.Queue):
+    """
+    Queue that reports how long each item waited before it was taken.
+
+    Used between download threads and the GUI event loop, where a slow
+    consumer shows up as growing wait times.
+    """
+
+    def __init__(self, maxsize: int = 0, on_wait: Callable = None):
+        """
+        Initialize the queue.
+
+        Args:
+            maxsize (int): Maximum number of items, 0 for unbounded
+            on_wait (Callable): on_wait(seconds) called for every item taken
+        """
+        super().__init__(maxsize)
+        self.on_wait = on_wait
+
+    def _put(self, item):
+        super()._put((time.monotonic(), item))
+
+    def _get(self):
+        queued_at, item = super()._get()
+        if self.on_wait:
+            self.on_wait(time.monotonic() - queued_at)
+        return item
@@ -0,0 +1,352 @@
+"""
+Multi-connection segmented downloads for YouTube Video Downloader.
+Splits a direct-URL file into byte ranges that are fetched concurrently and
+written in place into a preallocated file.
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from yt_dlp.downloader import PROTOCOL_MAP
+from yt_dlp.downloader.http import HttpFD
+from yt_dlp.networking import Request
+
+from config import config
+
+MIN_SEGMENT_SIZE = 1024 * 1024
+READ_SIZE = 64 * 1024
+
+
+def _urllib_opener(url: str, headers: Dict):
+    """Default opener: a plain urllib GET request."""
+    return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=30)
+
+
+def _response_status(response) -> int:
+    return getattr(response, 'status', None) or response.getcode()
+
+
+def probe_size(url: str, headers: Dict = None, opener: Callable = None) -> Optional[int]:
+    """
+    Get the size of a file if the server supports range requests.
+
+    Args:
+        url (str): Direct file URL
+        headers (Dict): Extra request headers
+        opener (Callable): opener(url, headers) returning a response
+
+    Returns:
+        Optional[int]: File size in bytes, or None if ranges are not supported
+    """
+    opener = opener or _urllib_opener
+    request_headers = dict(headers or {}, Range='bytes=0-0')
+    response = opener(url, request_headers)
+    try:
+        if _response_status(response) != 206:
+            return None
+        content_range = response.headers.get('Content-Range', '')
+        total = content_range.rpartition('/')[2]
+        return int(total) if total.isdigit() else None
+    finally:
+        response.close()
+
+
+class SegmentedDownload:
+    """
+    Download one file over several connections.
+
+    The file is split into equal byte ranges, one per connection. Each
+    segment writes at its own offset of the preallocated temporary file and
+    is retried from where it stopped if its connection fails. Segment offsets
+    are saved next to the file, so a stopped download continues later
+    instead of starting over.
+    """
+
+    def __init__(self, url: str, filename: str, total_bytes: int, segments: int = 4,
+                 headers: Dict = None, chunk_size: int = 0, retries: int = 3,
+                 opener: Callable = None, throttle: Callable = None):
+        """
+        Initialize the download.
+
+        Args:
+            url (str): Direct file URL
+            filename (str): File to write (usually a .part file)
+            total_bytes (int): Size of the file
+            segments (int): Number of concurrent connections
+            headers (Dict): Extra request headers
+            chunk_size (int): Maximum bytes per range request, 0 for a whole segment
+            retries (int): Retries per segment after a failed connection
+            opener (Callable): opener(url, headers) returning a response
+                (default: urllib)
+            throttle (Callable): throttle(nbytes), called by every connection
+                after each read to apply bandwidth limits
+        """
+        self.url = url
+        self.filename = filename
+        self.state_file = f"{filename}.segments"
+        self.total_bytes = total_bytes
+        self.headers = dict(headers or {})
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.opener = opener or _urllib_opener
+        self.throttle = throttle
+        self.segments = self._load_state() or self._plan(max(1, segments))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _plan(self, segments: int) -> List[List[int]]:
+        """Split the file into [start, next_offset, end] ranges."""
+        segments = min(segments, max(1, self.total_bytes // MIN_SEGMENT_SIZE))
+        size = self.total_bytes // segments
+        plan = []
+        for i in range(segments):
+            start = i * size
+            end = self.total_bytes - 1 if i == segments - 1 else start + size - 1
+            plan.append([start, start, end])
+        return plan
+
+    def _load_state(self) -> Optional[List[List[int]]]:
+        """Load segment offsets of an earlier, interrupted run."""
+        try:
+            if os.path.getsize(self.filename) != self.total_bytes:
+                return None
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('total_bytes') != self.total_bytes:
+            return None
+        return state.get('segments')
+
+    def _save_state(self):
+        with self._lock:
+            state = {'total_bytes': self.total_bytes,
+                     'segments': [list(segment) for segment in self.segments]}
+        try:
+            with open(self.state_file, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+        except OSError as e:
+            print(f"Warning: Could not save segment state: {e}")
+
+    @property
+    def downloaded_bytes(self) -> int:
+        with self._lock:
+            return sum(offset - start for start, offset, _ in self.segments)
+
+    def _preallocate(self):
+        """Create the output file at its final size unless resuming into it."""
+        if os.path.isfile(self.filename) and os.path.getsize(self.filename) == self.total_bytes \
+                and os.path.isfile(self.state_file):
+            return
+        with open(self.filename, 'wb') as f:
+            f.truncate(self.total_bytes)
+        self._save_state()
+
+    def _fetch_range(self, f, index: int, offset: int, end: int):
+        """Fetch bytes offset..end of the file into the open output file."""
+        response = self.opener(self.url, dict(self.headers, Range=f'bytes={offset}-{end}'))
+        try:
+            status = _response_status(response)
+            # A server that ignores Range sends the whole file from byte 0
+            if status != 206 and not (status == 200 and offset == 0
+                                      and end == self.total_bytes - 1):
+                raise Exception(f"Server did not honour range request (HTTP {status})")
+            f.seek(offset)
+            while offset <= end:
+                if self._stop.is_set():
+                    return
+                block = response.read(min(READ_SIZE, end - offset + 1))
+                if not block:
+                    raise Exception(f"Connection closed at byte {offset} of segment {index}")
+                f.write(block)
+                offset += len(block)
+                with self._lock:
+                    self.segments[index][1] = offset
+                if self.throttle:
+                    self.throttle(len(block))
+        finally:
+            response.close()
+
+    def _run_segment(self, index: int):
+        """Download one segment, retrying from the current offset on errors."""
+        failures = 0
+        # Unbuffered, so recorded offsets never run ahead of the data on disk
+        with open(self.filename, 'r+b', buffering=0) as f:
+            while not self._stop.is_set():
+                with self._lock:
+                    _, offset, end = self.segments[index]
+                if offset > end:
+                    return
+                if self.chunk_size:
+                    end = min(end, offset + self.chunk_size - 1)
+                try:
+                    self._fetch_range(f, index, offset, end)
+                    failures = 0
+                except Exception:
+                    if self._stop.is_set():
+                        return
+                    failures += 1
+                    if failures > self.retries:
+                        raise
+                    time.sleep(min(2 ** failures, 10))
+
+    def run(self, progress_hook: Callable = None, interval: float = 0.25):
+        """
+        Download all segments.
+
+        Progress is reported from the calling thread, so exceptions raised by
+        the hook (e.g. to cancel) stop all connections and propagate.
+
+        Args:
+            progress_hook (Callable): progress_hook(downloaded_bytes, total_bytes)
+            interval (float): Seconds between progress reports
+        """
+        self._preallocate()
+        workers = len(self.segments)
+        last_save = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='segment')
+        futures = [executor.submit(self._run_segment, i) for i in range(workers)]
+        try:
+            while not all(future.done() for future in futures):
+                time.sleep(interval)
+                if progress_hook:
+                    progress_hook(self.downloaded_bytes, self.total_bytes)
+                if time.monotonic() - last_save >= 1:
+                    self._save_state()
+                    last_save = time.monotonic()
+                # Stop the other connections as soon as one segment gives up
+                if any(future.done() and future.exception() for future in futures):
+                    break
+            for future in futures:
+                if future.done() and future.exception():
+                    raise future.exception()
+        finally:
+            self._stop.set()
+            executor.shutdown(wait=True)
+            # Saved after the workers exit so the offsets match the file
+            self._save_state()
+
+        if progress_hook:
+            progress_hook(self.downloaded_bytes, self.total_bytes)
+        try:
+            os.remove(self.state_file)
+        except OSError:
+            pass
+
+
+class SegmentedHttpFD(HttpFD):
+    """
+    yt-dlp HTTP downloader that uses several connections for large files.
+
+    Enabled by the 'download_segments' option (> 1); small files, files of
+    unknown size and servers without range support use the regular HttpFD.
+    """
+
+    def real_download(self, filename, info_dict):
+        segments = self.params.get('download_segments') or 1
+        headers = dict(info_dict.get('http_headers') or {}, **{'Accept-Encoding': 'identity'})
+        if (segments < 2 or self.params.get('test') or info_dict.get('request_data')
+                or 'Range' in headers):
+            return super().real_download(filename, info_dict)
+
+        url = info_dict['url']
+
+        def opener(request_url, request_headers):
+            return self.ydl.urlopen(Request(request_url, headers=request_headers))
+
+        try:
+            total = probe_size(url, headers, opener)
+        except Exception:
+            total = None
+        if not total or total < (self.params.get('segment_min_size') or 0):
+            return super().real_download(filename, info_dict)
+
+        tmpfilename = self.temp_name(filename)
+        self.report_destination(filename)
+        download = SegmentedDownload(
+            url, tmpfilename, total, segments, headers,
+            chunk_size=(self.params.get('http_chunk_size')
+                        or info_dict.get('downloader_options', {}).get('http_chunk_size') or 0),
+            retries=self.params.get('retries') or 0,
+            opener=opener,
+            throttle=self.params.get('bandwidth_throttle'))
+        start = time.time()
+        resumed_bytes = download.downloaded_bytes
+
+        def report(downloaded, total_bytes):
+            now = time.time()
+            speed = self.calc_speed(start, now, downloaded - resumed_bytes)
+            self._hook_progress({
+                'status': 'downloading',
+                'downloaded_bytes': downloaded,
+                'total_bytes': total_bytes,
+                'tmpfilename': tmpfilename,
+                'filename': filename,
+                'eta': self.calc_eta(speed, total_bytes - downloaded),
+                'speed': speed,
+                'elapsed': now - start,
+                # Reported from the monitoring thread, the connections throttle themselves
+                'bandwidth_throttled': download.throttle is not None,
+            }, info_dict)
+
+        download.run(report)
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            'downloaded_bytes': total,
+            'total_bytes': total,
+            'filename': filename,
+            'status': 'finished',
+            'elapsed': time.time() - start,
+        }, info_dict)
+        return True
+
+
+def install():
+    """Route yt-dlp's http(s) downloads through SegmentedHttpFD."""
+    PROTOCOL_MAP['http'] = SegmentedHttpFD
+    PROTOCOL_MAP['https'] = SegmentedHttpFD
+
+
+def segmented_options(segments: int = None) -> Dict:
+    """
+    Get the yt-dlp options that enable segmented downloads.
+
+    Args:
+        segments (int): Connections per file (default: config 'download_segments')
+
+    Returns:
+        Dict: Options to merge into ydl_opts, empty for single-connection downloads
+    """
+    if segments is None:
+        segments = config.get('download_segments', 1)
+    if not segments or segments < 2:
+        return {}
+    install()
+    return {
+        'download_segments': segments,
+        'segment_min_size': config.get('segment_min_size', 0),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3:
+        print("Usage: python segmented_download.py <url> <output_file> [segments]")
+        sys.exit(1)
+
+    file_url, output, count = sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    size = probe_size(file_url)
+    if not size:
+        print("Server does not support range requests")
+        sys.exit(1)
+
+    started = time.time()
+    SegmentedDownload(file_url, output, size, count).run(
+        lambda done, total: print(f"\r{done / total * 100:.1f}%", end='', flush=True))
+    print(f"\nDownloaded {size} bytes in {time.time() - started:.1f}s")
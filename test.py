@@ -0,0 +1,147 @@
+"""
+Tests for YouTube Video Downloader.
+Run with: python -m unittest test (or python -m pytest test.py)
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from format_selection import FormatPolicy, select_format
+from job_queue import JobQueue
+from url_classifier import classify_url
+from ydl_pool import YoutubeDLPool
+
+
+def _video(format_id, height, **fields):
+    return dict({'format_id': format_id, 'ext': 'mp4', 'height': height,
+                 'vcodec': 'avc1.640028', 'acodec': 'mp4a.40.2'}, **fields)
+
+
+class FormatSelectionTest(unittest.TestCase):
+    """Choices of the format selection engine."""
+
+    # No filesize, filesize_approx or bitrate, as some extractors report
+    SIZELESS = {'formats': [_video('360', 360), _video('2160', 2160), _video('720', 720),
+                            _video('1080', 1080)]}
+
+    def select(self, info, quality, **options):
+        return select_format(info, FormatPolicy.from_quality(quality, ffmpeg=True, **options))
+
+    def test_worst_without_sizes_is_lowest_resolution(self):
+        selection = self.select(self.SIZELESS, 'worst')
+        self.assertEqual(selection.format_id, '360')
+        self.assertIn("lowest resolution", selection.explain())
+        self.assertNotIn("smallest file", selection.explain())
+
+    def test_minimum_height_without_sizes_is_closest_to_floor(self):
+        selection = self.select(self.SIZELESS, '720p+')
+        self.assertEqual(selection.format_id, '720')
+        self.assertNotIn("smallest file", selection.explain())
+
+    def test_ignored_height_cap_without_sizes_is_closest_to_cap(self):
+        # Nothing is at most 240p, so the cap is dropped and the lowest wins
+        selection = self.select(self.SIZELESS, '240p')
+        self.assertEqual(selection.format_id, '360')
+        self.assertIn("ignored that limit", selection.explain())
+
+    def test_best_without_sizes_is_highest_resolution(self):
+        self.assertEqual(self.select(self.SIZELESS, 'best').format_id, '2160')
+
+    def test_worst_with_sizes_is_smallest_file(self):
+        info = {'duration': 60, 'formats': [_video('a', 720, tbr=800), _video('b', 480, tbr=1200)]}
+        selection = self.select(info, 'worst')
+        self.assertEqual(selection.format_id, 'a')
+        self.assertIn("smallest file", selection.explain())
+
+
+class URLClassifierTest(unittest.TestCase):
+    """Hosts outside the built-in path tables."""
+
+    def test_unknown_host_is_generic_video(self):
+        classified = classify_url("https://example.com/clip/42#t=10")
+        self.assertEqual((classified.platform, classified.kind), ('generic', 'video'))
+        self.assertEqual(classified.id, "https://example.com/clip/42")
+
+    def test_registered_host_keeps_platform_name(self):
+        from platforms import Platform, register_platform
+        register_platform(Platform('testtube', ['testtube.example']))
+        self.assertEqual(classify_url("https://testtube.example/w/1").platform, 'testtube')
+
+    def test_non_urls_are_rejected(self):
+        for text in ("invalid_url", "example.com/clip", "Some title. Part 2"):
+            self.assertIsNone(classify_url(text), text)
+
+
+class JobQueueRecoveryTest(unittest.TestCase):
+    """Recovery of jobs left running by another run."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(os.path.join(self.tmp.name, "jobs.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def claim(self, pid):
+        self.queue.enqueue(f"https://example.com/{pid}")
+        return self.queue.claim_next(f"{socket.gethostname()}:{pid}:test")
+
+    def test_live_lease_of_exited_local_run_is_recovered(self):
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        job = self.claim(exited.pid)
+        self.assertEqual(self.queue.recover_interrupted(), 1)
+        self.assertEqual(self.queue.get(job['id'])['status'], 'pending')
+
+    def test_live_lease_of_running_local_run_is_kept(self):
+        job = self.claim(os.getpid())
+        self.assertEqual(self.queue.recover_interrupted(), 0)
+        self.assertEqual(self.queue.resume(), 0)
+        self.assertEqual(self.queue.get(job['id'])['status'], 'running')
+
+
+class YoutubeDLPoolTest(unittest.TestCase):
+    """Sessions borrowed with different per-download options."""
+
+    @classmethod
+    def setUpClass(cls):
+        from benchmarks.fake_server import FakeVideoServer
+        cls.server = FakeVideoServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = YoutubeDLPool()
+        self.info = {'id': 'clip', 'title': 'clip', 'extractor': 'generic',
+                     'extractor_key': 'Generic', 'webpage_url': self.server.base_url,
+                     'formats': [{'format_id': 'small', 'ext': 'mp4', 'height': 360,
+                                  'url': self.server.progressive_url(20000)},
+                                 {'format_id': 'large', 'ext': 'mp4', 'height': 720,
+                                  'url': self.server.progressive_url(50000)}]}
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def download(self, format_spec, name):
+        outtmpl = os.path.join(self.tmp.name, f"{name}.%(ext)s")
+        with self.pool.session({'quiet': True, 'format': format_spec, 'outtmpl': outtmpl}) as ydl:
+            ydl.process_ie_result(dict(self.info), download=True)
+        return os.path.getsize(os.path.join(self.tmp.name, f"{name}.mp4"))
+
+    def test_each_borrow_gets_its_format_and_output_template(self):
+        self.assertEqual(self.download('small', 'first'), 20000)
+        self.assertEqual(self.download('large', 'second'), 50000)
+        self.assertEqual(self.download('small', 'third'), 20000)
+        self.assertEqual((self.pool.created, self.pool.reused), (2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
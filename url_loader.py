@@ -0,0 +1,281 @@
+"""
+Streaming URL file loader for YouTube Video Downloader.
+Reads URLs from text, CSV and JSONL files (optionally gzip-compressed) one
+line at a time and drops duplicates, so inputs of any size load in flat memory.
+"""
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+import math
+import sys
+from typing import Iterable, Iterator, Optional
+
+from url_classifier import ClassifiedURL, classify_url
+
+FORMATS = ('txt', 'csv', 'jsonl')
+DEDUPE_MODES = ('set', 'bloom', 'none')
+
+# Columns/keys searched for the URL in CSV and JSONL input
+URL_FIELDS = ('url', 'webpage_url', 'original_url', 'link')
+
+
+def _hash64(key: str) -> int:
+    """64-bit hash of a dedupe key, stable across processes."""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class SeenSet:
+    """
+    Exact duplicate detection that stores a 64-bit hash per key.
+
+    Keeping integers instead of the key strings roughly halves memory use;
+    a false duplicate needs a 64-bit hash collision.
+    """
+
+    def __init__(self):
+        self._hashes = set()
+
+    def check_and_add(self, key: str) -> bool:
+        """Record a key and report whether it was seen before."""
+        value = _hash64(key)
+        if value in self._hashes:
+            return True
+        self._hashes.add(value)
+        return False
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic duplicate detection.
+
+    Memory is fixed by the expected capacity and error rate (about 1.2 MB
+    per million keys at 1%). Keys are never missed as duplicates, but a
+    small fraction of new keys may be reported as already seen.
+    """
+
+    def __init__(self, capacity: int = 10_000_000, error_rate: float = 0.001):
+        """
+        Initialize the filter.
+
+        Args:
+            capacity (int): Expected number of distinct keys
+            error_rate (float): Acceptable false-positive rate at capacity
+        """
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        if self.size >= 2 ** 32:
+            raise Exception("Bloom filter capacity too large")
+        self.hash_count = min(16, max(1, round(self.size / capacity * math.log(2))))
+        self._digest_size = 4 * self.hash_count
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+
+    def check_and_add(self, key: str) -> bool:
+        """Record a key and report whether it was (probably) seen before."""
+        # One digest provides all k positions as 32-bit words (k <= 16)
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=self._digest_size).digest()
+        bits, size = self._bits, self.size
+        seen = True
+        for value in memoryview(digest).cast('I'):
+            position = value % size
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                seen = False
+                bits[position >> 3] |= mask
+        if not seen:
+            self._count += 1
+        return seen
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def open_text(file_path: str):
+    """
+    Open a text file for streaming, decompressing gzip transparently.
+
+    Args:
+        file_path (str): File path, or '-' for standard input
+
+    Returns:
+        Text file object
+    """
+    if file_path == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='replace')
+    with open(file_path, 'rb') as f:
+        is_gzip = f.read(2) == b'\x1f\x8b'
+    if is_gzip:
+        return gzip.open(file_path, 'rt', encoding='utf-8', errors='replace', newline='')
+    return open(file_path, 'r', encoding='utf-8', errors='replace', newline='')
+
+
+def detect_format(file_path: str) -> str:
+    """Guess the input format from the file name ('txt' if unknown)."""
+    name = file_path.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return 'txt'
+
+
+def _text_values(f) -> Iterator[str]:
+    for line in f:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+def _csv_values(f) -> Iterator[str]:
+    url_column = None
+    for row_number, row in enumerate(csv.reader(f)):
+        if not row:
+            continue
+        if row_number == 0:
+            header = [cell.strip().lower() for cell in row]
+            url_column = next((header.index(name) for name in URL_FIELDS if name in header), None)
+            if url_column is not None:
+                continue
+        if url_column is not None:
+            if url_column < len(row):
+                yield row[url_column].strip()
+        else:
+            # No header: take the first cell that classifies as a URL
+            for cell in row:
+                cell = cell.strip()
+                if classify_url(cell):
+                    yield cell
+                    break
+
+
+def _jsonl_values(f) -> Iterator[str]:
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, str):
+            yield record
+        elif isinstance(record, dict):
+            for name in URL_FIELDS:
+                value = record.get(name)
+                if isinstance(value, str):
+                    yield value
+                    break
+
+
+_READERS = {'txt': _text_values, 'csv': _csv_values, 'jsonl': _jsonl_values}
+
+
+class URLLoader:
+    """
+    Stream the supported, de-duplicated URLs of a file.
+
+    Iterating yields ClassifiedURL objects in file order; nothing but the
+    dedupe structure is kept between lines. Counters describe the input
+    read so far.
+    """
+
+    def __init__(self, file_path: str, file_format: str = None, dedupe: str = 'set',
+                 platforms: Iterable[str] = None, bloom_capacity: int = 10_000_000,
+                 bloom_error_rate: float = 0.001):
+        """
+        Initialize the loader.
+
+        Args:
+            file_path (str): Input file ('.gz' files are decompressed), or '-' for stdin
+            file_format (str): 'txt', 'csv' or 'jsonl' (default: from the file name)
+            dedupe (str): 'set' (exact), 'bloom' (fixed memory) or 'none'
+            platforms (Iterable[str]): Only keep these platforms (default: all)
+            bloom_capacity (int): Expected distinct URLs for the Bloom filter
+            bloom_error_rate (float): False-positive rate of the Bloom filter
+        """
+        file_format = file_format or detect_format(file_path)
+        if file_format not in FORMATS:
+            raise Exception(f"Unsupported URL file format: {file_format}")
+        if dedupe not in DEDUPE_MODES:
+            raise Exception(f"Unknown dedupe mode: {dedupe}")
+        self.file_path = file_path
+        self.file_format = file_format
+        self.dedupe = dedupe
+        self.platforms = frozenset(platforms) if platforms else None
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.read = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.loaded = 0
+
+    def _make_seen(self):
+        if self.dedupe == 'bloom':
+            return BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+        if self.dedupe == 'set':
+            return SeenSet()
+        return None
+
+    def __iter__(self) -> Iterator[ClassifiedURL]:
+        seen = self._make_seen()
+        reader = _READERS[self.file_format]
+        with open_text(self.file_path) as f:
+            for value in reader(f):
+                self.read += 1
+                result = classify_url(value)
+                if result is None or (self.platforms is not None
+                                      and result.platform not in self.platforms):
+                    self.invalid += 1
+                    continue
+                if seen is not None and seen.check_and_add(result.key):
+                    self.duplicates += 1
+                    continue
+                self.loaded += 1
+                yield result
+
+    def urls(self) -> Iterator[str]:
+        """Stream the URLs as strings, e.g. into BatchDownloader.download_all."""
+        for result in self:
+            yield result.url
+
+    def summary(self) -> str:
+        """Describe what was read so far."""
+        return (f"{self.loaded} URLs loaded ({self.read} read, {self.invalid} unsupported, "
+                f"{self.duplicates} duplicates)")
+
+
+def iter_urls(file_path: str, dedupe: str = 'set', file_format: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream the supported, de-duplicated URLs of a file.
+
+    Args:
+        file_path (str): Text, CSV or JSONL file, optionally gzip-compressed
+        dedupe (str): 'set', 'bloom' or 'none'
+        file_format (str): Input format (default: from the file name)
+
+    Yields:
+        str: Each URL
+    """
+    return URLLoader(file_path, file_format, dedupe).urls()
+
+
+if __name__ == "__main__":
+    import time
+
+    if len(sys.argv) < 2:
+        print("Usage: python url_loader.py <url_file> [set|bloom|none]")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    loader = URLLoader(sys.argv[1], dedupe=sys.argv[2] if len(sys.argv) > 2 else 'set')
+    for _ in loader:
+        pass
+    print(f"{loader.summary()} in {time.perf_counter() - start:.2f}s")
@@ -10,6 +10,11 @@ from pathlib import Path
 from typing import Optional, List, Dict, Any
 from urllib.parse import urlparse, parse_qs
 
+from formats import FormatTable
+from url_classifier import VIDEO, classify_url, iter_valid_urls
+
+_PLAYLIST_ID_RE = re.compile(r'list=([\w-]+)')
+
 
 def is_valid_youtube_url(url: str) -> bool:
     """
@@ -21,19 +26,8 @@ def is_valid_youtube_url(url: str) -> bool:
     Returns:
         bool: True if valid YouTube URL
     """
-    youtube_patterns = [
-        r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=[\w-]+',
-        r'(?:https?://)?(?:www\.)?youtube\.com/playlist\?list=[\w-]+',
-        r'(?:https?://)?youtu\.be/[\w-]+',
-        r'(?:https?://)?(?:www\.)?youtube\.com/c/[\w-]+',
-        r'(?:https?://)?(?:www\.)?youtube\.com/user/[\w-]+',
-        r'(?:https?://)?(?:www\.)?youtube\.com/@[\w-]+',
-    ]
-    
-    for pattern in youtube_patterns:
-        if re.match(pattern, url, re.IGNORECASE):
-            return True
-    return False
+    result = classify_url(url)
+    return result is not None and result.platform == 'youtube'
 
 
 def extract_video_id(url: str) -> Optional[str]:
@@ -46,16 +40,9 @@ def extract_video_id(url: str) -> Optional[str]:
     Returns:
         Optional[str]: Video ID if found
     """
-    patterns = [
-        r'(?:youtube\.com/watch\?v=|youtu\.be/)([\w-]+)',
-        r'youtube\.com/embed/([\w-]+)',
-        r'youtube\.com/v/([\w-]+)'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
+    result = classify_url(url)
+    if result is not None and result.platform == 'youtube' and result.kind == VIDEO:
+        return result.id
     return None
 
 
@@ -69,7 +56,7 @@ def extract_playlist_id(url: str) -> Optional[str]:
     Returns:
         Optional[str]: Playlist ID if found
     """
-    match = re.search(r'list=([\w-]+)', url)
+    match = _PLAYLIST_ID_RE.search(url)
     return match.group(1) if match else None
 
 
@@ -176,11 +163,18 @@ def get_available_formats(formats: List[Dict[str, Any]]) -> Dict[str, List[Dict]
     Organize formats by type (video/audio).
     
     Args:
-        formats (List[Dict]): List of format dictionaries
+        formats (List[Dict]): List of format dictionaries, or a FormatTable
+            from get_video_info whose precomputed order is used
         
     Returns:
         Dict: Organized formats
     """
+    if isinstance(formats, FormatTable):
+        return {
+            'video': formats.video(),
+            'audio': formats.audio()
+        }
+    
     video_formats = []
     audio_formats = []
     
@@ -206,16 +200,24 @@ def check_ffmpeg() -> bool:
     """
     Check if FFmpeg is available in the system.
     
+    The probe runs once per FFmpeg binary and is cached by ffmpeg_probe.
+    
     Returns:
         bool: True if FFmpeg is available
     """
-    try:
-        import subprocess
-        result = subprocess.run(['ffmpeg', '-version'], 
-                              capture_output=True, text=True)
-        return result.returncode == 0
-    except (FileNotFoundError, subprocess.SubprocessError):
-        return False
+    from ffmpeg_probe import is_ffmpeg_available
+    return is_ffmpeg_available()
+
+
+def get_ffmpeg_path() -> Optional[str]:
+    """
+    Get the path of the FFmpeg binary.
+    
+    Returns:
+        Optional[str]: Path to FFmpeg, or None if it is not available
+    """
+    from ffmpeg_probe import get_ffmpeg_path as probe_ffmpeg_path
+    return probe_ffmpeg_path()
 
 
 def get_terminal_size() -> tuple:
@@ -286,28 +288,26 @@ def validate_url_list(urls: List[str]) -> List[str]:
     Returns:
         List[str]: List of valid URLs
     """
-    valid_urls = []
-    for url in urls:
-        url = url.strip()
-        if url and is_valid_youtube_url(url):
-            valid_urls.append(url)
-    return valid_urls
+    return [result.url for result in iter_valid_urls(urls, platforms=('youtube',))]
 
 
 def load_urls_from_file(file_path: str) -> List[str]:
     """
-    Load URLs from a text file.
+    Load URLs of all supported platforms from a text, CSV or JSONL file.
+    
+    Duplicates are dropped. Use url_loader.URLLoader to stream large files
+    instead of building a list.
     
     Args:
-        file_path (str): Path to the file
+        file_path (str): Path to the file (may be gzip-compressed)
         
     Returns:
         List[str]: List of valid URLs
     """
+    from url_loader import iter_urls
+    
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            urls = [line.strip() for line in f if line.strip()]
-        return validate_url_list(urls)
+        return list(iter_urls(file_path))
     except Exception as e:
         print(f"Error loading URLs from file: {e}")
         return []
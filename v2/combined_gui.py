@@ -10,25 +10,15 @@ import queue
 import time
 
 # Import downloaders
+import project_root  # noqa: F401  (shared engine modules live in the project root)
 from youtube_downloader import YouTubeDownloader
-from vimeo_downloader import download_vimeo_video
-from dailymotion_downloader import download_dailymotion_video
-from facebook_downloader import download_facebook_video
-from instagram_downloader import download_instagram_video
+from platforms import list_platforms, detect_platform, download_with_platform, get_engine_class
 
-try:
-    from install_ffmpeg import check_ffmpeg, get_ffmpeg_path
-    FFMPEG_AVAILABLE = True
-except ImportError:
-    FFMPEG_AVAILABLE = False
+from progress import ProgressThrottle, TimedQueue, coalesce_latest
+from metrics import metrics, serve_configured
 
-PLATFORMS = {
-    "YouTube": lambda url, path: YouTubeDownloader(path).download_video(url),
-    "Vimeo": download_vimeo_video,
-    "Dailymotion": download_dailymotion_video,
-    "Facebook": download_facebook_video,
-    "Instagram": download_instagram_video,
-}
+# Registered platform adapters by display name; all share one download engine
+PLATFORMS = {platform.display_name: platform for platform in list_platforms()}
 
 class VideoDownloaderGUI(tk.Tk):
     def __init__(self):
@@ -60,7 +50,11 @@ class VideoDownloaderGUI(tk.Tk):
         self.output_path_var = tk.StringVar()
         
         # Threading and progress tracking
-        self.progress_queue = queue.Queue()
+        # Wait times show how far the event loop lags behind the download threads
+        self.progress_queue = TimedQueue(on_wait=lambda seconds: metrics.observe(
+            'ytd_gui_queue_latency_seconds', seconds))
+        serve_configured()
+        self.progress_throttle = ProgressThrottle()
         self.download_thread = None
         self.is_downloading = False
 
@@ -274,6 +268,17 @@ class VideoDownloaderGUI(tk.Tk):
                                              width=8, style='Modern.TCombobox')
         self.audio_quality_menu.pack(side=tk.LEFT)
         self.audio_quality_var.set('192k')
+        
+        # Fast audio keeps the source codec (AAC/Opus) instead of converting to MP3
+        self.fast_audio_var = tk.BooleanVar()
+        fast_audio_chk = tk.Checkbutton(self.audio_quality_frame, text="⚡ Fast (original format)",
+                                        variable=self.fast_audio_var,
+                                        bg=self.card_color, fg=self.text_color,
+                                        font=("Segoe UI", 9),
+                                        selectcolor=self.card_color,
+                                        activebackground=self.card_color,
+                                        activeforeground=self.text_color)
+        fast_audio_chk.pack(side=tk.LEFT, padx=(10, 0))
 
         # Action buttons with modern design
         button_frame = tk.Frame(content_frame, bg=self.bg_color)
@@ -312,31 +317,38 @@ class VideoDownloaderGUI(tk.Tk):
     
     def process_progress_queue(self):
         """Process progress updates from the download thread"""
+        pending = []
         try:
             while True:
-                progress_data = self.progress_queue.get_nowait()
-                if progress_data['type'] == 'progress':
-                    self.progress['value'] = progress_data['value']
-                    self.status_label.config(text=progress_data['status'], fg=self.accent_color)
-                elif progress_data['type'] == 'complete':
-                    self.progress['value'] = 100
-                    self.status_label.config(text="✅ Download completed!", fg=self.success_color)
-                    self.is_downloading = False
-                    messagebox.showinfo("🎉 Success", progress_data['message'])
-                elif progress_data['type'] == 'error':
-                    self.progress['value'] = 0
-                    self.status_label.config(text="❌ Download failed", fg=self.error_color)
-                    self.is_downloading = False
-                    messagebox.showerror("❌ Download Failed", progress_data['message'])
+                pending.append(self.progress_queue.get_nowait())
         except queue.Empty:
             pass
         
+        # Only the newest progress update matters for the progress bar
+        for progress_data in coalesce_latest(pending, key=lambda p: 'download',
+                                             is_update=lambda p: p['type'] == 'progress'):
+            if progress_data['type'] == 'progress':
+                self.progress['value'] = progress_data['value']
+                self.status_label.config(text=progress_data['status'], fg=self.accent_color)
+            elif progress_data['type'] == 'complete':
+                self.progress['value'] = 100
+                self.status_label.config(text="✅ Download completed!", fg=self.success_color)
+                self.is_downloading = False
+                messagebox.showinfo("🎉 Success", progress_data['message'])
+            elif progress_data['type'] == 'error':
+                self.progress['value'] = 0
+                self.status_label.config(text="❌ Download failed", fg=self.error_color)
+                self.is_downloading = False
+                messagebox.showerror("❌ Download Failed", progress_data['message'])
+        
         # Schedule next check
         self.after(100, self.process_progress_queue)
     
     def progress_hook(self, d):
         """Progress hook for yt-dlp"""
         if d['status'] == 'downloading':
+            if not self.progress_throttle.ready(d.get('filename')):
+                return
             try:
                 # Calculate percentage
                 if 'total_bytes' in d and d['total_bytes']:
@@ -362,11 +374,33 @@ class VideoDownloaderGUI(tk.Tk):
             except Exception as e:
                 pass
         elif d['status'] == 'finished':
+            self.progress_throttle.ready(d.get('filename'), final=True)
+            self.progress_queue.put({
+                'type': 'progress',
+                'value': 100,
+                'status': "🔄 Processing downloaded file..."
+            })
+    
+    def engine_progress(self, info):
+        """Progress callback for the shared download engine"""
+        if info.get('status') == 'finished':
             self.progress_queue.put({
                 'type': 'progress',
                 'value': 100,
                 'status': "🔄 Processing downloaded file..."
             })
+            return
+        percentage = info.get('percentage') or 0
+        speed = info.get('speed') or 0
+        if speed:
+            speed_str = f" ({speed/1024/1024:.1f} MB/s)" if speed > 1024*1024 else f" ({speed/1024:.1f} KB/s)"
+        else:
+            speed_str = ""
+        self.progress_queue.put({
+            'type': 'progress',
+            'value': min(percentage, 100),
+            'status': f"📥 Downloading: {percentage:.1f}%{speed_str}"
+        })
     
     def open_github(self, event):
         """Open GitHub profile in default browser"""
@@ -391,16 +425,8 @@ class VideoDownloaderGUI(tk.Tk):
                 yt = YouTubeDownloader()
                 qualities = yt.get_available_qualities(url)
             else:
-                import yt_dlp
-                ydl_opts = {'quiet': True, 'no_warnings': True}
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                qualities = []
-                for fmt in info.get('formats', []):
-                    if fmt.get('height'):
-                        qualities.append(f"{fmt['height']}p")
-                qualities = list(sorted(set(qualities), key=lambda x: int(x[:-1]) if x[:-1].isdigit() else 0, reverse=True))
-                qualities += ['best', 'worst']
+                # The shared engine caches the extracted info for the download
+                qualities = get_engine_class()().get_available_qualities(url)
             if qualities:
                 self.quality_menu['values'] = qualities
                 self.quality_var.set(qualities[0])
@@ -423,20 +449,8 @@ class VideoDownloaderGUI(tk.Tk):
                 yt = YouTubeDownloader()
                 info = yt.get_video_info(url)
             else:
-                # Use yt-dlp directly for other platforms
-                import yt_dlp
-                ydl_opts = {'quiet': True, 'no_warnings': True}
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    data = ydl.extract_info(url, download=False)
-                info = {
-                    'title': data.get('title', 'Unknown'),
-                    'duration': data.get('duration', 0),
-                    'uploader': data.get('uploader', 'Unknown'),
-                    'view_count': data.get('view_count', 0),
-                    'description': data.get('description', ''),
-                    'upload_date': data.get('upload_date', ''),
-                    'thumbnail': data.get('thumbnail', ''),
-                }
+                # Other platforms go through the shared engine and its metadata cache
+                info = get_engine_class()().get_video_info(url)
             # Format info for display
             info_str = f"Title: {info['title']}\nDuration: {info['duration']}s\nUploader: {info['uploader']}\nViews: {info['view_count']}\nUpload Date: {info['upload_date']}\n\nDescription:\n{info['description']}"
             messagebox.showinfo("Video Info", info_str)
@@ -448,10 +462,10 @@ class VideoDownloaderGUI(tk.Tk):
         if folder:
             self.output_path_var.set(folder)
     
-    def download_worker(self, url, platform, output_path, quality, audio_only, audio_quality, normalize_audio):
+    def download_worker(self, url, platform, output_path, quality, audio_only, audio_quality, normalize_audio,
+                        fast_audio=False):
         """Worker function that runs in a separate thread"""
         try:
-            import yt_dlp
             
             # Clean up quality string and extract height
             quality_clean = quality
@@ -462,55 +476,6 @@ class VideoDownloaderGUI(tk.Tk):
             elif 'QHD' in quality:
                 quality_clean = quality.replace(' QHD', 'p')
             
-            # Simple, reliable yt-dlp options
-            ydl_opts = {
-                'outtmpl': f'{output_path}/%(title)s.%(ext)s',
-                'quiet': True,
-                'no_warnings': True,
-                'progress_hooks': [self.progress_hook],
-            }
-            
-            if audio_only:
-                # Simple audio download - let's not complicate with post-processing for now
-                ydl_opts['format'] = 'bestaudio[ext=m4a]/bestaudio/best[height<=480]'
-                # Try to extract audio but don't fail if FFmpeg isn't available
-                try:
-                    ydl_opts['postprocessors'] = [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': audio_quality,
-                    }]
-                except:
-                    pass  # If FFmpeg not available, just download in original format
-            else:
-                # Smart video download with FFmpeg-aware format selection
-                if quality_clean == 'best':
-                    # Try high quality formats that don't require merging first
-                    ydl_opts['format'] = 'best[height<=2160][ext=mp4]/best[height<=1440][ext=mp4]/best[height<=1080][ext=mp4]/best[ext=mp4]/best'
-                elif quality_clean.endswith('p') and quality_clean[:-1].isdigit():
-                    height = quality_clean[:-1]
-                    # For specific resolutions, try to get that quality in a single stream
-                    ydl_opts['format'] = f'best[height={height}][ext=mp4]/best[height<={height}][ext=mp4]/best[height={height}]/best[height<={height}]/best'
-                else:
-                    # Fallback to best available
-                    ydl_opts['format'] = 'best[ext=mp4]/best'
-                
-                # Try to use FFmpeg for merging if available, but don't require it
-                try:
-                    # Check if we can use FFmpeg for better quality
-                    import subprocess
-                    subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
-                    # FFmpeg is available, use separate streams for better quality
-                    if quality_clean == 'best':
-                        ydl_opts['format'] = 'bestvideo[height<=2160][ext=mp4]+bestaudio[ext=m4a]/bestvideo+bestaudio/best[height<=2160]'
-                    elif quality_clean.endswith('p') and quality_clean[:-1].isdigit():
-                        height = quality_clean[:-1]
-                        ydl_opts['format'] = f'bestvideo[height={height}][ext=mp4]+bestaudio[ext=m4a]/bestvideo[height<={height}]+bestaudio/best[height<={height}]'
-                    ydl_opts['merge_output_format'] = 'mp4'
-                except:
-                    # FFmpeg not available, stick with single-stream formats
-                    pass
-            
             # Platform-specific downloading
             if platform.lower() == 'youtube':
                 # Use YouTube downloader's advanced quality logic
@@ -521,20 +486,22 @@ class VideoDownloaderGUI(tk.Tk):
                 yt_downloader._progress_hook = self.progress_hook
                 
                 quality_clean = quality.replace(' (Recommended)', '').strip()
-                audio_only_flag = quality == "Audio Only (MP3)"
+                audio_only_flag = audio_only or quality == "Audio Only (MP3)"
                 
                 if audio_only_flag:
-                    # Use YouTube downloader's audio method
-                    yt_downloader.download_audio(url, quality="192", normalize_audio=True)
+                    # MP3 at the selected bitrate, or the original stream in fast mode
+                    yt_downloader.download_video(url, audio_only=True, audio_quality=audio_quality,
+                                                 normalize_audio=normalize_audio, fast_audio=fast_audio)
                 else:
                     # Use YouTube downloader's video method with proper quality handling
-                    yt_downloader.download_video(url, quality=quality_clean, normalize_audio=True)
+                    yt_downloader.download_video(url, quality=quality_clean, normalize_audio=normalize_audio)
             else:
-                # For other platforms, use the existing yt-dlp logic
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([url])
-            
-            print("Download completed successfully!")  # Debug
+                # Other platforms use their registered adapter on the shared engine
+                download_with_platform(url, output_path, quality_clean, audio_only,
+                                       platform=PLATFORMS[platform],
+                                       progress_callback=self.engine_progress,
+                                       audio_quality=audio_quality,
+                                       fast_audio=fast_audio)
             
             # Success
             self.progress_queue.put({
@@ -543,7 +510,6 @@ class VideoDownloaderGUI(tk.Tk):
             })
             
         except Exception as e:
-            print(f"Download error: {e}")  # Debug
             error_msg = str(e)
             
             # Handle FFmpeg-related errors gracefully
@@ -581,12 +547,20 @@ class VideoDownloaderGUI(tk.Tk):
         quality = self.quality_var.get().strip() if self.quality_var.get() else 'best'
         audio_only = self.audio_only_var.get()
         audio_quality = self.audio_quality_var.get().replace('k', '') if self.audio_quality_var.get() else '192'
-        normalize_audio = True  # Always normalize audio in background
+        fast_audio = audio_only and self.fast_audio_var.get()
+        # Normalize audio in background, except fast audio which must not re-encode
+        normalize_audio = None
         
         if not url or not output_path:
             messagebox.showerror("Error", "Please enter a URL and select output folder.")
             return
         
+        # Pick the platform from the URL when it is recognised
+        detected = detect_platform(url)
+        if detected and detected.display_name in PLATFORMS:
+            platform = detected.display_name
+            self.platform_var.set(platform)
+        
         # Reset progress and start download
         self.is_downloading = True
         self.progress['value'] = 0
@@ -595,7 +569,7 @@ class VideoDownloaderGUI(tk.Tk):
         # Start download in separate thread
         self.download_thread = threading.Thread(
             target=self.download_worker,
-            args=(url, platform, output_path, quality, audio_only, audio_quality, normalize_audio),
+            args=(url, platform, output_path, quality, audio_only, audio_quality, normalize_audio, fast_audio),
             daemon=True
         )
         self.download_thread.start()
@@ -1,30 +1,16 @@
 # dailymotion_downloader.py
 # Downloader for Dailymotion videos
 
-import yt_dlp
+import project_root  # noqa: F401  (shared engine modules live in the project root)
+from platforms import download_with_platform, get_platform
 
-def download_dailymotion_video(url, output_path, quality='best'):
+def download_dailymotion_video(url, output_path, quality='best', progress_callback=None):
     """
     Download Dailymotion video with quality selection
     """
-    # Handle quality selection
-    if quality == 'best':
-        format_selector = 'best[ext=mp4]/best'
-    elif quality == 'worst':
-        format_selector = 'worst[ext=mp4]/worst'
-    elif quality.endswith('p') and quality[:-1].isdigit():
-        height = quality[:-1]
-        format_selector = f'best[height<={height}][ext=mp4]/best[height<={height}]/best[ext=mp4]/best'
-    else:
-        format_selector = 'best[ext=mp4]/best'
-    
-    ydl_opts = {
-        'outtmpl': f'{output_path}/%(title)s.%(ext)s',
-        'format': format_selector,
-        'quiet': True,  # Suppress output
-        'no_warnings': True,  # Suppress warnings
-        'ignoreerrors': True,  # Continue on errors
-    }
-    
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        ydl.download([url])
+    # Format selection, retries and progress come from the shared engine.
+    # Like the original downloaders, a failing playlist entry is skipped
+    # instead of ending the whole download
+    return download_with_platform(url, output_path, quality,
+                                  platform=get_platform('dailymotion').with_options(ignoreerrors=True),
+                                  progress_callback=progress_callback)
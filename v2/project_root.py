@@ -0,0 +1,11 @@
+# project_root.py
+# Makes the shared engine modules in the project root importable from v2
+
+import sys
+from pathlib import Path
+
+# Appended rather than inserted, so v2's own modules (youtube_downloader)
+# keep their names when v2 is the script directory
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
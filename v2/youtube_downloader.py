@@ -1,14 +1,44 @@
-import yt_dlp
 import os
 from pathlib import Path
 from typing import Dict, List, Optional, Callable
 
-try:
-    from utils import get_ffmpeg_path
-    FFMPEG_AVAILABLE = True
-except ImportError:
-    FFMPEG_AVAILABLE = False
-    
+import project_root  # noqa: F401  (shared engine modules live in the project root)
+from config import config
+from ydl_pool import default_pool
+from progress import ProgressThrottle
+from ffmpeg_probe import is_ffmpeg_available, get_ffmpeg_path
+from segmented_download import segmented_options
+from fragment_concurrency import fragment_concurrency
+from loudnorm import normalize_files
+from postprocess import audio_postprocessors
+from formats import FormatTable
+from format_selection import format_spec
+
+def resolve_normalize_audio(normalize_audio: Optional[bool], audio_only: bool,
+                            fast_audio: bool, default: bool = True) -> bool:
+    """
+    Decide whether to normalize loudness, given fast audio mode.
+
+    Normalization re-encodes the audio, which undoes fast audio's stream copy,
+    so it is off by default in fast audio mode and warned about if asked for.
+
+    Args:
+        normalize_audio (bool): Caller's choice (None: decide from fast_audio)
+        audio_only (bool): Audio-only download, the only kind fast audio applies to
+        fast_audio (bool): Resolved fast audio setting
+        default (bool): Choice when not in fast audio mode
+
+    Returns:
+        bool: Whether to normalize
+    """
+    stream_copy = audio_only and fast_audio
+    if normalize_audio is None:
+        return default and not stream_copy
+    if normalize_audio and stream_copy:
+        print("Warning: Loudness normalization re-encodes the audio, "
+              "so fast audio will not keep the original stream")
+    return normalize_audio
+
 def get_safe_ydl_opts_for_audio():
     """Get yt-dlp options that work without FFmpeg"""
     return {
@@ -25,14 +55,24 @@ class YouTubeDownloader:
         self.download_path = Path(download_path)
         self.download_path.mkdir(exist_ok=True)
         self.progress_callback: Optional[Callable] = None
+        self._progress_throttle = ProgressThrottle()
         self.is_downloading = False
+        self.last_selection = None  # Selection of the last video, with its explanation
 
     def set_progress_callback(self, callback: Callable):
         self.progress_callback = callback
 
+    @staticmethod
+    def _collect_files(files: List[str]):
+        """Postprocessor hook that records the final path of every downloaded file."""
+        def hook(d):
+            if d['status'] == 'finished' and d.get('postprocessor') == 'MoveFiles':
+                files.append(d['info_dict'].get('filepath'))
+        return hook
+
     def _progress_hook(self, d):
         if d['status'] == 'downloading':
-            if self.progress_callback:
+            if self.progress_callback and self._progress_throttle.ready(d.get('filename')):
                 try:
                     downloaded = d.get('downloaded_bytes', 0)
                     total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
@@ -50,6 +90,7 @@ class YouTubeDownloader:
                 except Exception as e:
                     print(f"Progress callback error: {e}")
         elif d['status'] == 'finished':
+            self._progress_throttle.ready(d.get('filename'), final=True)
             if self.progress_callback:
                 self.progress_callback({
                     'status': 'finished',
@@ -59,7 +100,7 @@ class YouTubeDownloader:
     def get_video_info(self, url: str) -> Dict:
         ydl_opts = {'quiet': True, 'no_warnings': True}
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with default_pool.session(ydl_opts) as ydl:
                 info = ydl.extract_info(url, download=False)
                 video_info = {
                     'title': info.get('title', 'Unknown'),
@@ -69,32 +110,21 @@ class YouTubeDownloader:
                     'description': info.get('description', ''),
                     'upload_date': info.get('upload_date', ''),
                     'thumbnail': info.get('thumbnail', ''),
-                    'formats': []
+                    'formats': FormatTable(info.get('formats') or [])
                 }
-                for fmt in info.get('formats', []):
-                    if fmt.get('vcodec') != 'none' or fmt.get('acodec') != 'none':
-                        format_info = {
-                            'format_id': fmt.get('format_id'),
-                            'ext': fmt.get('ext'),
-                            'quality': fmt.get('quality'),
-                            'height': fmt.get('height'),
-                            'width': fmt.get('width'),
-                            'fps': fmt.get('fps'),
-                            'vcodec': fmt.get('vcodec'),
-                            'acodec': fmt.get('acodec'),
-                            'filesize': fmt.get('filesize'),
-                            'format_note': fmt.get('format_note', '')
-                        }
-                        video_info['formats'].append(format_info)
                 return video_info
         except Exception as e:
             raise Exception(f"Error getting video info: {str(e)}")
 
     def download_video(self, url: str, quality: str = 'best', audio_only: bool = False, 
                       custom_filename: str = None, audio_quality: str = '192', 
-                      normalize_audio: bool = True) -> str:
+                      normalize_audio: bool = None, fast_audio: bool = None) -> str:
         try:
             self.is_downloading = True
+            if fast_audio is None:
+                fast_audio = config.get('fast_audio', False)
+            # Normalized by default, unless fast audio keeps the original stream
+            normalize_audio = resolve_normalize_audio(normalize_audio, audio_only, fast_audio)
             if custom_filename:
                 outtmpl = str(self.download_path / f"{custom_filename}.%(ext)s")
             else:
@@ -106,34 +136,26 @@ class YouTubeDownloader:
                 'no_warnings': True,  # Suppress warnings
                 'ignoreerrors': True,  # Continue on errors
             }
+            # Merged 4K formats are large direct files, fetch them over several connections
+            ydl_opts.update(segmented_options())
             
             # Add FFmpeg location if available
-            if FFMPEG_AVAILABLE:
-                ffmpeg_path = get_ffmpeg_path()
-                if ffmpeg_path:
-                    ydl_opts['ffmpeg_location'] = ffmpeg_path
+            ffmpeg_path = get_ffmpeg_path()
+            if ffmpeg_path:
+                ydl_opts['ffmpeg_location'] = ffmpeg_path
             
             if audio_only:
-                # Simple audio extraction without complex post-processing
+                # MP3 conversion, or a stream copy of the best audio codec in fast mode
                 ydl_opts.update({
-                    'format': 'bestaudio[acodec^=mp4a]/bestaudio[ext=m4a]/bestaudio',
-                    'postprocessors': [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': audio_quality,
-                    }],
+                    'format': 'bestaudio/best' if fast_audio else 'bestaudio[acodec^=mp4a]/bestaudio[ext=m4a]/bestaudio',
+                    'postprocessors': audio_postprocessors(audio_quality, fast_audio),
                     'postprocessor_args': ['-loglevel', 'error'],
                     'ignoreerrors': True,
                 })
             else:
                 # Smart YouTube video quality settings with FFmpeg detection
-                try:
-                    # Check if FFmpeg is available for merging
-                    import subprocess
-                    subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
-                    ffmpeg_available = True
-                except:
-                    ffmpeg_available = False
+                # Check if FFmpeg is available for merging (probed once per process)
+                ffmpeg_available = is_ffmpeg_available()
                 
                 if ffmpeg_available:
                     # FFmpeg available - use separate streams for highest quality
@@ -158,36 +180,50 @@ class YouTubeDownloader:
                         ydl_opts['format'] = f'best[height={height}][ext=mp4]/best[height<={height}]/best'
                     else:
                         ydl_opts['format'] = 'best[ext=mp4]/best'
-                
-                # Add audio normalization for video downloads if requested
-                if normalize_audio:
-                    # Keep it simple - just ensure we get good quality without complex post-processing
-                    pass
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            
+            # Two-pass loudness normalization of the finished files
+            downloaded_files = []
+            if normalize_audio:
+                ydl_opts['postprocessor_hooks'] = [self._collect_files(downloaded_files)]
+            fragment_concurrency.apply(ydl_opts)
+            with default_pool.session({'quiet': True, 'no_warnings': True}) as ydl:
+                info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+            # Concrete formats from the selection engine, the selectors above as fallback
+            ydl_opts['format'], self.last_selection = format_spec(
+                info, quality, audio_only, fallback=ydl_opts['format'],
+                merge_container=ydl_opts.get('merge_output_format'))
+            with default_pool.session(ydl_opts) as ydl:
+                ydl.process_ie_result(info, download=True)
+            if downloaded_files:
+                normalize_files(downloaded_files, bitrate=audio_quality)
             self.is_downloading = False
             return "Download completed successfully!"
         except Exception as e:
             self.is_downloading = False
             raise Exception(f"Download failed: {str(e)}")
 
-    def download_playlist(self, url: str, quality: str = 'best', audio_only: bool = False, max_downloads: int = None) -> str:
+    def download_playlist(self, url: str, quality: str = 'best', audio_only: bool = False, max_downloads: int = None,
+                          normalize_audio: bool = False, fast_audio: bool = None) -> str:
         try:
             self.is_downloading = True
+            if fast_audio is None:
+                fast_audio = config.get('fast_audio', False)
+            normalize_audio = resolve_normalize_audio(normalize_audio, audio_only, fast_audio,
+                                                      default=False)
+            downloaded_files = []
             ydl_opts = {
                 'outtmpl': str(self.download_path / "%(playlist_index)s - %(title)s.%(ext)s"),
                 'progress_hooks': [self._progress_hook],
             }
+            if normalize_audio:
+                # Normalized together afterwards, spread over worker processes
+                ydl_opts['postprocessor_hooks'] = [self._collect_files(downloaded_files)]
             if max_downloads:
                 ydl_opts['playlistend'] = max_downloads
             if audio_only:
                 ydl_opts.update({
                     'format': 'bestaudio/best',
-                    'postprocessors': [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': '192',
-                    }],
+                    'postprocessors': audio_postprocessors('192', fast_audio),
                 })
             else:
                 if quality == 'best':
@@ -201,8 +237,11 @@ class YouTubeDownloader:
                 else:
                     # Fallback to best quality
                     ydl_opts['format'] = 'best[ext=mp4]/best'
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            fragment_concurrency.apply(ydl_opts)
+            with default_pool.session(ydl_opts) as ydl:
                 ydl.download([url])
+            if downloaded_files:
+                normalize_files(downloaded_files)
             self.is_downloading = False
             return "Playlist download completed successfully!"
         except Exception as e:
@@ -212,15 +251,6 @@ class YouTubeDownloader:
     def get_available_qualities(self, url: str) -> List[str]:
         try:
             info = self.get_video_info(url)
-            qualities = set()
-            for fmt in info['formats']:
-                if fmt['height']:
-                    qualities.add(f"{fmt['height']}p")
-            qualities.update(['best', 'worst'])
-            return sorted(list(qualities), key=lambda x: (
-                0 if x == 'best' else 
-                1 if x == 'worst' else 
-                int(x[:-1])
-            ), reverse=True)
+            return [f"{height}p" for height in info['formats'].heights()] + ['worst', 'best']
         except Exception:
             return ['best', 'worst', '1080p', '720p', '480p', '360p', '240p']
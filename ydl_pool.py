@@ -0,0 +1,183 @@
+"""
+Pool of reusable yt-dlp sessions for YouTube Video Downloader.
+Keeps YoutubeDL instances alive between downloads so extractor setup,
+cookie jars and HTTP keep-alive connections are not thrown away per call.
+"""
+
+import atexit
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+import yt_dlp
+
+from metrics import metrics
+
+# Options that are applied per borrow instead of being part of the profile.
+# 'format' is not one of them: yt-dlp compiles it in __init__, so sessions are
+# only shared between borrowers with the same format spec
+PER_BORROW_OPTIONS = ('progress_hooks', 'postprocessor_hooks', 'outtmpl', 'match_filter',
+                      'bandwidth_throttle', 'concurrent_fragment_downloads')
+
+# YoutubeDL internals reset() relies on to reuse an instance; on yt-dlp
+# versions without them every borrow gets a fresh instance instead
+RESET_ATTRIBUTES = ('_parse_outtmpl', '_download_retcode', '_num_downloads')
+
+
+class PooledSession:
+    """A YoutubeDL instance whose progress hooks can be swapped per borrower."""
+
+    def __init__(self, ydl_opts: Dict):
+        self.progress_hooks: List[Callable] = []
+        self.postprocessor_hooks: List[Callable] = []
+        self.ydl = yt_dlp.YoutubeDL(ydl_opts)
+        self.reusable = all(hasattr(self.ydl, name) for name in RESET_ATTRIBUTES)
+        # yt-dlp copies hooks into postprocessors at registration time, so a
+        # single dispatcher per kind is registered once and forwards to the
+        # hooks of whoever currently holds the session
+        self.ydl.add_progress_hook(lambda d: self._dispatch(self.progress_hooks, d))
+        self.ydl.add_postprocessor_hook(lambda d: self._dispatch(self.postprocessor_hooks, d))
+
+    @staticmethod
+    def _dispatch(hooks: List[Callable], d: Dict):
+        for hook in hooks:
+            hook(d)
+
+    def reset(self, progress_hooks: List[Callable] = None,
+              postprocessor_hooks: List[Callable] = None, outtmpl=None,
+              match_filter: Callable = None, bandwidth_throttle: Callable = None,
+              concurrent_fragment_downloads: int = None):
+        """Prepare the session for a new borrower."""
+        self.progress_hooks = list(progress_hooks or [])
+        self.postprocessor_hooks = list(postprocessor_hooks or [])
+        # Output templates differ per video (custom names, playlist indexes),
+        # so they are swapped in rather than splitting the pool by template
+        self.ydl.params['outtmpl'] = outtmpl if outtmpl is not None else {}
+        self.ydl._parse_outtmpl()
+        # Filters are usually bound methods of the borrower (e.g. archive checks)
+        self.ydl.params['match_filter'] = match_filter
+        # Bandwidth handle of the borrowing job, read by SegmentedHttpFD
+        self.ydl.params['bandwidth_throttle'] = bandwidth_throttle
+        # Tuned between downloads by fragment_concurrency; fragment downloaders
+        # read it from params when they start
+        self.ydl.params['concurrent_fragment_downloads'] = concurrent_fragment_downloads or 1
+        # Per-run counters used for max_downloads, %(autonumber)s and the exit code
+        self.ydl._download_retcode = 0
+        self.ydl._num_downloads = 0
+
+    def close(self):
+        self.progress_hooks = []
+        self.postprocessor_hooks = []
+        self.ydl.close()
+
+
+class YoutubeDLPool:
+    """
+    Thread-safe pool of YoutubeDL sessions keyed by option profile.
+
+    A session is only ever used by one thread at a time: borrowers take an
+    idle session with matching options (or create one) and return it when done.
+    """
+
+    def __init__(self, max_idle: int = 16):
+        """
+        Initialize the pool.
+
+        Args:
+            max_idle (int): Maximum number of idle sessions kept across all profiles
+        """
+        self.max_idle = max_idle
+        self.created = 0
+        self.reused = 0
+        self._idle: "OrderedDict[str, List[PooledSession]]" = OrderedDict()
+        self._idle_count = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def profile_key(ydl_opts: Dict) -> str:
+        """Build a stable key from the options that shape a YoutubeDL instance."""
+        profile = {k: v for k, v in ydl_opts.items() if k not in PER_BORROW_OPTIONS}
+        return json.dumps(profile, sort_keys=True, default=repr)
+
+    def _acquire(self, key: str, ydl_opts: Dict) -> PooledSession:
+        with self._lock:
+            sessions = self._idle.get(key)
+            if sessions:
+                self._idle_count -= 1
+                self.reused += 1
+                session = sessions.pop()
+                if not sessions:
+                    del self._idle[key]
+            else:
+                session = None
+                self.created += 1
+
+        metrics.inc('ytd_session_pool_total', result='reused' if session is not None else 'created')
+        if session is not None:
+            return session
+
+        profile = {k: v for k, v in ydl_opts.items() if k not in PER_BORROW_OPTIONS}
+        return PooledSession(profile)
+
+    def _release(self, key: str, session: PooledSession):
+        evicted = []
+        with self._lock:
+            self._idle.setdefault(key, []).append(session)
+            self._idle.move_to_end(key)
+            self._idle_count += 1
+            # Drop sessions of the least recently used profiles first
+            while self._idle_count > self.max_idle:
+                oldest_key, sessions = next(iter(self._idle.items()))
+                evicted.append(sessions.pop(0))
+                self._idle_count -= 1
+                if not sessions:
+                    del self._idle[oldest_key]
+
+        for old_session in evicted:
+            old_session.close()
+
+    @contextmanager
+    def session(self, ydl_opts: Dict):
+        """
+        Borrow a YoutubeDL instance configured with the given options.
+
+        Args:
+            ydl_opts (Dict): yt-dlp options; hooks, the output template, the
+                match filter, the bandwidth throttle and the fragment
+                concurrency apply to this borrow only
+
+        Yields:
+            yt_dlp.YoutubeDL: Instance reserved for the calling thread
+        """
+        key = self.profile_key(ydl_opts)
+        session = self._acquire(key, ydl_opts)
+        if not session.reusable:
+            session.close()
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                yield ydl
+            return
+        session.reset(ydl_opts.get('progress_hooks'), ydl_opts.get('postprocessor_hooks'),
+                      ydl_opts.get('outtmpl'), ydl_opts.get('match_filter'),
+                      ydl_opts.get('bandwidth_throttle'),
+                      ydl_opts.get('concurrent_fragment_downloads'))
+        try:
+            yield session.ydl
+        finally:
+            session.reset()
+            self._release(key, session)
+
+    def close(self):
+        """Close all idle sessions."""
+        with self._lock:
+            sessions = [s for group in self._idle.values() for s in group]
+            self._idle.clear()
+            self._idle_count = 0
+        for session in sessions:
+            session.close()
+
+
+# Global pool shared by all downloaders in the process
+default_pool = YoutubeDLPool()
+atexit.register(default_pool.close)